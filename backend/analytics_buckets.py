@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Time-Bucketed Activity Rollups for Academic Portal
+Daily activity counters per portal, student, class and assignment, kept up to date on write
+
+Triggers add every submission, quiz attempt and reflection to a daily
+bucket. A compaction job later folds closed weeks into one weekly bucket,
+so chart series read O(weeks) rows however much history exists.
+
+Usage:
+    python analytics_buckets.py             # fold old daily buckets into weekly ones
+    python analytics_buckets.py --rebuild   # recompute every bucket from history, then compact
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from analytics_rollup import PASS_MARK, graded_update
+from db_pool import get_db_connection
+
+BUCKET_TABLE = 'activity_buckets'
+MEMBER_TABLE = 'activity_bucket_students'
+
+# Compaction settings
+COMPACT_AFTER_DAYS = int(os.environ.get('ANALYTICS_COMPACT_AFTER_DAYS', 28))
+MEMBER_RETENTION_WEEKS = int(os.environ.get('ANALYTICS_MEMBER_RETENTION_WEEKS', 12))
+COMPACT_INTERVAL = float(os.environ.get('ANALYTICS_COMPACT_INTERVAL', 3600))  # seconds, 0 disables
+
+# Counter columns summed across buckets
+COUNTERS = [
+    'submissions', 'graded_submissions', 'grade_sum',
+    'quiz_attempts', 'quiz_scored', 'quiz_score_sum', 'quiz_passes',
+    'reflections', 'active_students'
+]
+
+# Scope ids that are not stored on the source row
+PORTAL_ID = '0'
+
+
+def week_start_expr(value):
+    """SQL expression for the Monday of the week containing value"""
+    return f"date({value}, '-6 days', 'weekday 1')"
+
+
+def week_start(day):
+    """Monday of the week containing a date"""
+    return day - timedelta(days=day.weekday())
+
+
+def _scope_statements(scope, scope_id, at, set_clauses, student=None, remaining=None):
+    """Trigger statements that apply set_clauses to one scope's daily bucket
+
+    When student is given, the bucket's active_students goes up by one the
+    first time that student is seen in the scope during the week, so summing
+    a week's buckets gives its distinct active students. When remaining is
+    given instead (deletes), it is an SQL condition for the student still
+    having activity in the scope that week; once it is false the student's
+    membership is dropped and active_students goes down by one.
+    """
+    day = f'date({at})'
+    week = week_start_expr(at)
+    key = f"scope = '{scope}' AND scope_id = {scope_id}"
+    clauses = list(set_clauses)
+    if student:
+        clauses.append(f'''active_students = active_students + NOT EXISTS (
+            SELECT 1 FROM {MEMBER_TABLE} WHERE {key} AND week_start = {week} AND student_id = {student}
+        )''')
+    statements = [
+        f'''INSERT OR IGNORE INTO {BUCKET_TABLE} (scope, scope_id, bucket_start, granularity, week_start)
+            SELECT '{scope}', {scope_id}, {day}, 'day', {week} WHERE {scope_id} IS NOT NULL''',
+        f'''UPDATE {BUCKET_TABLE} SET {", ".join(clauses)}
+            WHERE {key} AND granularity = 'day' AND bucket_start = {day}'''
+    ]
+    if student:
+        statements.append(
+            f'''INSERT OR IGNORE INTO {MEMBER_TABLE} (scope, scope_id, week_start, student_id)
+            SELECT '{scope}', {scope_id}, {week}, {student} WHERE {scope_id} IS NOT NULL AND {student} IS NOT NULL'''
+        )
+    if remaining:
+        member = f'{key} AND week_start = {week} AND student_id = {remaining[0]}'
+        statements += [
+            f'''UPDATE {BUCKET_TABLE} SET active_students = active_students - 1
+            WHERE {key} AND granularity = 'day' AND bucket_start = {day}
+              AND EXISTS (SELECT 1 FROM {MEMBER_TABLE} WHERE {member}) AND NOT {remaining[1]}''',
+            f'''DELETE FROM {MEMBER_TABLE} WHERE {member} AND NOT {remaining[1]}'''
+        ]
+    return statements
+
+
+def _trigger(conn, name, event, table, at, scopes, set_clauses, student=None, remaining=None):
+    """Create a trigger that applies set_clauses to the daily bucket of every scope
+
+    remaining(scope, scope_id) gives (student, condition) for delete triggers.
+    """
+    statements = []
+    for scope, scope_id in scopes:
+        statements += _scope_statements(scope, scope_id, at, set_clauses, student,
+                                        remaining(scope, scope_id) if remaining else None)
+    conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    conn.execute(f'''
+        CREATE TRIGGER {name} AFTER {event} ON {table}
+        WHEN {at} IS NOT NULL
+        BEGIN
+            {"; ".join(statements)};
+        END
+    ''')
+
+
+def _passes(added=None, removed=None):
+    """SET clause for the quiz pass counter"""
+    delta = ''
+    if added is not None:
+        delta += f' + COALESCE({added} >= {PASS_MARK}, 0)'
+    if removed is not None:
+        delta += f' - COALESCE({removed} >= {PASS_MARK}, 0)'
+    return f'quiz_passes = quiz_passes{delta}'
+
+
+def _activity_in_week(table, at_column, student, week, owner_table=None, owner_column=None, owner_id=None,
+                      item_column=None, item_id=None):
+    """SQL condition for a student having a row in table during a week, optionally for one owner or item"""
+    join = where = ''
+    if owner_table:
+        join = f'JOIN {owner_table} o ON o.id = x.{item_column}'
+        where = f'AND o.{owner_column} = {owner_id}'
+    elif item_column:
+        where = f'AND x.{item_column} = {item_id}'
+    return f'''EXISTS (
+        SELECT 1 FROM {table} x {join}
+        WHERE x.student_id = {student} AND {week_start_expr(f'x.{at_column}')} = {week} {where}
+    )'''
+
+
+def create_bucket_schema(conn, has_grade=True, assignment_owner='teacher_id', quiz_owner='teacher_id'):
+    """Create the bucket tables and the triggers that fill them
+
+    assignment_owner/quiz_owner name the column holding the teacher id
+    (None when the schema has no owner, which disables the class scope).
+    """
+    counter_columns = ''.join(f'{column} {"REAL" if column.endswith("_sum") else "INTEGER"} NOT NULL DEFAULT 0,\n'
+                              for column in COUNTERS)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {BUCKET_TABLE} (
+            scope TEXT NOT NULL,
+            scope_id INTEGER NOT NULL,
+            bucket_start DATE NOT NULL,
+            granularity TEXT NOT NULL,
+            week_start DATE NOT NULL,
+            {counter_columns}
+            PRIMARY KEY (scope, scope_id, bucket_start, granularity)
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {MEMBER_TABLE} (
+            scope TEXT NOT NULL,
+            scope_id INTEGER NOT NULL,
+            week_start DATE NOT NULL,
+            student_id INTEGER NOT NULL,
+            PRIMARY KEY (scope, scope_id, week_start, student_id)
+        )
+    ''')
+
+    def scopes(row, owner_table, owner_column, item_scope=None, item_column=None):
+        result = [('portal', PORTAL_ID), ('student', f'{row}.student_id')]
+        if owner_column:
+            result.append(('class', f'(SELECT {owner_column} FROM {owner_table} WHERE id = {row}.{item_column})'))
+        if item_scope:
+            result.append((item_scope, f'{row}.{item_column}'))
+        return result
+
+    def remaining(row, at):
+        """Activity left for the deleted row's student in each scope's week"""
+        student, week = f'{row}.student_id', week_start_expr(at)
+
+        def condition(scope, scope_id):
+            if scope == 'assignment':
+                checks = [_activity_in_week('submissions', 'submitted_at', student, week,
+                                            item_column='assignment_id', item_id=scope_id)]
+            elif scope == 'class':
+                checks = []
+                if assignment_owner:
+                    checks.append(_activity_in_week('submissions', 'submitted_at', student, week, 'assignments',
+                                                    assignment_owner, scope_id, 'assignment_id'))
+                if quiz_owner:
+                    checks.append(_activity_in_week('quiz_attempts', 'attempted_at', student, week, 'quizzes',
+                                                    quiz_owner, scope_id, 'quiz_id'))
+            else:
+                checks = [_activity_in_week('submissions', 'submitted_at', student, week),
+                          _activity_in_week('quiz_attempts', 'attempted_at', student, week)]
+            return student, f'({" OR ".join(checks)})'
+        return condition
+
+    # Submissions (grading is an UPDATE of the grade column)
+    new_grade = 'NEW.grade' if has_grade else 'NULL'
+    old_grade = 'OLD.grade' if has_grade else 'NULL'
+    _trigger(conn, 'trg_buckets_submission_insert', 'INSERT', 'submissions', 'NEW.submitted_at',
+             scopes('NEW', 'assignments', assignment_owner, 'assignment', 'assignment_id'),
+             ['submissions = submissions + 1']
+             + graded_update('graded_submissions', 'grade_sum', added=new_grade, buckets=False),
+             student='NEW.student_id')
+    if has_grade:
+        _trigger(conn, 'trg_buckets_submission_grade', 'UPDATE OF grade', 'submissions', 'NEW.submitted_at',
+                 scopes('NEW', 'assignments', assignment_owner, 'assignment', 'assignment_id'),
+                 graded_update('graded_submissions', 'grade_sum', added=new_grade, removed=old_grade,
+                               buckets=False))
+    _trigger(conn, 'trg_buckets_submission_delete', 'DELETE', 'submissions', 'OLD.submitted_at',
+             scopes('OLD', 'assignments', assignment_owner, 'assignment', 'assignment_id'),
+             ['submissions = submissions - 1']
+             + graded_update('graded_submissions', 'grade_sum', removed=old_grade, buckets=False),
+             remaining=remaining('OLD', 'OLD.submitted_at'))
+
+    # Quiz attempts
+    _trigger(conn, 'trg_buckets_quiz_attempt_insert', 'INSERT', 'quiz_attempts', 'NEW.attempted_at',
+             scopes('NEW', 'quizzes', quiz_owner, item_column='quiz_id'),
+             ['quiz_attempts = quiz_attempts + 1', _passes(added='NEW.score')]
+             + graded_update('quiz_scored', 'quiz_score_sum', added='NEW.score', buckets=False),
+             student='NEW.student_id')
+    _trigger(conn, 'trg_buckets_quiz_attempt_score', 'UPDATE OF score', 'quiz_attempts', 'NEW.attempted_at',
+             scopes('NEW', 'quizzes', quiz_owner, item_column='quiz_id'),
+             [_passes(added='NEW.score', removed='OLD.score')]
+             + graded_update('quiz_scored', 'quiz_score_sum', added='NEW.score', removed='OLD.score',
+                             buckets=False))
+    _trigger(conn, 'trg_buckets_quiz_attempt_delete', 'DELETE', 'quiz_attempts', 'OLD.attempted_at',
+             scopes('OLD', 'quizzes', quiz_owner, item_column='quiz_id'),
+             ['quiz_attempts = quiz_attempts - 1', _passes(removed='OLD.score')]
+             + graded_update('quiz_scored', 'quiz_score_sum', removed='OLD.score', buckets=False),
+             remaining=remaining('OLD', 'OLD.attempted_at'))
+
+    # Reflections count towards the portal and the student only
+    _trigger(conn, 'trg_buckets_reflection_insert', 'INSERT', 'reflections', 'NEW.created_at',
+             [('portal', PORTAL_ID), ('student', 'NEW.student_id')], ['reflections = reflections + 1'])
+    _trigger(conn, 'trg_buckets_reflection_delete', 'DELETE', 'reflections', 'OLD.created_at',
+             [('portal', PORTAL_ID), ('student', 'OLD.student_id')], ['reflections = reflections - 1'])
+
+
+def rebuild_buckets(conn, has_grade=True, assignment_owner='teacher_id', quiz_owner='teacher_id'):
+    """Recompute every daily bucket and weekly membership from the source tables"""
+    grade = 's.grade' if has_grade else 'NULL'
+    class_submission = (f"SELECT 'class', a.{assignment_owner}, s.student_id, s.submitted_at, 'submission', {grade} "
+                        f"FROM submissions s JOIN assignments a ON a.id = s.assignment_id "
+                        f"WHERE a.{assignment_owner} IS NOT NULL UNION ALL" if assignment_owner else '')
+    class_quiz = (f"SELECT 'class', q.{quiz_owner}, qa.student_id, qa.attempted_at, 'quiz', qa.score "
+                  f"FROM quiz_attempts qa JOIN quizzes q ON q.id = qa.quiz_id "
+                  f"WHERE q.{quiz_owner} IS NOT NULL UNION ALL" if quiz_owner else '')
+    events = f'''
+        events AS (
+            SELECT scope, scope_id, student_id, date(at) AS day, {week_start_expr('at')} AS week, kind, value
+            FROM (
+                SELECT 'portal' AS scope, {PORTAL_ID} AS scope_id, s.student_id, s.submitted_at AS at,
+                       'submission' AS kind, {grade} AS value FROM submissions s UNION ALL
+                SELECT 'student', s.student_id, s.student_id, s.submitted_at, 'submission', {grade}
+                FROM submissions s UNION ALL
+                SELECT 'assignment', s.assignment_id, s.student_id, s.submitted_at, 'submission', {grade}
+                FROM submissions s UNION ALL
+                {class_submission}
+                SELECT 'portal', {PORTAL_ID}, qa.student_id, qa.attempted_at, 'quiz', qa.score
+                FROM quiz_attempts qa UNION ALL
+                SELECT 'student', qa.student_id, qa.student_id, qa.attempted_at, 'quiz', qa.score
+                FROM quiz_attempts qa UNION ALL
+                {class_quiz}
+                SELECT 'portal', {PORTAL_ID}, r.student_id, r.created_at, 'reflection', NULL
+                FROM reflections r UNION ALL
+                SELECT 'student', r.student_id, r.student_id, r.created_at, 'reflection', NULL
+                FROM reflections r
+            )
+            WHERE at IS NOT NULL AND scope_id IS NOT NULL
+        )
+    '''
+    conn.execute(f'DELETE FROM {BUCKET_TABLE}')
+    conn.execute(f'DELETE FROM {MEMBER_TABLE}')
+    conn.execute(f'''
+        WITH {events},
+        first_seen AS (
+            SELECT scope, scope_id, MIN(day) AS day
+            FROM events
+            WHERE kind != 'reflection' AND student_id IS NOT NULL
+            GROUP BY scope, scope_id, week, student_id
+        ),
+        first_counts AS (
+            SELECT scope, scope_id, day, COUNT(*) AS active_students
+            FROM first_seen
+            GROUP BY scope, scope_id, day
+        ),
+        days AS (
+            SELECT
+                scope, scope_id, day, MIN(week) AS week,
+                SUM(kind = 'submission') AS submissions,
+                SUM(kind = 'submission' AND value IS NOT NULL) AS graded_submissions,
+                TOTAL(CASE WHEN kind = 'submission' THEN value END) AS grade_sum,
+                SUM(kind = 'quiz') AS quiz_attempts,
+                SUM(kind = 'quiz' AND value IS NOT NULL) AS quiz_scored,
+                TOTAL(CASE WHEN kind = 'quiz' THEN value END) AS quiz_score_sum,
+                SUM(kind = 'quiz' AND value >= {PASS_MARK}) AS quiz_passes,
+                SUM(kind = 'reflection') AS reflections
+            FROM events
+            GROUP BY scope, scope_id, day
+        )
+        INSERT INTO {BUCKET_TABLE} (scope, scope_id, bucket_start, granularity, week_start, {", ".join(COUNTERS)})
+        SELECT
+            days.scope, days.scope_id, days.day, 'day', days.week,
+            submissions, graded_submissions, grade_sum, quiz_attempts, quiz_scored, quiz_score_sum,
+            quiz_passes, reflections, COALESCE(first_counts.active_students, 0)
+        FROM days
+        LEFT JOIN first_counts USING (scope, scope_id, day)
+    ''')
+    conn.execute(f'''
+        WITH {events}
+        INSERT OR IGNORE INTO {MEMBER_TABLE} (scope, scope_id, week_start, student_id)
+        SELECT DISTINCT scope, scope_id, week, student_id
+        FROM events
+        WHERE kind != 'reflection' AND student_id IS NOT NULL
+    ''')
+
+
+def compact_buckets(conn, after_days=COMPACT_AFTER_DAYS, member_retention_weeks=MEMBER_RETENTION_WEEKS, today=None):
+    """Fold daily buckets of closed weeks into weekly buckets
+
+    Weeks that started more than after_days ago are compacted. Events that
+    arrive late for a compacted week land in a new daily bucket and are
+    folded in on the next run, so the totals stay exact. Weekly membership
+    older than member_retention_weeks is pruned; a student first seen in
+    such an old week after pruning is counted as active again.
+    The caller commits. Returns (daily buckets folded, memberships pruned).
+    """
+    today = today or date.today()
+    horizon = week_start(today - timedelta(days=after_days)).isoformat()
+    member_horizon = week_start(today - timedelta(weeks=member_retention_weeks)).isoformat()
+    sums = ', '.join(f'SUM({column})' for column in COUNTERS)
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in COUNTERS)
+
+    conn.execute(f'''
+        INSERT INTO {BUCKET_TABLE} (scope, scope_id, bucket_start, granularity, week_start, {", ".join(COUNTERS)})
+        SELECT scope, scope_id, week_start, 'week', week_start, {sums}
+        FROM {BUCKET_TABLE}
+        WHERE granularity = 'day' AND week_start < ?
+        GROUP BY scope, scope_id, week_start
+        ON CONFLICT (scope, scope_id, bucket_start, granularity) DO UPDATE SET {updates}
+    ''', (horizon,))
+    folded = conn.execute(
+        f"DELETE FROM {BUCKET_TABLE} WHERE granularity = 'day' AND week_start < ?", (horizon,)
+    ).rowcount
+    # Weeks whose events were all deleted again
+    conn.execute(f"DELETE FROM {BUCKET_TABLE} WHERE granularity = 'week' AND {' AND '.join(f'{column} = 0' for column in COUNTERS)}")
+    pruned = conn.execute(f'DELETE FROM {MEMBER_TABLE} WHERE week_start < ?', (member_horizon,)).rowcount
+    return folded, pruned
+
+
+def weekly_series(conn, scope, scope_ids, since=None):
+    """Weekly totals per scope id as {scope_id: [week rows]}
+
+    Reads daily and weekly buckets alike, so results do not depend on when
+    compaction last ran. The series starts at the week containing since.
+    Each row also carries a 3-week moving average and the week-over-week
+    change of the average score.
+    """
+    scope_ids = list(scope_ids)
+    placeholders = ','.join('?' * len(scope_ids))
+    since_clause = f'AND bucket_start >= {week_start_expr("?")}' if since else ''
+    sums = ', '.join(f'SUM({column}) AS {column}' for column in COUNTERS)
+    rows = conn.execute(f'''
+        WITH weeks AS (
+            SELECT scope_id, week_start, {sums}
+            FROM {BUCKET_TABLE}
+            WHERE scope = ? AND scope_id IN ({placeholders}) {since_clause}
+            GROUP BY scope_id, week_start
+        ),
+        scored AS (
+            SELECT weeks.*,
+                   (grade_sum + quiz_score_sum) / NULLIF(graded_submissions + quiz_scored, 0) AS average_score
+            FROM weeks
+        )
+        SELECT
+            scored.*,
+            AVG(average_score) OVER (
+                PARTITION BY scope_id ORDER BY week_start ROWS BETWEEN 2 PRECEDING AND CURRENT ROW
+            ) AS moving_average,
+            average_score - LAG(average_score) OVER (PARTITION BY scope_id ORDER BY week_start) AS score_change
+        FROM scored
+        ORDER BY scope_id, week_start
+    ''', [scope] + scope_ids + ([since] if since else [])).fetchall()
+
+    series = {scope_id: [] for scope_id in scope_ids}
+    for row in rows:
+        series[row['scope_id']].append(dict(row))
+    return series
+
+
+def fill_weeks(rows, weeks, today=None):
+    """Pad a weekly series to the last `weeks` weeks, ending with the current one"""
+    current = week_start(today or date.today())
+    by_week = {row['week_start']: row for row in rows}
+    filled = []
+    for offset in range(weeks - 1, -1, -1):
+        start = (current - timedelta(weeks=offset)).isoformat()
+        row = by_week.get(start)
+        if row is None:
+            row = {column: 0 for column in COUNTERS}
+            row.update({"week_start": start, "average_score": None})
+        filled.append(row)
+    return filled
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+
+def start_compactor(interval=COMPACT_INTERVAL):
+    """Compact buckets periodically in a background thread"""
+    global _compactor
+    if interval <= 0:
+        return None
+    with _compactor_lock:
+        if _compactor is not None:
+            return _compactor
+
+        def run():
+            while True:
+                time.sleep(interval)
+                conn = get_db_connection()
+                try:
+                    compact_buckets(conn)
+                    conn.commit()
+                except Exception as e:
+                    print(f"⚠️ Bucket compaction failed: {e}")
+                finally:
+                    conn.close()
+
+        _compactor = threading.Thread(target=run, name='bucket-compactor', daemon=True)
+        _compactor.start()
+        return _compactor
+
+
+if __name__ == '__main__':
+    from migrations import bucket_schema_options
+
+    conn = get_db_connection()
+    try:
+        if '--rebuild' in sys.argv:
+            rebuild_buckets(conn, **bucket_schema_options(conn))
+            print("✅ Activity buckets rebuilt")
+        folded, pruned = compact_buckets(conn)
+        conn.commit()
+        print(f"✅ Folded {folded} daily bucket(s), pruned {pruned} membership row(s)")
+    finally:
+        conn.close()
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Analytics Cache for Academic Portal
+Bounded LRU cache with TTL expiry, targeted invalidation and single-flight recomputation
+
+Storage is pluggable: the default in-process backend is an LRU dict, and the
+SQLite backend shares entries (and invalidations) between gunicorn workers.
+Invalidating a key or a prefix bumps the generation of the keys it covers,
+and a computed value is only stored if its key's generation has not moved
+since the computation started, so a result read before an invalidation in
+any worker is dropped while results for other keys are still cached.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# Cache settings
+CACHE_BACKEND = os.environ.get('ANALYTICS_CACHE_BACKEND', 'memory')  # memory | sqlite
+CACHE_PATH = os.environ.get(
+    'ANALYTICS_CACHE_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'instance', 'analytics_cache.db')
+)
+CACHE_MAX_SIZE = int(os.environ.get('ANALYTICS_CACHE_MAX_SIZE', 2000))
+CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 300))  # seconds
+CACHE_STALE_TTL = float(os.environ.get('ANALYTICS_CACHE_STALE_TTL', 0))  # seconds, 0 disables
+FLIGHT_TIMEOUT = float(os.environ.get('ANALYTICS_CACHE_FLIGHT_TIMEOUT', 30))  # seconds
+
+# Keys share this many generation counters, so tracking them takes bounded
+# space; invalidating a key occasionally also drops an in-flight result for
+# another key in the same slot, which only costs a recomputation
+GENERATION_SLOTS = 4096
+
+
+def generation_slot(key):
+    """Generation counter a key belongs to (stable across processes)"""
+    return f'key:{zlib.crc32(key.encode()) % GENERATION_SLOTS}'
+
+
+# Callbacks run on every lookup as listener(key, outcome), where outcome is
+# 'hit', 'stale', 'coalesced' or 'miss'; used for per-request metrics
+CACHE_LISTENERS = []
+
+
+def add_cache_listener(listener):
+    """Register a callback for cache lookups"""
+    if listener not in CACHE_LISTENERS:
+        CACHE_LISTENERS.append(listener)
+    return listener
+
+
+def _notify_lookup(key, outcome):
+    for listener in CACHE_LISTENERS:
+        try:
+            listener(key, outcome)
+        except Exception as e:
+            print(f"⚠️ Cache listener failed: {e}")
+
+
+class CacheBackend:
+    """Storage interface used by AnalyticsCache
+
+    Entries are (value, expires_at) pairs, with expires_at measured on the
+    backend's clock(). Keys are strings so they can be shared across processes.
+    A key's generation is its slot's counter plus the counters of every
+    invalidated prefix it starts with, so it grows whenever the key is
+    invalidated either way.
+    """
+
+    def clock(self):
+        return time.monotonic()
+
+    def generation(self, key):
+        """Current generation of a key"""
+        raise NotImplementedError
+
+    def bump_generation(self, key):
+        """Move a key's generation on"""
+        raise NotImplementedError
+
+    def bump_prefix_generation(self, prefix):
+        """Move the generation of every key starting with prefix on"""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return (value, expires_at) or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, expires_at, generation=None):
+        """Store an entry and return how many entries were evicted
+
+        With a generation, the entry is only stored if the key is still at it.
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Drop one entry and return whether it existed"""
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        """Drop every entry whose key starts with prefix and return the count"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU storage"""
+
+    def __init__(self, max_size=CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._slot_generations = {}
+        self._prefix_generations = {}
+
+    def generation(self, key):
+        return self._slot_generations.get(generation_slot(key), 0) + sum(
+            count for prefix, count in self._prefix_generations.items() if key.startswith(prefix)
+        )
+
+    def bump_generation(self, key):
+        slot = generation_slot(key)
+        self._slot_generations[slot] = self._slot_generations.get(slot, 0) + 1
+
+    def bump_prefix_generation(self, prefix):
+        self._prefix_generations[prefix] = self._prefix_generations.get(prefix, 0) + 1
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, value, expires_at, generation=None):
+        if generation is not None and generation != self.generation(key):
+            return 0
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key):
+        return self._entries.pop(key, None) is not None
+
+    def delete_prefix(self, prefix):
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache storage in a local SQLite file shared by every worker on the host
+
+    Values are stored as JSON. Expiry uses wall-clock time since monotonic
+    clocks are not comparable between processes. When the table outgrows
+    max_size, the entries closest to expiry are evicted first. Generation
+    counters are rows in cache_generations, so an invalidation in one worker
+    also keeps the computations in flight in the others from storing what
+    they read before it.
+    """
+
+    EVICT_EVERY = 100  # sets between size checks
+
+    def __init__(self, path=CACHE_PATH, max_size=CACHE_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)')
+        # scope is 'key:<slot>' or 'prefix:<prefix>'
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                scope TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+
+    def _conn(self):
+        """One autocommit connection per thread/greenlet"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute('PRAGMA busy_timeout = 5000')
+            self._local.conn = conn
+        return conn
+
+    def clock(self):
+        return time.time()
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    # Generation of the key bound to the two parameters (slot, key)
+    GENERATION_SQL = '''
+        SELECT COALESCE(SUM(value), 0) FROM cache_generations
+        WHERE scope = ? OR (scope >= 'prefix:' AND scope < 'prefix;'
+                            AND substr(?, 1, length(scope) - 7) = substr(scope, 8))
+    '''
+
+    def generation(self, key):
+        return self._conn().execute(self.GENERATION_SQL, (generation_slot(key), key)).fetchone()[0]
+
+    def _bump(self, scope):
+        self._conn().execute('''
+            INSERT INTO cache_generations (scope, value) VALUES (?, 1)
+            ON CONFLICT (scope) DO UPDATE SET value = value + 1
+        ''', (scope,))
+
+    def bump_generation(self, key):
+        self._bump(generation_slot(key))
+
+    def bump_prefix_generation(self, prefix):
+        self._bump(f'prefix:{prefix}')
+
+    def set(self, key, value, expires_at, generation=None):
+        conn = self._conn()
+        params = (key, json.dumps(value, default=str), expires_at)
+        if generation is None:
+            conn.execute('INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)', params)
+        else:
+            # Checked and written in one statement so no invalidation can land in between
+            cursor = conn.execute(f'''
+                INSERT OR REPLACE INTO cache_entries (key, value, expires_at)
+                SELECT ?, ?, ? WHERE ({self.GENERATION_SQL}) = ?
+            ''', params + (generation_slot(key), key, generation))
+            if cursor.rowcount < 1:
+                return 0
+        self._sets += 1
+        if self._sets % self.EVICT_EVERY:
+            return 0
+        # Expired rows sort first, then the ones closest to expiry
+        cursor = conn.execute('''
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM cache_entries ORDER BY expires_at
+                LIMIT MAX(0, (SELECT COUNT(*) FROM cache_entries) - ?)
+            )
+        ''', (self.max_size,))
+        return max(cursor.rowcount, 0)
+
+    def delete(self, key):
+        return self._conn().execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount > 0
+
+    def delete_prefix(self, prefix):
+        return self._conn().execute(
+            'DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+        ).rowcount
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache_entries')
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+def create_backend(name=CACHE_BACKEND, max_size=CACHE_MAX_SIZE):
+    """Build a cache backend from its configured name"""
+    if name == 'memory':
+        return MemoryBackend(max_size)
+    if name == 'sqlite':
+        return SQLiteBackend(CACHE_PATH, max_size)
+    raise ValueError(f"Unknown analytics cache backend: {name}")
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class AnalyticsCache:
+    """Thread-safe TTL cache over a pluggable storage backend
+
+    get_or_compute() coalesces concurrent misses for the same key into one
+    computation. With stale_ttl > 0, an expired entry keeps being served for
+    that long while a single background refresh recomputes it. Coalescing is
+    per process; with the SQLite backend the computed result is then shared
+    with every other worker.
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._backend = backend if backend is not None else create_backend(max_size=max_size)
+        self._flights = {}  # key -> _Flight
+        self._lock = threading.RLock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def _lookup(self, key):
+        """Return (value, state) where state is 'fresh', 'stale' or None"""
+        entry = self._backend.get(key)
+        if entry is None:
+            return None, None
+        value, expires_at = entry
+        now = self._backend.clock()
+        if now < expires_at:
+            return value, 'fresh'
+        if now < expires_at + self.stale_ttl:
+            return value, 'stale'
+        self._backend.delete(key)
+        self._stats["expirations"] += 1
+        return None, None
+
+    def get(self, key, default=None):
+        """Get a live entry and mark it as recently used"""
+        with self._lock:
+            value, state = self._lookup(key)
+            if state != 'fresh':
+                self._stats["misses"] += 1
+                _notify_lookup(key, 'miss')
+                return default
+            self._stats["hits"] += 1
+            _notify_lookup(key, 'hit')
+            return value
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Get an entry, running compute() once for all concurrent misses
+
+        A None result is returned to every waiter but not cached.
+        """
+        with self._lock:
+            value, state = self._lookup(key)
+            if state == 'fresh':
+                self._stats["hits"] += 1
+                _notify_lookup(key, 'hit')
+                return value
+
+            flight = self._flights.get(key)
+            if state == 'stale':
+                self._stats["stale_hits"] += 1
+                _notify_lookup(key, 'stale')
+                if flight is None:
+                    self._stats["refreshes"] += 1
+                    flight = self._start_flight(key)
+                    threading.Thread(target=self._run_flight,
+                                     args=(key, flight, compute, ttl, self._backend.generation(key)),
+                                     name='analytics-refresh', daemon=True).start()
+                return value
+
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                _notify_lookup(key, 'coalesced')
+                leader = False
+            else:
+                self._stats["misses"] += 1
+                _notify_lookup(key, 'miss')
+                flight = self._start_flight(key)
+                leader = True
+            generation = self._backend.generation(key)
+
+        if leader:
+            self._run_flight(key, flight, compute, ttl, generation)
+        elif not flight.done.wait(FLIGHT_TIMEOUT):
+            raise TimeoutError(f"Timed out waiting for cache key {key!r} to be computed")
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def get_or_compute_many(self, keys, compute_missing, ttl=None):
+        """Get several entries, computing every miss with one compute_missing(missing_keys) call
+
+        compute_missing returns {key: value}; keys it leaves out or maps to
+        None are neither cached nor returned. Misses are not coalesced with
+        other callers, and a result is not stored if its key was
+        invalidated while it was computed.
+        """
+        found = {}
+        missing = {}  # key -> generation before computing
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                value, state = self._lookup(key)
+                if state == 'fresh':
+                    self._stats["hits"] += 1
+                    _notify_lookup(key, 'hit')
+                    found[key] = value
+                else:
+                    self._stats["misses"] += 1
+                    _notify_lookup(key, 'miss')
+                    missing[key] = self._backend.generation(key)
+
+        if missing:
+            computed = compute_missing(list(missing))
+            with self._lock:
+                for key, generation in missing.items():
+                    value = computed.get(key)
+                    if value is not None:
+                        found[key] = value
+                        self.set(key, value, ttl, generation)
+        return found
+
+    def _start_flight(self, key):
+        flight = _Flight()
+        self._flights[key] = flight
+        return flight
+
+    def _run_flight(self, key, flight, compute, ttl, generation):
+        """Compute a value, store it unless its key was invalidated meanwhile, and wake the waiters"""
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if flight.error is None and flight.value is not None:
+                self.set(key, flight.value, ttl, generation)
+        flight.done.set()
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store an entry, evicting old ones when the backend is full
+
+        Pass the key's generation read before computing the value to drop
+        it if the key was invalidated since, in this worker or another.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._stats["evictions"] += self._backend.set(key, value, self._backend.clock() + ttl, generation)
+
+    def invalidate(self, key):
+        """Drop one entry"""
+        with self._lock:
+            self._backend.bump_generation(key)
+            if self._backend.delete(key):
+                self._stats["invalidations"] += 1
+                return True
+            return False
+
+    def invalidate_prefix(self, prefix):
+        """Drop every entry whose key starts with prefix"""
+        with self._lock:
+            self._backend.bump_prefix_generation(prefix)
+            count = self._backend.delete_prefix(prefix)
+            self._stats["invalidations"] += count
+            return count
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._backend.bump_prefix_generation('')
+            self._backend.clear()
+
+    def __len__(self):
+        return len(self._backend)
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "backend": type(self._backend).__name__,
+                "size": len(self._backend),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "in_flight": len(self._flights),
+                "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0
+            })
+            return stats
+
+
+def student_key(student_id):
+    """Cache key for one student's analytics"""
+    return f'student:{student_id}'
+
+
+def class_key(teacher_id, timeframe):
+    """Cache key for class-wide analytics (teacher_id None = whole portal)"""
+    return f'class:{"all" if teacher_id is None else teacher_id}:{timeframe}'
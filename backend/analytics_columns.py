@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Columnar Score Statistics for Academic Portal
+Scores and timestamps held in flat float buffers for whole-column statistics
+
+Values are copied once out of the sqlite3.Row objects into array('d')
+buffers (NumPy arrays when NumPy is installed), then the distribution,
+mean, min/max, percentiles and rolling averages are computed over the
+whole column: one sort plus bisection for the histogram and percentiles,
+and prefix sums for the rolling averages.
+"""
+
+import itertools
+import math
+import os
+from array import array
+from bisect import bisect_left
+
+from analytics_rollup import GRADE_BUCKETS
+from epoch_columns import to_epoch
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; array('d') covers the same API
+    numpy = None
+
+USE_NUMPY = numpy is not None and os.environ.get('ANALYTICS_USE_NUMPY', '1') != '0'
+
+# Percentiles reported by summary()
+SUMMARY_PERCENTILES = (25, 50, 75, 90)
+
+
+class ScoreColumns:
+    """A column of scores with optional parallel timestamps (epoch seconds)
+
+    Missing scores are dropped on the way in. When timestamps are given the
+    column is sorted into time order, oldest first, for the rolling
+    averages; without them the input order is kept.
+    """
+
+    def __init__(self, scores=(), timestamps=None):
+        if timestamps is None:
+            pairs = [(0, float(score)) for score in scores if score is not None]
+        else:
+            pairs = sorted(
+                (to_epoch(at) or 0, float(score))
+                for score, at in zip(scores, timestamps) if score is not None
+            )
+        self.timestamps = array('d', (at for at, _ in pairs))
+        self.scores = array('d', (score for _, score in pairs))
+        self._sorted = None
+
+    @classmethod
+    def from_rows(cls, rows, score_key, time_key=None):
+        """Build a column from query rows (sqlite3.Row or dict)"""
+        rows = list(rows)
+        scores = [row[score_key] for row in rows]
+        timestamps = [row[time_key] for row in rows] if time_key else None
+        return cls(scores, timestamps)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _sorted_scores(self):
+        if self._sorted is None:
+            if USE_NUMPY:
+                self._sorted = numpy.sort(numpy.frombuffer(self.scores, dtype=numpy.float64))
+            else:
+                self._sorted = array('d', sorted(self.scores))
+        return self._sorted
+
+    def mean(self):
+        if not self.scores:
+            return None
+        if USE_NUMPY:
+            return float(numpy.frombuffer(self.scores, dtype=numpy.float64).mean())
+        return math.fsum(self.scores) / len(self.scores)
+
+    def minimum(self):
+        return float(self._sorted_scores()[0]) if self.scores else None
+
+    def maximum(self):
+        return float(self._sorted_scores()[-1]) if self.scores else None
+
+    def percentile(self, q):
+        """Percentile q (0-100) with linear interpolation, like numpy.percentile"""
+        if not self.scores:
+            return None
+        ordered = self._sorted_scores()
+        if USE_NUMPY:
+            return float(numpy.percentile(ordered, q))
+        position = (len(ordered) - 1) * q / 100
+        low = math.floor(position)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    def _count_below(self, bound):
+        ordered = self._sorted_scores()
+        if USE_NUMPY:
+            return int(numpy.searchsorted(ordered, bound, side='left'))
+        return bisect_left(ordered, bound)
+
+    def distribution(self):
+        """Counts per GRADE_BUCKETS bucket, [A, B, C, D, F]"""
+        counts = []
+        for _, low, high in GRADE_BUCKETS:
+            start = self._count_below(low) if low is not None else 0
+            end = self._count_below(high) if high is not None else len(self.scores)
+            counts.append(end - start)
+        return counts
+
+    def rolling_average(self, window):
+        """Trailing mean over the last `window` scores at each position"""
+        if not self.scores:
+            return []
+        if USE_NUMPY:
+            sums = numpy.concatenate(([0.0], numpy.cumsum(numpy.frombuffer(self.scores, dtype=numpy.float64))))
+            ends = numpy.arange(1, len(self.scores) + 1)
+            starts = numpy.maximum(ends - window, 0)
+            return ((sums[ends] - sums[starts]) / (ends - starts)).tolist()
+        sums = array('d', itertools.chain((0.0,), itertools.accumulate(self.scores)))
+        return [
+            (sums[end] - sums[max(end - window, 0)]) / min(end, window)
+            for end in range(1, len(sums))
+        ]
+
+    def summary(self, digits=1):
+        """Count, mean, min/max and SUMMARY_PERCENTILES, rounded for payloads"""
+        def rounded(value):
+            return round(value, digits) if value is not None else None
+
+        stats = {
+            "count": len(self.scores),
+            "mean": rounded(self.mean()),
+            "min": rounded(self.minimum()),
+            "max": rounded(self.maximum())
+        }
+        for q in SUMMARY_PERCENTILES:
+            stats[f"p{q}"] = rounded(self.percentile(q))
+        return stats
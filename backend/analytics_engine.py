@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Class Analytics Engine for Academic Portal
+Aggregates submissions, quiz attempts and users in SQL for the dashboard endpoints
+
+Everything is computed with GROUP BY and window functions so the work stays
+inside SQLite; Python only reshapes the handful of aggregate rows that come
+back. Results cover either the whole portal (teacher_id=None) or one
+teacher's assignments and quizzes; like /api/teacher/<id>/students, every
+student counts towards a teacher's class size.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from analytics_buckets import weekly_series as bucket_weekly_series
+from analytics_rollup import GRADE_BUCKETS, PASS_MARK, grade_bucket_case
+from epoch_columns import epoch_days_ago, epoch_expr, to_epoch
+from migrations import table_columns
+
+# Timeframes accepted by the analytics endpoints (days, None = all time)
+TIMEFRAMES = {'7d': 7, '30d': 30, '90d': 90, '1y': 365, 'all': None}
+TIMEFRAME_ALIASES = {'week': '7d', 'month': '30d', 'quarter': '90d', 'year': '1y'}
+
+# Chart labels for the GRADE_BUCKETS histogram
+GRADE_LABELS = ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (Below 60)"]
+
+TOP_STUDENTS = 5
+RECENT_DAYS = 14  # window for the improvement trend
+
+# Activity count thresholds for engagement levels within a timeframe
+HIGH_ENGAGEMENT = 5
+MEDIUM_ENGAGEMENT = 2
+
+
+def normalize_timeframe(timeframe):
+    """Map a timeframe parameter to one of TIMEFRAMES (raises ValueError)"""
+    timeframe = TIMEFRAME_ALIASES.get(timeframe, timeframe or '30d')
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {', '.join(TIMEFRAMES)})")
+    return timeframe
+
+
+def timeframe_start(timeframe, now=None):
+    """Lower bound for a timeframe as a UTC timestamp string, or None for all time"""
+    days = TIMEFRAMES[normalize_timeframe(timeframe)]
+    if days is None:
+        return None
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _first_column(columns, *candidates):
+    """First candidate present in a column set (schema variants name things differently)"""
+    return next((column for column in candidates if column in columns), None)
+
+
+class _Scope:
+    """SQL fragments shared by every query for one (teacher, timeframe)"""
+
+    def __init__(self, conn, teacher_id, since):
+        submission_columns = table_columns(conn, 'submissions')
+        assignment_columns = table_columns(conn, 'assignments')
+        quiz_columns = table_columns(conn, 'quizzes')
+        user_columns = table_columns(conn, 'users')
+
+        self.grade = 's.grade' if 'grade' in submission_columns else 'NULL'
+        deadline = _first_column(assignment_columns, 'deadline', 'due_date')
+        self.deadline = f'a.{deadline}' if deadline else 'NULL'
+        self.user_name = _first_column(user_columns, 'name', 'username') or 'email'
+        self.teacher_id = teacher_id
+        self.since = since
+        self.since_epoch = to_epoch(since)
+
+        # Range filters use the integer epoch columns when the schema has
+        # them; older databases fall back to comparing timestamp strings
+        if 'submitted_epoch' in submission_columns:
+            self.submission_time, self.submission_epoch = 's.submitted_epoch', 's.submitted_epoch'
+        else:
+            self.submission_time, self.submission_epoch = 's.submitted_at', epoch_expr('s.submitted_at')
+        if 'attempted_epoch' in table_columns(conn, 'quiz_attempts'):
+            self.attempt_time, self.attempt_epoch = 'qa.attempted_epoch', 'qa.attempted_epoch'
+        else:
+            self.attempt_time, self.attempt_epoch = 'qa.attempted_at', epoch_expr('qa.attempted_at')
+
+        assignment_owner = _first_column(assignment_columns, 'teacher_id', 'created_by')
+        quiz_owner = _first_column(quiz_columns, 'teacher_id', 'created_by')
+        if teacher_id is not None:
+            self.assignment_filter = f'a.{assignment_owner} = ?' if assignment_owner else '0'
+            self.quiz_filter = f'q.{quiz_owner} = ?' if quiz_owner else '0'
+        else:
+            self.assignment_filter = self.quiz_filter = '1'
+
+    def owner_params(self, clause):
+        return [self.teacher_id] if '?' in clause else []
+
+    def bound(self, column):
+        """The timeframe lower bound in the form a time column compares against"""
+        return self.since_epoch if column.endswith('_epoch') else self.since
+
+    def activity(self):
+        """CTE of scoped submissions and quiz attempts as (student_id, kind, item_id, value, at, at_epoch, due)"""
+        submission_time = f'AND {self.submission_time} >= ?' if self.since else ''
+        attempt_time = f'AND {self.attempt_time} >= ?' if self.since else ''
+        submission_since = [self.bound(self.submission_time)] if self.since else []
+        attempt_since = [self.bound(self.attempt_time)] if self.since else []
+        # CROSS JOIN pins the join order so the timeframe index drives the
+        # scan instead of walking a teacher's whole history per assignment
+        sql = f'''
+            activity AS (
+                SELECT s.student_id, 'submission' AS kind, s.assignment_id AS item_id,
+                       {self.grade} AS value, s.submitted_at AS at,
+                       {self.submission_epoch} AS at_epoch, {self.deadline} AS due
+                FROM submissions s
+                CROSS JOIN assignments a ON a.id = s.assignment_id
+                WHERE {self.assignment_filter} {submission_time}
+                UNION ALL
+                SELECT qa.student_id, 'quiz', qa.quiz_id, qa.score, qa.attempted_at, {self.attempt_epoch}, NULL
+                FROM quiz_attempts qa
+                CROSS JOIN quizzes q ON q.id = qa.quiz_id
+                WHERE {self.quiz_filter} {attempt_time}
+            )
+        '''
+        params = (self.owner_params(self.assignment_filter) + submission_since
+                  + self.owner_params(self.quiz_filter) + attempt_since)
+        return sql, params
+
+
+def totals(conn, scope):
+    """Class size and the number of assignments and quizzes in scope"""
+    row = conn.execute(f'''
+        SELECT
+            (SELECT COUNT(*) FROM users WHERE role = 'student') AS total_students,
+            (SELECT COUNT(*) FROM assignments a WHERE {scope.assignment_filter}) AS total_assignments,
+            (SELECT COUNT(*) FROM quizzes q WHERE {scope.quiz_filter}) AS total_quizzes
+    ''', scope.owner_params(scope.assignment_filter) + scope.owner_params(scope.quiz_filter)).fetchone()
+    return dict(row)
+
+
+def item_stats(conn, scope):
+    """Per-assignment and per-quiz aggregates for the timeframe"""
+    activity, params = scope.activity()
+    rows = conn.execute(f'''
+        WITH {activity},
+        items AS (
+            SELECT
+                kind, item_id,
+                COUNT(*) AS count,
+                COUNT(DISTINCT student_id) AS students,
+                COUNT(value) AS scored,
+                TOTAL(value) AS value_sum,
+                SUM(value >= {PASS_MARK}) AS passes,
+                SUM(at <= due) AS on_time,
+                SUM(at > due) AS late
+            FROM activity
+            GROUP BY kind, item_id
+        )
+        SELECT
+            items.*,
+            COALESCE(a.title, q.title) AS title,
+            {scope.deadline} AS due_date,
+            CASE WHEN items.scored THEN items.value_sum / items.scored END AS average
+        FROM items
+        LEFT JOIN assignments a ON items.kind = 'submission' AND a.id = items.item_id
+        LEFT JOIN quizzes q ON items.kind = 'quiz' AND q.id = items.item_id
+        ORDER BY items.kind, items.students DESC, average DESC
+    ''', params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def grade_distribution(conn, scope):
+    """Graded submissions per bucket [A, B, C, D, F] for the timeframe"""
+    activity, params = scope.activity()
+    counts = dict(conn.execute(f'''
+        WITH {activity}
+        SELECT {grade_bucket_case('value')} AS bucket, COUNT(*)
+        FROM activity
+        WHERE kind = 'submission' AND value IS NOT NULL
+        GROUP BY bucket
+    ''', params).fetchall())
+    return [counts.get(column, 0) for column, _, _ in GRADE_BUCKETS]
+
+
+def overview(totals_row, items, active_students, distribution):
+    """Class-wide counts and averages folded from the per-item rows"""
+    assignments = [item for item in items if item["kind"] == 'submission']
+    quizzes = [item for item in items if item["kind"] == 'quiz']
+
+    def total(rows, column):
+        return sum(row[column] or 0 for row in rows)
+
+    graded = total(assignments, "scored")
+    quiz_scored = total(quizzes, "scored")
+    return {
+        **totals_row,
+        "active_students": active_students,
+        "submissions": total(assignments, "count"),
+        "graded_submissions": graded,
+        "quiz_attempts": total(quizzes, "count"),
+        "quiz_passes": total(quizzes, "passes"),
+        "completed_assignments": len(assignments),
+        "attempted_quizzes": len(quizzes),
+        "on_time_submissions": total(assignments, "on_time"),
+        "late_submissions": total(assignments, "late"),
+        "average_grade": total(assignments, "value_sum") / graded if graded else None,
+        "average_quiz_score": total(quizzes, "value_sum") / quiz_scored if quiz_scored else None,
+        "average_score": (total(items, "value_sum") / (graded + quiz_scored)) if graded + quiz_scored else None,
+        "grade_distribution": distribution
+    }
+
+
+def weekly_series(conn, scope):
+    """Per-week activity for the scope, read from the pre-bucketed activity tables"""
+    if scope.teacher_id is None:
+        bucket_scope, scope_id = 'portal', 0
+    else:
+        bucket_scope, scope_id = 'class', scope.teacher_id
+    return bucket_weekly_series(conn, bucket_scope, [scope_id], scope.since)[scope_id]
+
+
+def student_performance(conn, scope, limit=TOP_STUDENTS, recent_days=RECENT_DAYS):
+    """Top and bottom students plus progress/engagement category counts
+
+    Each student's row is ranked from both ends with window functions; the
+    active student count and category counts are window totals carried on
+    every returned row.
+    """
+    activity, params = scope.activity()
+    recent = epoch_days_ago(recent_days)
+    rows = conn.execute(f'''
+        WITH {activity},
+        students AS (
+            SELECT
+                student_id,
+                COUNT(*) AS activity_count,
+                COUNT(DISTINCT CASE WHEN kind = 'submission' THEN item_id END) AS assignments_completed,
+                SUM(kind = 'quiz') AS quizzes_taken,
+                SUM(kind = 'quiz' AND value < {PASS_MARK}) AS low_quiz_scores,
+                AVG(value) AS overall_score,
+                AVG(CASE WHEN at_epoch >= ? THEN value END) AS recent_score,
+                AVG(CASE WHEN at_epoch < ? THEN value END) AS earlier_score
+            FROM activity
+            WHERE student_id IS NOT NULL
+            GROUP BY student_id
+        ),
+        ranked AS (
+            SELECT
+                students.*,
+                ROW_NUMBER() OVER (ORDER BY overall_score DESC, student_id) AS top_rank,
+                ROW_NUMBER() OVER (ORDER BY overall_score IS NULL, overall_score, student_id) AS bottom_rank,
+                COUNT(*) OVER () AS active_students,
+                SUM(overall_score >= 90) OVER () AS exceeding,
+                SUM(overall_score >= 70 AND overall_score < 90) OVER () AS on_track,
+                SUM(overall_score >= {PASS_MARK} AND overall_score < 70) OVER () AS at_risk,
+                SUM(overall_score < {PASS_MARK}) OVER () AS needs_attention,
+                SUM(activity_count >= {HIGH_ENGAGEMENT}) OVER () AS highly_engaged,
+                SUM(activity_count >= {MEDIUM_ENGAGEMENT} AND activity_count < {HIGH_ENGAGEMENT}) OVER () AS moderately_engaged,
+                SUM(activity_count < {MEDIUM_ENGAGEMENT}) OVER () AS low_engagement
+            FROM students
+        )
+        SELECT ranked.*, u.{scope.user_name} AS name
+        FROM ranked
+        LEFT JOIN users u ON u.id = ranked.student_id
+        WHERE top_rank <= ? OR bottom_rank <= ?
+        ORDER BY top_rank
+    ''', params + [recent, recent, limit, limit]).fetchall()
+
+    categories = ('active_students', 'exceeding', 'on_track', 'at_risk', 'needs_attention',
+                  'highly_engaged', 'moderately_engaged', 'low_engagement')
+    rows = [dict(row) for row in rows]
+    counts = {category: (rows[0][category] or 0) if rows else 0 for category in categories}
+    top = [row for row in rows if row["top_rank"] <= limit and row["overall_score"] is not None]
+    bottom = [row for row in rows if row["bottom_rank"] <= limit and row["overall_score"] is not None
+              and row["overall_score"] < 70]
+    bottom.sort(key=lambda row: row["bottom_rank"])
+    return {"top": top, "bottom": bottom, "counts": counts}
+
+
+def class_analytics(conn, teacher_id=None, timeframe='30d'):
+    """Compute every aggregate the analytics endpoints need for one scope"""
+    timeframe = normalize_timeframe(timeframe)
+    scope = _Scope(conn, teacher_id, timeframe_start(timeframe))
+    items = item_stats(conn, scope)
+    students = student_performance(conn, scope)
+    return {
+        "teacher_id": teacher_id,
+        "timeframe": timeframe,
+        "since": scope.since,
+        "overview": overview(totals(conn, scope), items, students["counts"]["active_students"],
+                             grade_distribution(conn, scope)),
+        "weekly": weekly_series(conn, scope),
+        "students": students,
+        "assignments": [item for item in items if item["kind"] == 'submission'],
+        "quizzes": sorted((item for item in items if item["kind"] == 'quiz'),
+                          key=lambda item: (item["passes"] / item["count"], item["average"] or 0)),
+        "generated_at": datetime.now().isoformat()
+    }
+
+
+def percent(part, whole):
+    """Percentage rounded to one decimal (0 when whole is empty)"""
+    return round(part * 100 / whole, 1) if whole else 0.0
+
+
+def rounded(value, digits=1):
+    """Round an aggregate that may be NULL"""
+    return round(value, digits) if value is not None else 0.0
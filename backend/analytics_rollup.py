@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Per-Student Analytics Rollup for Academic Portal
+Keeps counts, sums and grade buckets per student up to date on every write
+"""
+
+ROLLUP_TABLE = 'student_analytics_rollup'
+
+# Grade buckets shared by the rollup and the analytics payloads (A, B, C, D, F)
+GRADE_BUCKETS = [
+    ('grade_a', 90, None),
+    ('grade_b', 80, 90),
+    ('grade_c', 70, 80),
+    ('grade_d', 60, 70),
+    ('grade_f', None, 60)
+]
+
+# Minimum quiz score counted as a pass
+PASS_MARK = 60
+
+
+def _bucket_expr(value, low, high):
+    """SQL expression that is 1 when value falls in [low, high), else 0"""
+    conditions = [f'{value} IS NOT NULL']
+    if low is not None:
+        conditions.append(f'{value} >= {low}')
+    if high is not None:
+        conditions.append(f'{value} < {high}')
+    return f'({" AND ".join(conditions)})'
+
+
+def grade_bucket_case(value):
+    """SQL CASE expression naming the grade bucket column a value falls in"""
+    whens = [f"WHEN {_bucket_expr(value, low, high)} THEN '{column}'" for column, low, high in GRADE_BUCKETS]
+    return f'CASE {" ".join(whens)} END'
+
+
+def graded_update(count_column, sum_column, added=None, removed=None, buckets=True):
+    """SET clauses for a graded value being added and/or removed
+
+    Each column is assigned once with the combined delta, since SQLite only
+    keeps the last assignment when a column appears twice in one SET.
+    """
+    def delta(term):
+        parts = []
+        if added is not None:
+            parts.append(f'+ {term(added)}')
+        if removed is not None:
+            parts.append(f'- {term(removed)}')
+        return ' '.join(parts)
+
+    clauses = [
+        f'{count_column} = {count_column} {delta(lambda v: f"({v} IS NOT NULL)")}',
+        f'{sum_column} = {sum_column} {delta(lambda v: f"COALESCE({v}, 0)")}'
+    ]
+    if buckets:
+        for column, low, high in GRADE_BUCKETS:
+            clauses.append(f'{column} = {column} {delta(lambda v: _bucket_expr(v, low, high))}')
+    return clauses
+
+
+def _latest(column, table, student):
+    """Subquery for a student's latest remaining timestamp, for delete triggers"""
+    return f'(SELECT MAX({column}) FROM {table} WHERE student_id = {student})'
+
+
+def _trigger(conn, name, event, table, student, set_clauses):
+    """Create a trigger that upserts the rollup row and applies set_clauses"""
+    conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    conn.execute(f'''
+        CREATE TRIGGER {name} AFTER {event} ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO {ROLLUP_TABLE} (student_id) VALUES ({student});
+            UPDATE {ROLLUP_TABLE}
+            SET {", ".join(set_clauses)}, updated_at = CURRENT_TIMESTAMP
+            WHERE student_id = {student};
+        END
+    ''')
+
+
+def create_rollup_schema(conn, has_grade=True):
+    """Create the rollup table and the triggers that maintain it"""
+    bucket_columns = ''.join(f'{column} INTEGER NOT NULL DEFAULT 0,\n' for column, _, _ in GRADE_BUCKETS)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            student_id INTEGER PRIMARY KEY,
+            quiz_attempts INTEGER NOT NULL DEFAULT 0,
+            quiz_scored INTEGER NOT NULL DEFAULT 0,
+            quiz_score_sum REAL NOT NULL DEFAULT 0,
+            submissions INTEGER NOT NULL DEFAULT 0,
+            graded_submissions INTEGER NOT NULL DEFAULT 0,
+            grade_sum REAL NOT NULL DEFAULT 0,
+            {bucket_columns}
+            reflections INTEGER NOT NULL DEFAULT 0,
+            last_quiz_at TIMESTAMP,
+            last_submission_at TIMESTAMP,
+            last_reflection_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Quiz attempts
+    _trigger(conn, 'trg_rollup_quiz_attempt_insert', 'INSERT', 'quiz_attempts', 'NEW.student_id',
+             ['quiz_attempts = quiz_attempts + 1',
+              'last_quiz_at = NULLIF(MAX(COALESCE(last_quiz_at, \'\'), COALESCE(NEW.attempted_at, \'\')), \'\')']
+             + graded_update('quiz_scored', 'quiz_score_sum', added='NEW.score', buckets=False))
+    _trigger(conn, 'trg_rollup_quiz_attempt_score', 'UPDATE OF score', 'quiz_attempts', 'NEW.student_id',
+             graded_update('quiz_scored', 'quiz_score_sum', added='NEW.score', removed='OLD.score',
+                            buckets=False))
+    _trigger(conn, 'trg_rollup_quiz_attempt_delete', 'DELETE', 'quiz_attempts', 'OLD.student_id',
+             ['quiz_attempts = quiz_attempts - 1',
+              f"last_quiz_at = {_latest('attempted_at', 'quiz_attempts', 'OLD.student_id')}"]
+             + graded_update('quiz_scored', 'quiz_score_sum', removed='OLD.score', buckets=False))
+
+    # Submissions (grading is an UPDATE of the grade column)
+    new_grade = 'NEW.grade' if has_grade else 'NULL'
+    old_grade = 'OLD.grade' if has_grade else 'NULL'
+    _trigger(conn, 'trg_rollup_submission_insert', 'INSERT', 'submissions', 'NEW.student_id',
+             ['submissions = submissions + 1',
+              'last_submission_at = NULLIF(MAX(COALESCE(last_submission_at, \'\'), COALESCE(NEW.submitted_at, \'\')), \'\')']
+             + graded_update('graded_submissions', 'grade_sum', added=new_grade))
+    if has_grade:
+        _trigger(conn, 'trg_rollup_submission_grade', 'UPDATE OF grade', 'submissions', 'NEW.student_id',
+                 graded_update('graded_submissions', 'grade_sum', added=new_grade, removed=old_grade))
+    _trigger(conn, 'trg_rollup_submission_delete', 'DELETE', 'submissions', 'OLD.student_id',
+             ['submissions = submissions - 1',
+              f"last_submission_at = {_latest('submitted_at', 'submissions', 'OLD.student_id')}"]
+             + graded_update('graded_submissions', 'grade_sum', removed=old_grade))
+
+    # Reflections
+    _trigger(conn, 'trg_rollup_reflection_insert', 'INSERT', 'reflections', 'NEW.student_id',
+             ['reflections = reflections + 1',
+              'last_reflection_at = NULLIF(MAX(COALESCE(last_reflection_at, \'\'), COALESCE(NEW.created_at, \'\')), \'\')'])
+    _trigger(conn, 'trg_rollup_reflection_delete', 'DELETE', 'reflections', 'OLD.student_id',
+             ['reflections = reflections - 1',
+              f"last_reflection_at = {_latest('created_at', 'reflections', 'OLD.student_id')}"])
+
+
+def rebuild_rollup(conn, has_grade=True):
+    """Recompute every rollup row from the source tables"""
+    grade = 'grade' if has_grade else 'NULL'
+    buckets = ''.join(
+        f"SUM(kind = 'submission' AND {_bucket_expr('value', low, high)}),\n"
+        for _, low, high in GRADE_BUCKETS
+    )
+    conn.execute(f'DELETE FROM {ROLLUP_TABLE}')
+    conn.execute(f'''
+        INSERT INTO {ROLLUP_TABLE} (
+            student_id, quiz_attempts, quiz_scored, quiz_score_sum,
+            submissions, graded_submissions, grade_sum,
+            {", ".join(column for column, _, _ in GRADE_BUCKETS)},
+            reflections, last_quiz_at, last_submission_at, last_reflection_at
+        )
+        SELECT
+            student_id,
+            SUM(kind = 'quiz'),
+            SUM(kind = 'quiz' AND value IS NOT NULL),
+            COALESCE(SUM(CASE WHEN kind = 'quiz' THEN value END), 0),
+            SUM(kind = 'submission'),
+            SUM(kind = 'submission' AND value IS NOT NULL),
+            COALESCE(SUM(CASE WHEN kind = 'submission' THEN value END), 0),
+            {buckets}
+            SUM(kind = 'reflection'),
+            MAX(CASE WHEN kind = 'quiz' THEN at END),
+            MAX(CASE WHEN kind = 'submission' THEN at END),
+            MAX(CASE WHEN kind = 'reflection' THEN at END)
+        FROM (
+            SELECT student_id, 'quiz' AS kind, score AS value, attempted_at AS at FROM quiz_attempts
+            UNION ALL
+            SELECT student_id, 'submission', {grade}, submitted_at FROM submissions
+            UNION ALL
+            SELECT student_id, 'reflection', NULL, created_at FROM reflections
+        )
+        WHERE student_id IS NOT NULL
+        GROUP BY student_id
+    ''')
+
+
+def empty_rollup(student_id):
+    """Rollup values for a student with no activity yet"""
+    row = {
+        "student_id": student_id,
+        "quiz_attempts": 0,
+        "quiz_scored": 0,
+        "quiz_score_sum": 0,
+        "submissions": 0,
+        "graded_submissions": 0,
+        "grade_sum": 0,
+        "reflections": 0,
+        "last_quiz_at": None,
+        "last_submission_at": None,
+        "last_reflection_at": None
+    }
+    for column, _, _ in GRADE_BUCKETS:
+        row[column] = 0
+    return row
+
+
+def get_rollup(conn, student_id):
+    """Read one student's rollup row as a dict"""
+    row = conn.execute(f'SELECT * FROM {ROLLUP_TABLE} WHERE student_id = ?', (student_id,)).fetchone()
+    return dict(row) if row else empty_rollup(student_id)
+
+
+def get_rollups(conn, student_ids):
+    """Read rollup rows for many students as {student_id: dict}"""
+    rollups = {student_id: empty_rollup(student_id) for student_id in student_ids}
+    if student_ids:
+        placeholders = ','.join('?' * len(student_ids))
+        rows = conn.execute(
+            f'SELECT * FROM {ROLLUP_TABLE} WHERE student_id IN ({placeholders})', list(student_ids)
+        ).fetchall()
+        for row in rows:
+            rollups[row['student_id']] = dict(row)
+    return rollups
+
+
+def grade_distribution(rollup):
+    """Grade histogram [A, B, C, D, F] from a rollup row"""
+    return [rollup[column] for column, _, _ in GRADE_BUCKETS]
@@ -6,9 +6,9 @@ Simple server that works with existing database
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-import sqlite3
-import os
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms as socket_rooms
+import json
+import base64
 from datetime import datetime, timedelta
 
 # Initialize Flask app
@@ -18,17 +18,45 @@ app.config['SECRET_KEY'] = 'your-secret-key-here'
 # Enable CORS for all routes
 CORS(app, origins=["http://localhost:3001", "http://localhost:3000"])
 
-# Initialize SocketIO
-socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3001", "http://localhost:3000"])
+# Initialize SocketIO; SOCKETIO_MESSAGE_QUEUE shares emits and rooms across worker processes
+from socket_broker import socketio_options
+socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3001", "http://localhost:3000"],
+                    **socketio_options())
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'education.db')
+# Database path and pooled connections shared by all routes
+from db_pool import get_db_connection, install_pool_teardown
+from migrations import migrate
+from analytics_rollup import get_rollup, get_rollups, grade_distribution as rollup_grade_distribution
+from analytics_buckets import fill_weeks, start_compactor, week_start, weekly_series as bucket_weekly_series
+from analytics_cache import AnalyticsCache, class_key, student_key
+from analytics_engine import (GRADE_LABELS, HIGH_ENGAGEMENT, MEDIUM_ENGAGEMENT, class_analytics,
+                              normalize_timeframe, percent, rounded)
+from analytics_columns import ScoreColumns
+from epoch_columns import epoch_days_ago, to_epoch
+from request_metrics import install_metrics
+from slow_query_log import install_slow_query_log
+from notification_router import ROLES, NotificationRouter, class_room, owner_column, role_room, user_room
+from event_batcher import create_event_batcher
+from notification_outbox import NotificationOutbox
+from notification_counters import UNREAD, mark_all_read, mark_read, unread_count
+from notification_fanout import announcement_payload, class_student_ids, fan_out, role_user_ids
+from notification_scheduler import PRIORITIES, NotificationScheduler
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Return connections a route leaves checked out when its request ends
+install_pool_teardown(app)
+
+# Bring indexes and derived tables up to date, then keep the activity buckets compact
+migrate()
+start_compactor()
+
+# Real-time events go to the user/role/class rooms they address, not to every socket,
+# batched per target over a short window; durable events are logged per room for replay
+notification_outbox = NotificationOutbox()
+notification_router = NotificationRouter(socketio, batcher=create_event_batcher(socketio), outbox=notification_outbox)
+
+# Per-user notifications: urgent ones go out at once, low-priority and rate-limited ones as digests
+notification_scheduler = NotificationScheduler(notification_router)
+notification_scheduler.start()
 
 # API Routes
 @app.route('/')
@@ -44,7 +72,8 @@ def index():
             "submissions": "/api/submissions",
             "quizzes": "/api/quizzes",
             "notifications": "/api/notifications",
-            "reflections": "/api/reflections"
+            "reflections": "/api/reflections",
+            "metrics": "/api/metrics"
         }
     })
 
@@ -253,6 +282,9 @@ def create_reflection():
         reflection_id = cursor.lastrowid
         conn.close()
         
+        # Reflection counts feed the engagement score
+        invalidate_student_analytics(data.get('student_id', 3))
+        
         return jsonify({"id": reflection_id, "message": "Reflection created successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -493,22 +525,151 @@ def get_growth_portfolios():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/notifications', methods=['POST'])
+def create_notification():
+    """Notify one user now or in their next digest, depending on priority"""
+    try:
+        data = request.get_json() or {}
+        if data.get('user_id') is None:
+            return jsonify({"error": "user_id is required"}), 400
+        notification = announcement_payload(data, data.get('sender_id'))
+        priority = data.get('priority')
+        if priority is not None and priority not in PRIORITIES:
+            return jsonify({"error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+        event = data.get('event') or 'new_notification'
+        payload = dict(data.get('data') or {}, notification=notification)
+        priority, status = notification_scheduler.submit(
+            int(data['user_id']), event, notification['title'], notification['message'],
+            notification['type'], payload, priority
+        )
+        return jsonify({"status": status, "priority": priority}), 201 if status == 'sent' else 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/notifications/<int:user_id>', methods=['GET'])
 def get_user_notifications(user_id):
-    """Get notifications for a specific user"""
+    """Get notifications for a specific user (?unread=1 for unread only)"""
     try:
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        unread_filter = f'AND {UNREAD}' if request.args.get('unread') in ('1', 'true') else ''
         conn = get_db_connection()
-        notifications = conn.execute('''
+        notifications = conn.execute(f'''
             SELECT * FROM notifications 
-            WHERE user_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''', (user_id,)).fetchall()
+            WHERE user_id = ? {unread_filter}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', (user_id, limit)).fetchall()
         conn.close()
         return jsonify([dict(notification) for notification in notifications])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/users/<int:user_id>/notifications/unread-count', methods=['GET'])
+def get_unread_notification_count(user_id):
+    """Get a user's unread notification count from the maintained counter"""
+    try:
+        conn = get_db_connection()
+        unread = unread_count(conn, user_id)
+        conn.close()
+        return jsonify({"user_id": user_id, "unread": unread})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def notification_read_response(user_id, conn, updated):
+    """Commit a mark-read, tell the user's other sockets, and report the new count"""
+    conn.commit()
+    unread = unread_count(conn, user_id)
+    conn.close()
+    if updated:
+        notification_router.send('notification_count_update', {"user_id": user_id, "unread": unread})
+    return jsonify({"user_id": user_id, "updated": updated, "unread": unread})
+
+@app.route('/api/users/<int:user_id>/notifications/read', methods=['POST'])
+def mark_notifications_read(user_id):
+    """Mark a list of a user's notifications read in one statement"""
+    try:
+        data = request.get_json() or {}
+        ids = data.get('ids')
+        if not isinstance(ids, list):
+            return jsonify({"error": "ids must be a list of notification ids"}), 400
+        conn = get_db_connection()
+        return notification_read_response(user_id, conn, mark_read(conn, user_id, ids))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/users/<int:user_id>/notifications/read-all', methods=['POST'])
+def mark_all_notifications_read(user_id):
+    """Mark all of a user's notifications read, optionally only up to up_to_id"""
+    try:
+        data = request.get_json(silent=True) or {}
+        conn = get_db_connection()
+        return notification_read_response(user_id, conn, mark_all_read(conn, user_id, data.get('up_to_id')))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def send_announcement(recipients, rooms, notification):
+    """Write one notification per recipient in one transaction, then emit once to the rooms"""
+    conn = get_db_connection()
+    try:
+        recipients = fan_out(conn, recipients, notification['title'], notification['message'], notification['type'])
+        conn.commit()
+    finally:
+        conn.close()
+    if recipients:
+        notification_router.send('new_notification', {"notification": notification, "count": len(recipients)},
+                                 rooms=rooms, immediate=True)
+    return jsonify({"sent": len(recipients), "rooms": rooms, "notification": notification})
+
+@app.route('/api/teacher/notifications/create', methods=['POST'])
+def create_teacher_notifications():
+    """Notify selected students, or the teacher's whole class when student_ids is omitted"""
+    try:
+        data = request.get_json() or {}
+        teacher_id = data.get('teacher_id')
+        notification = announcement_payload(data, teacher_id)
+        student_ids = data.get('student_ids')
+        if student_ids:
+            try:
+                student_ids = list(dict.fromkeys(int(student_id) for student_id in student_ids))
+            except (TypeError, ValueError):
+                return jsonify({"error": "student_ids must be a list of user ids"}), 400
+            return send_announcement(student_ids, [user_room(student_id) for student_id in student_ids], notification)
+        if teacher_id is None:
+            return jsonify({"error": "teacher_id or student_ids is required"}), 400
+        conn = get_db_connection()
+        try:
+            students = class_student_ids(conn, teacher_id)
+        finally:
+            conn.close()
+        return send_announcement(students, [class_room(teacher_id)], notification)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/announcements', methods=['POST'])
+def create_announcement():
+    """School-wide announcement to every user with a role, or to everyone"""
+    try:
+        data = request.get_json() or {}
+        notification = announcement_payload(data, data.get('sender_id'))
+        role = data.get('role')
+        if role is not None and role not in ROLES:
+            return jsonify({"error": f"role must be one of {', '.join(ROLES)}"}), 400
+        conn = get_db_connection()
+        try:
+            users = role_user_ids(conn, role)
+        finally:
+            conn.close()
+        rooms = [role_room(role)] if role else [role_room(name) for name in ROLES]
+        return send_announcement(users, rooms, notification)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/calendar/<int:user_id>', methods=['GET'])
 def get_user_calendar(user_id):
     """Get calendar data for a specific user"""
@@ -754,141 +915,255 @@ def get_all_submissions():
 def get_assignment_stats(assignment_id):
     """Get statistics for a specific assignment"""
     try:
-        # Return sample stats
+        conn = get_db_connection()
+        try:
+            # Totals and the weekly series come from the assignment's activity buckets
+            weekly = bucket_weekly_series(conn, 'assignment', [assignment_id])[assignment_id]
+            extremes = conn.execute('''
+                SELECT MAX(grade) AS highest, MIN(grade) AS lowest, COUNT(DISTINCT student_id) AS students
+                FROM submissions
+                WHERE assignment_id = ?
+            ''', (assignment_id,)).fetchone()
+            total_students = conn.execute('SELECT COUNT(*) FROM users WHERE role = ?', ('student',)).fetchone()[0]
+        finally:
+            conn.close()
+        
+        submissions = sum(week["submissions"] for week in weekly)
+        graded = sum(week["graded_submissions"] for week in weekly)
+        grade_sum = sum(week["grade_sum"] for week in weekly)
         stats = {
             "assignment_id": assignment_id,
-            "total_submissions": 15,
-            "graded_submissions": 12,
-            "average_score": 87.5,
-            "highest_score": 98,
-            "lowest_score": 72,
-            "completion_rate": 80.0
+            "total_submissions": submissions,
+            "graded_submissions": graded,
+            "average_score": round(grade_sum / graded, 1) if graded else 0,
+            "highest_score": extremes["highest"],
+            "lowest_score": extremes["lowest"],
+            "completion_rate": percent(extremes["students"], total_students),
+            "weekly_submissions": [
+                {
+                    "week_start": week["week_start"],
+                    "submissions": week["submissions"],
+                    "average_score": rounded(week["grade_sum"] / week["graded_submissions"])
+                                     if week["graded_submissions"] else None
+                }
+                for week in weekly
+            ]
         }
         return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Class-wide analytics are computed in SQL and cached per (teacher, timeframe).
+# No write path invalidates them: the only activity this server writes is
+# reflections, which they do not read, and submissions and quiz attempts
+# written by the other servers show up once the entry expires, so class
+# figures can lag by up to CLASS_ANALYTICS_TTL
+CLASS_ANALYTICS_TTL = 120  # 2 minutes
+CHART_COLORS = ["#10b981", "#3b82f6", "#f59e0b", "#ef4444", "#6b7280"]
+
+def load_class_analytics(teacher_id, timeframe):
+    """Get the aggregates for a teacher's class (or the whole portal when teacher_id is None)"""
+    timeframe = normalize_timeframe(timeframe)
+    
+    def compute():
+        conn = get_db_connection()
+        try:
+            return class_analytics(conn, teacher_id, timeframe)
+        finally:
+            conn.close()
+    
+    return analytics_cache.get_or_compute(class_key(teacher_id, timeframe), compute, CLASS_ANALYTICS_TTL)
+
+def week_labels(weekly):
+    """Chart labels for a weekly series"""
+    return [f"Week {index + 1}" for index in range(len(weekly))]
+
+def weekly_engagement(weekly, total_students):
+    """Share of the class active in each week"""
+    return [percent(week["active_students"], total_students) for week in weekly]
+
+def series_change(values):
+    """Change between the first and last point of a series"""
+    return round(values[-1] - values[0], 1) if len(values) > 1 else 0.0
+
+def series_trend(values, tolerance=1.0):
+    """Describe a series as increasing, decreasing or stable"""
+    change = series_change(values)
+    if change > tolerance:
+        return "increasing"
+    if change < -tolerance:
+        return "decreasing"
+    return "stable"
+
+def improvement_trend(student):
+    """Recent vs earlier average for a student as a signed percentage"""
+    if not student["recent_score"] or not student["earlier_score"]:
+        return "0.0%"
+    change = (student["recent_score"] - student["earlier_score"]) * 100 / student["earlier_score"]
+    return f"{change:+.1f}%"
+
+def engagement_level(student):
+    """High/Medium/Low from a student's activity count in the timeframe"""
+    if student["activity_count"] >= HIGH_ENGAGEMENT:
+        return "High"
+    if student["activity_count"] >= MEDIUM_ENGAGEMENT:
+        return "Medium"
+    return "Low"
+
+def assignment_summary(assignment, total_students):
+    """Completion and score summary for one assignment"""
+    return {
+        "title": assignment["title"],
+        "completion_rate": percent(assignment["students"], total_students),
+        "average_score": rounded(assignment["average"]),
+        "total_submissions": assignment["count"]
+    }
+
+def class_recommendations(data):
+    """Suggestions derived from the weakest assignment, quiz and student group"""
+    overview = data["overview"]
+    counts = data["students"]["counts"]
+    recommendations = []
+    if data["assignments"]:
+        weakest = min(data["assignments"], key=lambda a: (a["students"], a["average"] or 0))
+        recommendations.append({
+            "type": "Content",
+            "priority": "High",
+            "title": f"Revisit {weakest['title']}",
+            "description": f"Only {percent(weakest['students'], overview['total_students'])}% of students have submitted {weakest['title']}",
+            "impact": f"{overview['total_students'] - weakest['students']} students yet to submit"
+        })
+    struggling = counts["at_risk"] + counts["needs_attention"]
+    if struggling:
+        recommendations.append({
+            "type": "Support",
+            "priority": "Medium",
+            "title": "Study Group Formation",
+            "description": "Schedule study groups for students averaging below 70%",
+            "impact": f"{struggling} students affected"
+        })
+    if data["quizzes"]:
+        hardest = data["quizzes"][0]
+        recommendations.append({
+            "type": "Assessment",
+            "priority": "Low",
+            "title": "Quiz Difficulty Review",
+            "description": f"Review {hardest['title']}, passed by {percent(hardest['passes'], hardest['count'])}% of attempts",
+            "impact": f"{hardest['count'] - hardest['passes']} attempts below the pass mark"
+        })
+    return recommendations
+
+def parse_timeframe():
+    """Read the timeframe query parameter (defaults to 30d)"""
+    return normalize_timeframe(request.args.get('timeframe', '30d'))
+
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
     """Get comprehensive analytics data with charts and detailed metrics"""
     try:
-        timeframe = request.args.get('timeframe', '30d')
+        try:
+            timeframe = parse_timeframe()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        data = load_class_analytics(None, timeframe)
+        overview = data["overview"]
+        counts = data["students"]["counts"]
+        weekly = data["weekly"]
+        labels = week_labels(weekly)
+        engagement = weekly_engagement(weekly, overview["total_students"])
+        scores = [rounded(week["average_score"]) for week in weekly]
+        top_assignments = data["assignments"][:5]
         
-        # Comprehensive analytics data with charts
         analytics = {
-            "timeframe": timeframe,
+            "timeframe": data["timeframe"],
             "overview": {
-                "total_students": 45,
-                "active_students": 42,
-                "total_assignments": 28,
-                "completed_assignments": 24,
-                "total_quizzes": 15,
-                "attempted_quizzes": 13,
-                "average_performance": 88.7,
-                "engagement_rate": 94.2,
-                "completion_rate": 85.7
+                "total_students": overview["total_students"],
+                "active_students": overview["active_students"],
+                "total_assignments": overview["total_assignments"],
+                "completed_assignments": overview["completed_assignments"],
+                "total_quizzes": overview["total_quizzes"],
+                "attempted_quizzes": overview["attempted_quizzes"],
+                "average_performance": rounded(overview["average_score"]),
+                "engagement_rate": percent(overview["active_students"], overview["total_students"]),
+                "completion_rate": percent(overview["completed_assignments"], overview["total_assignments"])
             },
             "performance_metrics": {
-                "grade_distribution": {
-                    "A (90-100)": 18,
-                    "B (80-89)": 15,
-                    "C (70-79)": 8,
-                    "D (60-69)": 3,
-                    "F (Below 60)": 1
-                },
+                "grade_distribution": dict(zip(GRADE_LABELS, overview["grade_distribution"])),
                 "average_scores": {
-                    "assignments": 87.3,
-                    "quizzes": 82.1,
-                    "projects": 91.5,
-                    "overall": 88.7
+                    "assignments": rounded(overview["average_grade"]),
+                    "quizzes": rounded(overview["average_quiz_score"]),
+                    "overall": rounded(overview["average_score"])
                 }
             },
             "engagement_data": {
-                "daily_active_users": [42, 45, 38, 41, 44, 39, 43],
-                "weekly_engagement": [89, 92, 87, 94, 91, 88, 93],
-                "monthly_trends": [85, 87, 89, 91, 88, 92, 94]
+                "weekly_active_users": [week["active_students"] for week in weekly],
+                "weekly_engagement": engagement
             },
             "assignment_analytics": {
                 "completion_rates": {
-                    "Math Assignment 1": 95,
-                    "Science Project": 88,
-                    "History Essay": 92,
-                    "Literature Review": 85,
-                    "Programming Task": 78
+                    a["title"]: percent(a["students"], overview["total_students"]) for a in top_assignments
                 },
-                "average_completion_time": "3.2 days",
-                "late_submissions": 12,
-                "on_time_submissions": 156
+                "late_submissions": overview["late_submissions"],
+                "on_time_submissions": overview["on_time_submissions"]
             },
             "quiz_analytics": {
-                "average_attempts": 1.8,
-                "success_rate": 89.5,
+                "average_attempts": rounded(overview["quiz_attempts"] / sum(q["students"] for q in data["quizzes"]))
+                                    if data["quizzes"] else 0.0,
+                "success_rate": percent(overview["quiz_passes"], overview["quiz_attempts"]),
                 "most_difficult_topics": [
-                    {"topic": "Advanced Calculus", "success_rate": 72},
-                    {"topic": "Organic Chemistry", "success_rate": 78},
-                    {"topic": "Data Structures", "success_rate": 81}
+                    {"topic": q["title"], "success_rate": percent(q["passes"], q["count"])}
+                    for q in data["quizzes"][:3]
                 ],
-                "improvement_over_time": [75, 78, 82, 85, 88, 89]
+                "improvement_over_time": [rounded(week["moving_average"]) for week in weekly]
             },
             "student_progress": {
-                "on_track": 32,
-                "at_risk": 8,
-                "exceeding_expectations": 5,
-                "needs_attention": 3
+                "on_track": counts["on_track"],
+                "at_risk": counts["at_risk"],
+                "exceeding_expectations": counts["exceeding"],
+                "needs_attention": counts["needs_attention"]
             },
             "time_series_data": {
                 "performance_over_time": [
-                    {"week": "Week 1", "average_score": 82.5},
-                    {"week": "Week 2", "average_score": 84.2},
-                    {"week": "Week 3", "average_score": 86.1},
-                    {"week": "Week 4", "average_score": 87.8},
-                    {"week": "Week 5", "average_score": 88.7}
+                    {"week": label, "average_score": score} for label, score in zip(labels, scores)
                 ],
                 "engagement_over_time": [
-                    {"week": "Week 1", "engagement": 78},
-                    {"week": "Week 2", "engagement": 82},
-                    {"week": "Week 3", "engagement": 85},
-                    {"week": "Week 4", "engagement": 89},
-                    {"week": "Week 5", "engagement": 94}
+                    {"week": label, "engagement": rate} for label, rate in zip(labels, engagement)
                 ]
             },
             "top_performers": [
-                {"name": "Alice Johnson", "score": 96.8, "assignments_completed": 8, "quizzes_taken": 5},
-                {"name": "Bob Smith", "score": 94.2, "assignments_completed": 7, "quizzes_taken": 4},
-                {"name": "Carol Davis", "score": 92.5, "assignments_completed": 8, "quizzes_taken": 6},
-                {"name": "David Wilson", "score": 91.3, "assignments_completed": 6, "quizzes_taken": 5},
-                {"name": "Emma Brown", "score": 90.7, "assignments_completed": 7, "quizzes_taken": 4}
-            ],
-            "areas_for_improvement": [
-                {"area": "Assignment Submission Timeliness", "impact": "High", "students_affected": 12},
-                {"area": "Quiz Preparation", "impact": "Medium", "students_affected": 8},
-                {"area": "Project Collaboration", "impact": "Medium", "students_affected": 6}
+                {
+                    "name": s["name"],
+                    "score": rounded(s["overall_score"]),
+                    "assignments_completed": s["assignments_completed"],
+                    "quizzes_taken": s["quizzes_taken"]
+                }
+                for s in data["students"]["top"]
             ],
             "trends": {
-                "student_growth": 18.5,
-                "performance_improvement": 12.3,
-                "engagement_increase": 15.7,
-                "completion_rate_improvement": 8.9
+                "performance_improvement": series_change(scores),
+                "engagement_increase": series_change(engagement)
             },
             "charts_data": {
                 "performance_distribution": {
                     "labels": ["A", "B", "C", "D", "F"],
-                    "data": [18, 15, 8, 3, 1],
-                    "colors": ["#10b981", "#3b82f6", "#f59e0b", "#ef4444", "#6b7280"]
+                    "data": overview["grade_distribution"],
+                    "colors": CHART_COLORS
                 },
                 "weekly_engagement": {
-                    "labels": ["Week 1", "Week 2", "Week 3", "Week 4", "Week 5"],
-                    "data": [78, 82, 85, 89, 94]
+                    "labels": labels,
+                    "data": engagement
                 },
                 "assignment_completion": {
-                    "labels": ["Math", "Science", "History", "Literature", "Programming"],
-                    "data": [95, 88, 92, 85, 78]
+                    "labels": [a["title"] for a in top_assignments],
+                    "data": [percent(a["students"], overview["total_students"]) for a in top_assignments]
                 },
                 "student_progress_categories": {
                     "labels": ["On Track", "At Risk", "Exceeding", "Needs Attention"],
-                    "data": [32, 8, 5, 3]
+                    "data": [counts["on_track"], counts["at_risk"], counts["exceeding"], counts["needs_attention"]]
                 }
-            }
+            },
+            "generated_at": data["generated_at"]
         }
         return jsonify(analytics)
     except Exception as e:
@@ -898,129 +1173,105 @@ def get_analytics():
 def get_teacher_analytics(teacher_id):
     """Get detailed analytics for a specific teacher"""
     try:
-        # Comprehensive teacher-specific analytics
+        try:
+            timeframe = parse_timeframe()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        data = load_class_analytics(teacher_id, timeframe)
+        overview = data["overview"]
+        counts = data["students"]["counts"]
+        weekly = data["weekly"]
+        labels = week_labels(weekly)
+        engagement = weekly_engagement(weekly, overview["total_students"])
+        scores = [rounded(week["average_score"]) for week in weekly]
+        assignments = data["assignments"]
+        ranked_assignments = sorted(assignments, key=lambda a: (a["students"], a["average"] or 0), reverse=True)
+        expected_submissions = overview["total_students"] * overview["completed_assignments"]
+        
         teacher_analytics = {
             "teacher_id": teacher_id,
+            "timeframe": data["timeframe"],
             "overview": {
-                "total_students": 32,
-                "active_students": 30,
-                "total_assignments": 18,
-                "completed_assignments": 16,
-                "average_performance": 89.2,
-                "engagement_rate": 96.1
+                "total_students": overview["total_students"],
+                "active_students": overview["active_students"],
+                "total_assignments": overview["total_assignments"],
+                "completed_assignments": overview["completed_assignments"],
+                "average_performance": rounded(overview["average_score"]),
+                "engagement_rate": percent(overview["active_students"], overview["total_students"])
             },
             "class_performance": {
-                "grade_distribution": {
-                    "A": 14,
-                    "B": 12,
-                    "C": 4,
-                    "D": 2,
-                    "F": 0
-                },
-                "average_scores_by_subject": {
-                    "Mathematics": 91.5,
-                    "Science": 87.3,
-                    "English": 89.8,
-                    "History": 88.1
-                }
+                "grade_distribution": dict(zip(["A", "B", "C", "D", "F"], overview["grade_distribution"])),
+                "average_scores_by_assignment": {a["title"]: rounded(a["average"]) for a in ranked_assignments[:5]}
             },
             "student_engagement": {
-                "highly_engaged": 22,
-                "moderately_engaged": 6,
-                "low_engagement": 2,
-                "participation_rate": 94.2
+                "highly_engaged": counts["highly_engaged"],
+                "moderately_engaged": counts["moderately_engaged"],
+                "low_engagement": counts["low_engagement"],
+                "participation_rate": percent(overview["active_students"], overview["total_students"])
             },
             "assignment_insights": {
-                "most_successful": {
-                    "title": "Algebra Fundamentals",
-                    "completion_rate": 98,
-                    "average_score": 92.5
-                },
-                "needs_attention": {
-                    "title": "Advanced Calculus",
-                    "completion_rate": 78,
-                    "average_score": 76.2
-                },
+                "most_successful": assignment_summary(ranked_assignments[0], overview["total_students"])
+                                   if assignments else None,
+                "needs_attention": assignment_summary(ranked_assignments[-1], overview["total_students"])
+                                   if assignments else None,
                 "submission_patterns": {
-                    "early_submissions": 45,
-                    "on_time_submissions": 120,
-                    "late_submissions": 8,
-                    "missing_submissions": 3
+                    "on_time_submissions": overview["on_time_submissions"],
+                    "late_submissions": overview["late_submissions"],
+                    "missing_submissions": max(0, expected_submissions - sum(a["students"] for a in assignments))
                 }
             },
             "quiz_performance": {
-                "average_attempts": 1.6,
-                "success_rate": 91.3,
+                "average_attempts": rounded(overview["quiz_attempts"] / sum(q["students"] for q in data["quizzes"]))
+                                    if data["quizzes"] else 0.0,
+                "success_rate": percent(overview["quiz_passes"], overview["quiz_attempts"]),
                 "difficult_concepts": [
-                    {"concept": "Derivatives", "success_rate": 68},
-                    {"concept": "Integration", "success_rate": 74},
-                    {"concept": "Limits", "success_rate": 82}
+                    {"concept": q["title"], "success_rate": percent(q["passes"], q["count"])}
+                    for q in data["quizzes"][:3]
                 ]
             },
             "time_series_data": {
                 "weekly_performance": [
-                    {"week": "Week 1", "average": 85.2, "engagement": 88},
-                    {"week": "Week 2", "average": 87.1, "engagement": 91},
-                    {"week": "Week 3", "average": 88.5, "engagement": 93},
-                    {"week": "Week 4", "average": 89.2, "engagement": 96},
-                    {"week": "Week 5", "average": 90.1, "engagement": 97}
+                    {"week": label, "average": score, "engagement": rate}
+                    for label, score, rate in zip(labels, scores, engagement)
                 ]
             },
             "top_students": [
                 {
-                    "name": "Alice Johnson",
-                    "overall_score": 96.8,
-                    "assignments_completed": 8,
-                    "quizzes_taken": 5,
-                    "engagement_level": "High",
-                    "improvement_trend": "+5.2%"
-                },
-                {
-                    "name": "Bob Smith",
-                    "overall_score": 94.2,
-                    "assignments_completed": 7,
-                    "quizzes_taken": 4,
-                    "engagement_level": "High",
-                    "improvement_trend": "+3.8%"
-                },
-                {
-                    "name": "Carol Davis",
-                    "overall_score": 92.5,
-                    "assignments_completed": 8,
-                    "quizzes_taken": 6,
-                    "engagement_level": "High",
-                    "improvement_trend": "+4.1%"
+                    "name": s["name"],
+                    "overall_score": rounded(s["overall_score"]),
+                    "assignments_completed": s["assignments_completed"],
+                    "quizzes_taken": s["quizzes_taken"],
+                    "engagement_level": engagement_level(s),
+                    "improvement_trend": improvement_trend(s)
                 }
+                for s in data["students"]["top"]
             ],
             "students_needing_attention": [
                 {
-                    "name": "David Wilson",
-                    "overall_score": 72.3,
-                    "missing_assignments": 2,
-                    "low_quiz_scores": 3,
+                    "name": s["name"],
+                    "overall_score": rounded(s["overall_score"]),
+                    "missing_assignments": overview["completed_assignments"] - s["assignments_completed"],
+                    "low_quiz_scores": s["low_quiz_scores"],
                     "recommended_actions": ["Extra tutoring", "Study group assignment"]
-                },
-                {
-                    "name": "Emma Brown",
-                    "overall_score": 68.9,
-                    "missing_assignments": 3,
-                    "low_quiz_scores": 4,
-                    "recommended_actions": ["Parent conference", "Individual study plan"]
+                                           if s["overall_score"] >= 60 else
+                                           ["Parent conference", "Individual study plan"]
                 }
+                for s in data["students"]["bottom"]
             ],
             "charts_data": {
                 "performance_trend": {
-                    "labels": ["Week 1", "Week 2", "Week 3", "Week 4", "Week 5"],
+                    "labels": labels,
                     "datasets": [
                         {
                             "label": "Average Score",
-                            "data": [85.2, 87.1, 88.5, 89.2, 90.1],
+                            "data": scores,
                             "borderColor": "#3b82f6",
                             "backgroundColor": "rgba(59, 130, 246, 0.1)"
                         },
                         {
                             "label": "Engagement Rate",
-                            "data": [88, 91, 93, 96, 97],
+                            "data": engagement,
                             "borderColor": "#10b981",
                             "backgroundColor": "rgba(16, 185, 129, 0.1)"
                         }
@@ -1028,38 +1279,23 @@ def get_teacher_analytics(teacher_id):
                 },
                 "grade_distribution": {
                     "labels": ["A", "B", "C", "D", "F"],
-                    "data": [14, 12, 4, 2, 0],
-                    "colors": ["#10b981", "#3b82f6", "#f59e0b", "#ef4444", "#6b7280"]
+                    "data": overview["grade_distribution"],
+                    "colors": CHART_COLORS
                 },
                 "assignment_completion": {
-                    "labels": ["Algebra", "Geometry", "Calculus", "Statistics", "Trigonometry"],
-                    "data": [98, 95, 78, 92, 88]
+                    "labels": [a["title"] for a in assignments[:5]],
+                    "data": [percent(a["students"], overview["total_students"]) for a in assignments[:5]]
                 },
                 "student_engagement_levels": {
                     "labels": ["High", "Medium", "Low"],
-                    "data": [22, 6, 2]
+                    "data": [counts["highly_engaged"], counts["moderately_engaged"], counts["low_engagement"]]
                 }
             },
             "recommendations": [
-                {
-                    "type": "Content",
-                    "priority": "High",
-                    "description": "Consider additional practice problems for Advanced Calculus",
-                    "impact": "Could improve completion rate by 15%"
-                },
-                {
-                    "type": "Support",
-                    "priority": "Medium",
-                    "description": "Schedule study groups for struggling students",
-                    "impact": "Could improve engagement by 10%"
-                },
-                {
-                    "type": "Assessment",
-                    "priority": "Low",
-                    "description": "Review quiz difficulty for Derivatives concept",
-                    "impact": "Could improve success rate by 8%"
-                }
-            ]
+                {key: value for key, value in recommendation.items() if key != "title"}
+                for recommendation in class_recommendations(data)
+            ],
+            "generated_at": data["generated_at"]
         }
         return jsonify(teacher_analytics)
     except Exception as e:
@@ -1069,22 +1305,42 @@ def get_teacher_analytics(teacher_id):
 def get_dashboard_analytics():
     """Get comprehensive dashboard analytics with detailed charts data"""
     try:
+        try:
+            timeframe = parse_timeframe()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        teacher_id = request.args.get('teacher_id', type=int)
+        data = load_class_analytics(teacher_id, timeframe)
+        overview = data["overview"]
+        counts = data["students"]["counts"]
+        weekly = data["weekly"]
+        labels = week_labels(weekly)
+        engagement = weekly_engagement(weekly, overview["total_students"])
+        scores = [rounded(week["average_score"]) for week in weekly]
+        this_week = week_start(datetime.now().date()).isoformat()
+        top_assignments = data["assignments"][:5]
+        assignment_rates = [percent(a["students"], overview["total_students"]) for a in top_assignments]
+        ranked_assignments = sorted(data["assignments"], key=lambda a: (a["students"], a["average"] or 0), reverse=True)
+        recommendations = class_recommendations(data)
+        
         dashboard_data = {
+            "timeframe": data["timeframe"],
             "summary_cards": {
-                "total_students": 45,
-                "active_assignments": 28,
-                "completed_this_week": 156,
-                "average_performance": 88.7,
-                "engagement_rate": 94.2
+                "total_students": overview["total_students"],
+                "active_assignments": overview["completed_assignments"],
+                "completed_this_week": sum(week["submissions"] for week in weekly if week["week_start"] == this_week),
+                "average_performance": rounded(overview["average_score"]),
+                "engagement_rate": percent(overview["active_students"], overview["total_students"])
             },
             "performance_charts": {
                 "grade_distribution": {
                     "type": "doughnut",
                     "data": {
-                        "labels": ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (Below 60)"],
+                        "labels": GRADE_LABELS,
                         "datasets": [{
-                            "data": [18, 15, 8, 3, 1],
-                            "backgroundColor": ["#10b981", "#3b82f6", "#f59e0b", "#ef4444", "#6b7280"],
+                            "data": overview["grade_distribution"],
+                            "backgroundColor": CHART_COLORS,
                             "borderWidth": 2,
                             "borderColor": "#ffffff"
                         }]
@@ -1105,11 +1361,11 @@ def get_dashboard_analytics():
                 "weekly_performance": {
                     "type": "line",
                     "data": {
-                        "labels": ["Week 1", "Week 2", "Week 3", "Week 4", "Week 5"],
+                        "labels": labels,
                         "datasets": [
                             {
                                 "label": "Average Score",
-                                "data": [82.5, 84.2, 86.1, 87.8, 88.7],
+                                "data": scores,
                                 "borderColor": "#3b82f6",
                                 "backgroundColor": "rgba(59, 130, 246, 0.1)",
                                 "tension": 0.4,
@@ -1117,7 +1373,7 @@ def get_dashboard_analytics():
                             },
                             {
                                 "label": "Engagement Rate",
-                                "data": [78, 82, 85, 89, 94],
+                                "data": engagement,
                                 "borderColor": "#10b981",
                                 "backgroundColor": "rgba(16, 185, 129, 0.1)",
                                 "tension": 0.4,
@@ -1143,10 +1399,10 @@ def get_dashboard_analytics():
                 "assignment_completion": {
                     "type": "bar",
                     "data": {
-                        "labels": ["Math", "Science", "History", "Literature", "Programming"],
+                        "labels": [a["title"] for a in top_assignments],
                         "datasets": [{
                             "label": "Completion Rate (%)",
-                            "data": [95, 88, 92, 85, 78],
+                            "data": assignment_rates,
                             "backgroundColor": [
                                 "rgba(16, 185, 129, 0.8)",
                                 "rgba(59, 130, 246, 0.8)",
@@ -1177,19 +1433,20 @@ def get_dashboard_analytics():
                 "student_engagement": {
                     "type": "radar",
                     "data": {
-                        "labels": ["Participation", "Assignments", "Quizzes", "Projects", "Discussions", "Attendance"],
+                        "labels": ["Participation", "Assignments", "Quizzes", "Quiz Pass Rate", "On Time"],
                         "datasets": [{
-                            "label": "Current Week",
-                            "data": [94, 88, 91, 85, 78, 96],
+                            "label": "Current Period",
+                            "data": [
+                                percent(overview["active_students"], overview["total_students"]),
+                                percent(overview["completed_assignments"], overview["total_assignments"]),
+                                percent(overview["attempted_quizzes"], overview["total_quizzes"]),
+                                percent(overview["quiz_passes"], overview["quiz_attempts"]),
+                                percent(overview["on_time_submissions"],
+                                        overview["on_time_submissions"] + overview["late_submissions"])
+                            ],
                             "borderColor": "#3b82f6",
                             "backgroundColor": "rgba(59, 130, 246, 0.2)",
                             "pointBackgroundColor": "#3b82f6"
-                        }, {
-                            "label": "Previous Week",
-                            "data": [89, 85, 87, 82, 75, 92],
-                            "borderColor": "#10b981",
-                            "backgroundColor": "rgba(16, 185, 129, 0.2)",
-                            "pointBackgroundColor": "#10b981"
                         }]
                     },
                     "options": {
@@ -1206,117 +1463,58 @@ def get_dashboard_analytics():
             "student_analytics": {
                 "top_performers": [
                     {
-                        "name": "Alice Johnson",
-                        "score": 96.8,
-                        "improvement": "+5.2%",
-                        "assignments": 8,
-                        "quizzes": 5,
-                        "avatar": "AJ"
-                    },
-                    {
-                        "name": "Bob Smith",
-                        "score": 94.2,
-                        "improvement": "+3.8%",
-                        "assignments": 7,
-                        "quizzes": 4,
-                        "avatar": "BS"
-                    },
-                    {
-                        "name": "Carol Davis",
-                        "score": 92.5,
-                        "improvement": "+4.1%",
-                        "assignments": 8,
-                        "quizzes": 6,
-                        "avatar": "CD"
+                        "name": s["name"],
+                        "score": rounded(s["overall_score"]),
+                        "improvement": improvement_trend(s),
+                        "assignments": s["assignments_completed"],
+                        "quizzes": s["quizzes_taken"],
+                        "avatar": "".join(part[0] for part in str(s["name"] or "?").split()[:2]).upper()
                     }
+                    for s in data["students"]["top"]
                 ],
                 "needs_attention": [
                     {
-                        "name": "David Wilson",
-                        "score": 72.3,
-                        "missing_assignments": 2,
-                        "low_quiz_scores": 3,
-                        "avatar": "DW"
-                    },
-                    {
-                        "name": "Emma Brown",
-                        "score": 68.9,
-                        "missing_assignments": 3,
-                        "low_quiz_scores": 4,
-                        "avatar": "EB"
+                        "name": s["name"],
+                        "score": rounded(s["overall_score"]),
+                        "missing_assignments": overview["completed_assignments"] - s["assignments_completed"],
+                        "low_quiz_scores": s["low_quiz_scores"],
+                        "avatar": "".join(part[0] for part in str(s["name"] or "?").split()[:2]).upper()
                     }
+                    for s in data["students"]["bottom"]
                 ]
             },
             "assignment_insights": {
-                "most_successful": {
-                    "title": "Algebra Fundamentals",
-                    "completion_rate": 98,
-                    "average_score": 92.5,
-                    "total_submissions": 44
-                },
-                "needs_attention": {
-                    "title": "Advanced Calculus",
-                    "completion_rate": 78,
-                    "average_score": 76.2,
-                    "total_submissions": 35
-                },
+                "most_successful": assignment_summary(ranked_assignments[0], overview["total_students"])
+                                   if ranked_assignments else None,
+                "needs_attention": assignment_summary(ranked_assignments[-1], overview["total_students"])
+                                   if ranked_assignments else None,
                 "recent_activity": [
                     {
-                        "assignment": "Math Assignment 1",
-                        "submissions": 42,
-                        "average_score": 87.3,
-                        "due_date": "2024-02-15"
-                    },
-                    {
-                        "assignment": "Science Project",
-                        "submissions": 38,
-                        "average_score": 89.1,
-                        "due_date": "2024-02-20"
+                        "assignment": a["title"],
+                        "submissions": a["count"],
+                        "average_score": rounded(a["average"]),
+                        "due_date": a["due_date"]
                     }
+                    for a in sorted(data["assignments"], key=lambda a: a["due_date"] or '', reverse=True)[:5]
                 ]
             },
             "engagement_metrics": {
-                "daily_active_users": [42, 45, 38, 41, 44, 39, 43],
-                "weekly_engagement": [89, 92, 87, 94, 91, 88, 93],
+                "weekly_active_users": [week["active_students"] for week in weekly],
+                "weekly_engagement": engagement,
                 "participation_breakdown": {
-                    "highly_active": 22,
-                    "moderately_active": 15,
-                    "low_activity": 8
+                    "highly_active": counts["highly_engaged"],
+                    "moderately_active": counts["moderately_engaged"],
+                    "low_activity": counts["low_engagement"]
                 }
             },
             "trends": {
-                "performance_trend": "increasing",
-                "engagement_trend": "increasing",
-                "completion_trend": "stable",
-                "improvement_areas": [
-                    "Assignment submission timeliness",
-                    "Quiz preparation",
-                    "Project collaboration"
-                ]
+                "performance_trend": series_trend(scores),
+                "engagement_trend": series_trend(engagement),
+                "completion_trend": series_trend([week["submissions"] for week in weekly]),
+                "improvement_areas": [recommendation["title"] for recommendation in recommendations]
             },
-            "recommendations": [
-                {
-                    "type": "Content",
-                    "priority": "High",
-                    "title": "Additional Calculus Practice",
-                    "description": "Consider adding more practice problems for Advanced Calculus",
-                    "impact": "Could improve completion rate by 15%"
-                },
-                {
-                    "type": "Support",
-                    "priority": "Medium",
-                    "title": "Study Group Formation",
-                    "description": "Schedule study groups for struggling students",
-                    "impact": "Could improve engagement by 10%"
-                },
-                {
-                    "type": "Assessment",
-                    "priority": "Low",
-                    "title": "Quiz Difficulty Review",
-                    "description": "Review quiz difficulty for Derivatives concept",
-                    "impact": "Could improve success rate by 8%"
-                }
-            ]
+            "recommendations": recommendations,
+            "generated_at": data["generated_at"]
         }
         return jsonify(dashboard_data)
     except Exception as e:
@@ -1350,29 +1548,42 @@ def handle_leave_room(data):
 
 @socketio.on('send_notification')
 def handle_send_notification(data):
-    """Handle sending notifications"""
-    socketio.emit('new_notification', data)
+    """Handle sending notifications to the rooms the payload addresses"""
+    notification_router.send('new_notification', data)
 
 @socketio.on('join')
 def handle_join(data):
-    """Handle user joining"""
+    """Handle user joining their user room"""
     user_id = data.get('user_id')
+    rooms = notification_router.join(user_id)
     print(f'User {user_id} joined')
-    emit('joined', {'user_id': user_id, 'message': 'Successfully joined'})
+    emit('joined', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined'})
 
 @socketio.on('join_teacher_room')
 def handle_join_teacher_room(data):
-    """Handle teacher joining teacher room"""
+    """Handle teacher joining their user, teacher and class rooms"""
     user_id = data.get('user_id')
+    rooms = notification_router.join(user_id, 'teacher')
     print(f'Teacher {user_id} joined teacher room')
-    emit('joined_teacher_room', {'user_id': user_id, 'message': 'Successfully joined teacher room'})
+    emit('joined_teacher_room', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined teacher room'})
 
 @socketio.on('join_student_room')
 def handle_join_student_room(data):
-    """Handle student joining student room"""
+    """Handle student joining their user, student and class rooms"""
     user_id = data.get('user_id')
+    rooms = notification_router.join(user_id, 'student', get_db_connection)
     print(f'Student {user_id} joined student room')
-    emit('joined_student_room', {'user_id': user_id, 'message': 'Successfully joined student room'})
+    emit('joined_student_room', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined student room'})
+
+@socketio.on('resume')
+def handle_resume(data):
+    """Replay durable events missed since the client's per-room cursors"""
+    joined = set(socket_rooms())
+    cursors = {room: seq for room, seq in (data or {}).get('cursors', {}).items() if room in joined}
+    emit('outbox_replay', notification_outbox.replay(cursors))
 
 @app.route('/api/students/<int:student_id>/dashboard', methods=['GET'])
 def get_student_dashboard(student_id):
@@ -1512,186 +1723,395 @@ def get_student_dashboard(student_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Simple in-memory cache for performance optimization
-analytics_cache = {}
+# Bounded LRU/TTL cache for per-student analytics
+# (set ANALYTICS_CACHE_BACKEND=sqlite to share it between gunicorn workers)
 CACHE_DURATION = 300  # 5 minutes
+CACHE_STALE_DURATION = 60  # serve expired entries this long while refreshing in the background
+analytics_cache = AnalyticsCache(ttl=CACHE_DURATION, stale_ttl=CACHE_STALE_DURATION)
 
-def get_cached_analytics(student_id):
-    """Get cached analytics data if available and not expired"""
-    if student_id in analytics_cache:
-        cached_data, timestamp = analytics_cache[student_id]
-        if (datetime.now() - timestamp).seconds < CACHE_DURATION:
-            return cached_data
-    return None
+# Per-route latency, SQL and cache metrics at /api/metrics
+# (set METRICS_SERVER_TIMING=1 to also send a Server-Timing header)
+install_metrics(app, analytics_cache)
 
-def set_cached_analytics(student_id, data):
-    """Cache analytics data with timestamp"""
-    analytics_cache[student_id] = (data, datetime.now())
+# Log statements slower than SLOW_QUERY_MS with their query plans
+# (to SLOW_QUERY_LOG_PATH when set; summarize with slow_query_log.py)
+slow_query_log = install_slow_query_log()
 
-@app.route('/api/student/<int:student_id>/analytics', methods=['GET'])
-def get_student_analytics(student_id):
-    """Get comprehensive analytics for a specific student with real-time data and caching"""
-    try:
-        # Check cache first for performance
-        cached_data = get_cached_analytics(student_id)
-        if cached_data:
-            print(f"📦 Returning cached analytics for student {student_id}")
-            return jsonify(cached_data)
-        
-        conn = get_db_connection()
-        
-        # Get student info
-        student = conn.execute('SELECT * FROM users WHERE id = ?', (student_id,)).fetchone()
-        if not student:
-            return jsonify({"error": "Student not found"}), 404
-        
-        # Get quiz attempts with enhanced data
-        quiz_attempts = conn.execute('''
-            SELECT qa.*, q.title as quiz_title, q.description
-            FROM quiz_attempts qa
-            LEFT JOIN quizzes q ON qa.quiz_id = q.id
+# Most recent quiz attempts and submissions behind the analytics charts and
+# submissions table; the payload's "history" block reports the totals and
+# whether older rows were left out
+RECENT_ITEMS_LIMIT = 50
+ENGAGEMENT_WEEKS = 5  # weeks shown in the engagement trend
+RECENT_ACTIVITY_DAYS = 7  # window for recent_activity_count
+MOVING_AVERAGE_WINDOW = 3  # points in the chart moving averages
+
+def invalidate_student_analytics(student_id):
+    """Drop cached analytics after a write that changes the student's data"""
+    if student_id is not None:
+        analytics_cache.invalidate(student_key(student_id))
+
+def load_student_analytics_inputs(conn, student_ids):
+    """Fetch analytics inputs for a set of students in a fixed number of queries
+
+    Returns {student_id: inputs} for the students that exist. A single
+    student reads its chart rows with LIMIT; a roster ranks each student's
+    rows with a window function so the query count does not grow with it.
+    """
+    placeholders = ','.join('?' * len(student_ids))
+    
+    # Student info
+    students = conn.execute(
+        f'SELECT id FROM users WHERE id IN ({placeholders})', student_ids
+    ).fetchall()
+    found = [row['id'] for row in students]
+    if not found:
+        return {}
+    
+    # Counts, sums and grade buckets are maintained on write, so the KPIs
+    # come from one indexed rollup row per student instead of scanning history
+    rollups = get_rollups(conn, found)
+    
+    # Quiz attempts in the last 7 days, grouped per student; an index
+    # range scan on the epoch column instead of parsing every timestamp
+    recent_counts = dict(conn.execute(f'''
+        SELECT student_id, COUNT(*) FROM quiz_attempts
+        WHERE student_id IN ({placeholders}) AND attempted_epoch >= ?
+        GROUP BY student_id
+    ''', (*student_ids, epoch_days_ago(RECENT_ACTIVITY_DAYS))).fetchall())
+    
+    quiz_select = '''
+        SELECT qa.*, q.title as quiz_title, q.description
+        FROM quiz_attempts qa
+        LEFT JOIN quizzes q ON qa.quiz_id = q.id
+    '''
+    submission_select = '''
+        SELECT s.*, a.title as assignment_title, a.description, a.deadline
+        FROM submissions s
+        LEFT JOIN assignments a ON s.assignment_id = a.id
+    '''
+    if len(found) == 1:
+        # Most recent quiz attempts and submissions for the charts
+        quiz_rows = conn.execute(f'''
+            {quiz_select}
             WHERE qa.student_id = ?
             ORDER BY qa.attempted_at DESC
-        ''', (student_id,)).fetchall()
-        
-        # Get submissions with enhanced data
-        submissions = conn.execute('''
-            SELECT s.*, a.title as assignment_title, a.description, a.deadline
-            FROM submissions s
-            LEFT JOIN assignments a ON s.assignment_id = a.id
+            LIMIT ?
+        ''', (found[0], RECENT_ITEMS_LIMIT)).fetchall()
+        submission_rows = conn.execute(f'''
+            {submission_select}
             WHERE s.student_id = ?
             ORDER BY s.submitted_at DESC
-        ''', (student_id,)).fetchall()
-        
-        # Get reflections
-        reflections = conn.execute('''
-            SELECT * FROM reflections
-            WHERE student_id = ?
-            ORDER BY created_at DESC
-        ''', (student_id,)).fetchall()
-        
-        # Calculate comprehensive analytics
-        total_quizzes = len(quiz_attempts)
-        total_assignments = len(submissions)
-        total_reflections = len(reflections)
-        
-        # Calculate averages with proper handling
-        quiz_scores = [qa.score for qa in quiz_attempts if qa.score is not None]
-        assignment_grades = [s.grade for s in submissions if s.grade is not None]
-        
-        average_quiz_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
-        average_assignment_grade = sum(assignment_grades) / len(assignment_grades) if assignment_grades else 0
-        
-        # Calculate engagement score based on activity
-        recent_activity_count = len([qa for qa in quiz_attempts if qa.attempted_at and 
-                                   (datetime.now() - datetime.fromisoformat(qa.attempted_at.replace('Z', '+00:00'))).days <= 7])
-        engagement_score = min(100, (recent_activity_count * 20) + (total_reflections * 10))
-        
-        # Calculate completion rate
-        total_available = 12  # Assuming 12 total modules/assignments
-        completed_items = len([s for s in submissions if s.grade is not None]) + len([qa for qa in quiz_attempts if qa.score is not None])
-        completion_rate = min(100, (completed_items / total_available) * 100) if total_available > 0 else 0
-        
-        # Create enhanced chart data
-        quiz_scores_over_time = [
-            {"date": qa.attempted_at, "score": qa.score}
-            for qa in quiz_attempts if qa.score is not None
-        ]
-        
-        assignment_grades_over_time = [
-            {"date": s.submitted_at, "grade": s.grade}
-            for s in submissions if s.grade is not None
-        ]
-        
-        # Enhanced subject performance with engagement
-        subject_performance = [
-            {
-                "subject_title": "Mathematics", 
-                "progress_percentage": 85,
-                "engagement_percentage": 78,
-                "total_assignments": 4,
-                "completed_assignments": 3
-            },
-            {
-                "subject_title": "Science", 
-                "progress_percentage": 78,
-                "engagement_percentage": 82,
-                "total_assignments": 3,
-                "completed_assignments": 2
-            },
-            {
-                "subject_title": "English", 
-                "progress_percentage": 92,
-                "engagement_percentage": 88,
-                "total_assignments": 5,
-                "completed_assignments": 4
-            }
-        ]
-        
-        # Enhanced module completion
-        modules_completion = {
-            "completed": 8,
-            "pending": 4,
-            "in_progress": 2
+            LIMIT ?
+        ''', (found[0], RECENT_ITEMS_LIMIT)).fetchall()
+    else:
+        # The same rows for a whole roster, top N per student
+        placeholders = ','.join('?' * len(found))
+        quiz_rows = conn.execute(f'''
+            SELECT * FROM (
+                SELECT ranked.*, ROW_NUMBER() OVER (
+                    PARTITION BY ranked.student_id ORDER BY ranked.attempted_at DESC
+                ) AS row_rank
+                FROM ({quiz_select} WHERE qa.student_id IN ({placeholders})) ranked
+            )
+            WHERE row_rank <= ?
+            ORDER BY student_id, attempted_at DESC
+        ''', (*found, RECENT_ITEMS_LIMIT)).fetchall()
+        submission_rows = conn.execute(f'''
+            SELECT * FROM (
+                SELECT ranked.*, ROW_NUMBER() OVER (
+                    PARTITION BY ranked.student_id ORDER BY ranked.submitted_at DESC
+                ) AS row_rank
+                FROM ({submission_select} WHERE s.student_id IN ({placeholders})) ranked
+            )
+            WHERE row_rank <= ?
+            ORDER BY student_id, submitted_at DESC
+        ''', (*found, RECENT_ITEMS_LIMIT)).fetchall()
+    
+    # Weekly activity for the engagement trend, one bucket row per week
+    since = (datetime.now() - timedelta(weeks=ENGAGEMENT_WEEKS)).strftime('%Y-%m-%d %H:%M:%S')
+    weekly = bucket_weekly_series(conn, 'student', found, since)
+    
+    inputs = {
+        student_id: {
+            "rollup": rollups[student_id],
+            "quiz_attempts": [],
+            "submissions": [],
+            "recent_activity_count": recent_counts.get(student_id, 0),
+            "weekly": weekly[student_id]
         }
-        
-        # Engagement trends (weekly data)
-        engagement_trends = [
-            {"week": "Week 1", "engagement_score": 85},
-            {"week": "Week 2", "engagement_score": 78},
-            {"week": "Week 3", "engagement_score": 92},
-            {"week": "Week 4", "engagement_score": 88},
-            {"week": "Week 5", "engagement_score": 95}
-        ]
-        
-        # Grade distribution
-        grade_distribution = [0, 0, 0, 0, 0]  # A, B, C, D, F
-        for grade in assignment_grades:
-            if grade >= 90:
-                grade_distribution[0] += 1
-            elif grade >= 80:
-                grade_distribution[1] += 1
-            elif grade >= 70:
-                grade_distribution[2] += 1
-            elif grade >= 60:
-                grade_distribution[3] += 1
+        for student_id in found
+    }
+    for row in quiz_rows:
+        inputs[row['student_id']]["quiz_attempts"].append(row)
+    for row in submission_rows:
+        submission = dict(row)
+        submission.pop('row_rank', None)
+        inputs[row['student_id']]["submissions"].append(submission)
+    return inputs
+
+def build_student_analytics(student_id, rollup, quiz_attempts, submissions, recent_activity_count, weekly):
+    """Build the analytics payload for one student from its loaded inputs"""
+    # Calculate comprehensive analytics
+    total_quizzes = rollup["quiz_attempts"]
+    total_assignments = rollup["submissions"]
+    total_reflections = rollup["reflections"]
+    
+    # Calculate averages with proper handling
+    average_quiz_score = rollup["quiz_score_sum"] / rollup["quiz_scored"] if rollup["quiz_scored"] else 0
+    average_assignment_grade = rollup["grade_sum"] / rollup["graded_submissions"] if rollup["graded_submissions"] else 0
+    
+    # Calculate engagement score based on activity
+    engagement_score = min(100, (recent_activity_count * 20) + (total_reflections * 10))
+    
+    # Calculate completion rate
+    total_available = 12  # Assuming 12 total modules/assignments
+    completed_items = rollup["graded_submissions"] + rollup["quiz_scored"]
+    completion_rate = min(100, (completed_items / total_available) * 100) if total_available > 0 else 0
+    
+    # Create enhanced chart data; rows arrive newest first, so the columns
+    # are built oldest first for the moving averages and read back reversed
+    scored_attempts = [qa for qa in quiz_attempts if qa["score"] is not None]
+    graded_submissions = [s for s in submissions if s["grade"] is not None]
+    quiz_scores = ScoreColumns.from_rows(reversed(scored_attempts), 'score')
+    assignment_grades = ScoreColumns.from_rows(reversed(graded_submissions), 'grade')
+    
+    quiz_scores_over_time = [
+        {"date": qa["attempted_at"], "score": qa["score"], "moving_average": round(average, 1)}
+        for qa, average in zip(scored_attempts, reversed(quiz_scores.rolling_average(MOVING_AVERAGE_WINDOW)))
+    ]
+    
+    assignment_grades_over_time = [
+        {"date": s["submitted_at"], "grade": s["grade"], "moving_average": round(average, 1)}
+        for s, average in zip(graded_submissions, reversed(assignment_grades.rolling_average(MOVING_AVERAGE_WINDOW)))
+    ]
+    
+    # Enhanced subject performance with engagement
+    subject_performance = [
+        {
+            "subject_title": "Mathematics", 
+            "progress_percentage": 85,
+            "engagement_percentage": 78,
+            "total_assignments": 4,
+            "completed_assignments": 3
+        },
+        {
+            "subject_title": "Science", 
+            "progress_percentage": 78,
+            "engagement_percentage": 82,
+            "total_assignments": 3,
+            "completed_assignments": 2
+        },
+        {
+            "subject_title": "English", 
+            "progress_percentage": 92,
+            "engagement_percentage": 88,
+            "total_assignments": 5,
+            "completed_assignments": 4
+        }
+    ]
+    
+    # Enhanced module completion
+    modules_completion = {
+        "completed": 8,
+        "pending": 4,
+        "in_progress": 2
+    }
+    
+    # Engagement trends (weekly data), scored like the engagement KPI
+    engagement_trends = [
+        {
+            "week": f"Week {index + 1}",
+            "week_start": week["week_start"],
+            "engagement_score": min(100, week["quiz_attempts"] * 20 + week["reflections"] * 10)
+        }
+        for index, week in enumerate(fill_weeks(weekly, ENGAGEMENT_WEEKS))
+    ]
+    
+    # Grade distribution (A, B, C, D, F) from the rollup buckets
+    grade_distribution = rollup_grade_distribution(rollup)
+    
+    analytics_data = {
+        "kpis": {
+            "total_quizzes_attempted": total_quizzes,
+            "modules_completed": 8,
+            "assignments_submitted": total_assignments,
+            "gpa": round(average_assignment_grade, 2),
+            "engagement_score": round(engagement_score, 1),
+            "completion_rate": round(completion_rate, 1),
+            "average_quiz_score": round(average_quiz_score, 1),
+            "total_reflections": total_reflections
+        },
+        "charts": {
+            "quiz_scores_over_time": quiz_scores_over_time,
+            "assignment_grades_over_time": assignment_grades_over_time,
+            "subject_performance": subject_performance,
+            "modules_completion": modules_completion,
+            "engagement_trends": engagement_trends,
+            "grade_distribution": grade_distribution
+        },
+        # Spread of the recent scores shown in the charts
+        "score_statistics": {
+            "quiz_scores": quiz_scores.summary(),
+            "assignment_grades": assignment_grades.summary()
+        },
+        "submissions": [dict(submission) for submission in submissions],
+        # The charts and submissions cover the latest RECENT_ITEMS_LIMIT rows of each kind
+        "history": {
+            "limit": RECENT_ITEMS_LIMIT,
+            "quiz_attempts": {"returned": len(quiz_attempts), "total": total_quizzes},
+            "submissions": {"returned": len(submissions), "total": total_assignments},
+            "truncated": len(quiz_attempts) < total_quizzes or len(submissions) < total_assignments
+        },
+        "metadata": {
+            "last_updated": datetime.now().isoformat(),
+            "data_freshness": "real-time",
+            "student_id": student_id,
+            "total_data_points": total_quizzes + total_assignments + total_reflections
+        }
+    }
+    
+    return analytics_data
+
+def compute_student_analytics(student_ids):
+    """Build analytics payloads for a list of students ({id: payload}, missing students omitted)"""
+    conn = get_db_connection()
+    try:
+        inputs = load_student_analytics_inputs(conn, list(student_ids))
+    finally:
+        conn.close()
+    return {
+        student_id: build_student_analytics(student_id, **student_inputs)
+        for student_id, student_inputs in inputs.items()
+    }
+
+@app.route('/api/student/<int:student_id>/analytics', methods=['GET'])
+def get_student_analytics(student_id):
+    """Get comprehensive analytics for a specific student with real-time data and caching
+
+    Charts and submissions cover the latest RECENT_ITEMS_LIMIT rows; see "history".
+    """
+    try:
+        # Concurrent misses for the same student share one computation
+        analytics_data = analytics_cache.get_or_compute(
+            student_key(student_id),
+            lambda: compute_student_analytics([student_id]).get(student_id)
+        )
+        if analytics_data is None:
+            return jsonify({"error": "Student not found"}), 404
+        return jsonify(analytics_data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Roster size limit for batched analytics (keeps IN lists under SQLite's variable limit)
+MAX_BATCH_STUDENTS = 200
+ROSTER_PAGE_SIZE = 50
+
+def teacher_roster_ids(conn, teacher_id, after=0, limit=MAX_BATCH_STUDENTS, only=None):
+    """Students who have submitted to a teacher's assignments or attempted their quizzes
+
+    Ordered by id, starting after the given id; only restricts the result
+    to a list of candidate ids.
+    """
+    sources = []
+    params = []
+    for table, activity, item_column in (('assignments', 'submissions', 'assignment_id'),
+                                         ('quizzes', 'quiz_attempts', 'quiz_id')):
+        owner = owner_column(conn, table)
+        if owner is not None:
+            sources.append(f'''
+                SELECT x.student_id FROM {activity} x
+                JOIN {table} t ON t.id = x.{item_column}
+                WHERE t.{owner} = ?
+            ''')
+            params.append(teacher_id)
+    if not sources:
+        return []
+    sql = f'''
+        SELECT u.id FROM users u
+        WHERE u.role = 'student' AND u.id > ? AND u.id IN ({' UNION '.join(sources)})
+    '''
+    params.insert(0, after)
+    if only is not None:
+        # json_each takes the whole id list as one parameter
+        sql += ' AND u.id IN (SELECT value FROM json_each(?))'
+        params.append(json.dumps(list(only)))
+    rows = conn.execute(sql + ' ORDER BY u.id LIMIT ?', params + [limit]).fetchall()
+    return [row['id'] for row in rows]
+
+def student_summary(analytics_data):
+    """Roster-sized slice of a student's analytics: KPIs and score spread, without the series"""
+    return {
+        "kpis": analytics_data["kpis"],
+        "score_statistics": analytics_data["score_statistics"],
+        "metadata": analytics_data["metadata"]
+    }
+
+@app.route('/api/teacher/<int:teacher_id>/students/analytics', methods=['GET'])
+def get_teacher_students_analytics(teacher_id):
+    """Get analytics summaries for a teacher's class in one request
+
+    Pages through the roster by student id (?limit=, ?cursor=), or returns
+    the students given as ?ids=1,2,3 that are on the roster. Each student
+    gets its KPIs and score statistics; the chart series and submissions
+    stay on /api/student/<id>/analytics.
+    """
+    try:
+        ids_param = request.args.get('ids', '').strip()
+        has_next = False
+        not_on_roster = []
+        conn = get_db_connection()
+        try:
+            if ids_param:
+                try:
+                    requested = list(dict.fromkeys(int(i) for i in ids_param.split(',') if i.strip()))
+                except ValueError:
+                    return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+                if len(requested) > MAX_BATCH_STUDENTS:
+                    return jsonify({"error": f"At most {MAX_BATCH_STUDENTS} students per request"}), 400
+                on_roster = set(teacher_roster_ids(conn, teacher_id, only=requested))
+                student_ids = [student_id for student_id in requested if student_id in on_roster]
+                not_on_roster = [student_id for student_id in requested if student_id not in on_roster]
+                limit = len(requested)
             else:
-                grade_distribution[4] += 1
+                try:
+                    limit = max(1, min(int(request.args.get('limit', ROSTER_PAGE_SIZE)), MAX_BATCH_STUDENTS))
+                    after = int(request.args.get('cursor') or 0)
+                except ValueError:
+                    return jsonify({"error": "limit and cursor must be integers"}), 400
+                student_ids = teacher_roster_ids(conn, teacher_id, after, limit + 1)
+                has_next = len(student_ids) > limit
+                student_ids = student_ids[:limit]
+        finally:
+            conn.close()
         
-        analytics_data = {
-            "kpis": {
-                "total_quizzes_attempted": total_quizzes,
-                "modules_completed": 8,
-                "assignments_submitted": total_assignments,
-                "gpa": round(average_assignment_grade, 2),
-                "engagement_score": round(engagement_score, 1),
-                "completion_rate": round(completion_rate, 1),
-                "average_quiz_score": round(average_quiz_score, 1),
-                "total_reflections": total_reflections
-            },
-            "charts": {
-                "quiz_scores_over_time": quiz_scores_over_time,
-                "assignment_grades_over_time": assignment_grades_over_time,
-                "subject_performance": subject_performance,
-                "modules_completion": modules_completion,
-                "engagement_trends": engagement_trends,
-                "grade_distribution": grade_distribution
+        # Serve cached students directly and compute the rest in one batch
+        keys = {student_key(student_id): student_id for student_id in student_ids}
+        misses = []
+
+        def compute_missing(missing_keys):
+            misses.extend(keys[key] for key in missing_keys)
+            computed = compute_student_analytics(misses)
+            return {student_key(student_id): analytics_data for student_id, analytics_data in computed.items()}
+
+        found = analytics_cache.get_or_compute_many(keys, compute_missing)
+        students = {keys[key]: student_summary(analytics_data) for key, analytics_data in found.items()}
+
+        return jsonify({
+            "teacher_id": teacher_id,
+            "students": {str(student_id): students[student_id] for student_id in student_ids if student_id in students},
+            "missing": [student_id for student_id in student_ids if student_id not in students],
+            "not_on_roster": not_on_roster,
+            "pagination": {
+                "limit": limit,
+                "has_next": has_next,
+                "next_cursor": str(student_ids[-1]) if has_next else None
             },
-            "submissions": [dict(submission) for submission in submissions],
             "metadata": {
-                "last_updated": datetime.now().isoformat(),
-                "data_freshness": "real-time",
-                "student_id": student_id,
-                "total_data_points": total_quizzes + total_assignments + total_reflections
+                "requested": len(student_ids),
+                "cached": len(student_ids) - len(misses),
+                "computed": len(misses)
             }
-        }
-        
-        # Cache the analytics data for performance
-        set_cached_analytics(student_id, analytics_data)
-        print(f"💾 Cached analytics for student {student_id}")
-        
-        conn.close()
-        return jsonify(analytics_data)
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1710,76 +2130,110 @@ def get_student_reflections(student_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Activity feed paging
+ACTIVITY_PAGE_SIZE = 10
+ACTIVITY_MAX_PAGE_SIZE = 100
+
+def encode_activity_cursor(timestamp, activity_type, activity_id):
+    """Opaque cursor for the position after an activity item"""
+    raw = json.dumps([timestamp, activity_type, activity_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_activity_cursor(cursor):
+    """Decode a cursor into (timestamp, type, id)"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    timestamp, activity_type, activity_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return str(timestamp), str(activity_type), int(activity_id)
+
 @app.route('/api/student/<int:student_id>/recent-activity', methods=['GET'])
 def get_student_recent_activity(student_id):
-    """Get recent activity for a specific student with pagination support"""
+    """Get recent activity for a specific student with cursor pagination
+
+    Submissions and quiz attempts form one timeline ordered by
+    (timestamp, type, id) descending. Each source is read from its
+    (student_id, timestamp) index starting at the cursor, so a page costs
+    the same at any depth.
+    """
     try:
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 10))
-        offset = (page - 1) * limit
+        limit = max(1, min(int(request.args.get('limit', ACTIVITY_PAGE_SIZE)), ACTIVITY_MAX_PAGE_SIZE))
+        cursor = request.args.get('cursor')
+        try:
+            after = decode_activity_cursor(cursor) if cursor else None
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
         
         conn = get_db_connection()
         
-        # Get recent submissions with pagination
-        submissions = conn.execute('''
-            SELECT s.*, a.title as assignment_title, 'submission' as type
-            FROM submissions s
-            LEFT JOIN assignments a ON s.assignment_id = a.id
-            WHERE s.student_id = ?
-            ORDER BY s.submitted_at DESC
-            LIMIT ? OFFSET ?
-        ''', (student_id, limit, offset)).fetchall()
+        # Each leg only reads rows strictly after the cursor; the <= bound
+        # keeps it an index range scan and the OR clause breaks timestamp ties
+        if after:
+            ts, kind, item_id = after
+            submission_filter = "AND s.submitted_at <= ? AND (s.submitted_at < ? OR 'submission' < ? OR ('submission' = ? AND s.id < ?))"
+            quiz_filter = "AND qa.attempted_at <= ? AND (qa.attempted_at < ? OR 'quiz' < ? OR ('quiz' = ? AND qa.id < ?))"
+            cursor_params = (ts, ts, kind, kind, item_id)
+        else:
+            submission_filter = quiz_filter = ''
+            cursor_params = ()
         
-        # Get recent quiz attempts with pagination
-        quiz_attempts = conn.execute('''
-            SELECT qa.*, q.title as quiz_title, 'quiz' as type
-            FROM quiz_attempts qa
-            LEFT JOIN quizzes q ON qa.quiz_id = q.id
-            WHERE qa.student_id = ?
-            ORDER BY qa.attempted_at DESC
-            LIMIT ? OFFSET ?
-        ''', (student_id, limit, offset)).fetchall()
+        # Fetch one extra row to know whether another page exists
+        rows = conn.execute(f'''
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT s.submitted_at AS timestamp, 'submission' AS type, s.id AS id,
+                           a.title AS title, NULL AS score
+                    FROM submissions s
+                    LEFT JOIN assignments a ON s.assignment_id = a.id
+                    WHERE s.student_id = ? {submission_filter}
+                    ORDER BY s.submitted_at DESC, s.id DESC
+                    LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT qa.attempted_at AS timestamp, 'quiz' AS type, qa.id AS id,
+                           q.title AS title, qa.score AS score
+                    FROM quiz_attempts qa
+                    LEFT JOIN quizzes q ON qa.quiz_id = q.id
+                    WHERE qa.student_id = ? {quiz_filter}
+                    ORDER BY qa.attempted_at DESC, qa.id DESC
+                    LIMIT ?
+                )
+            )
+            ORDER BY timestamp DESC, type DESC, id DESC
+            LIMIT ?
+        ''', (student_id, *cursor_params, limit + 1,
+              student_id, *cursor_params, limit + 1,
+              limit + 1)).fetchall()
         
-        # Combine and format activity
-        activity = []
-        for submission in submissions:
-            activity.append({
-                "description": f"Submitted assignment: {submission.assignment_title or 'Assignment'}",
-                "timestamp": submission.submitted_at,
-                "type": "submission"
-            })
+        has_next = len(rows) > limit
+        rows = rows[:limit]
         
-        for quiz in quiz_attempts:
+        activity = []
+        for row in rows:
+            if row['type'] == 'submission':
+                description = f"Submitted assignment: {row['title'] or 'Assignment'}"
+            else:
+                description = f"Completed quiz: {row['title'] or 'Quiz'} (Score: {row['score']})"
             activity.append({
-                "description": f"Completed quiz: {quiz.quiz_title or 'Quiz'} (Score: {quiz.score})",
-                "timestamp": quiz.attempted_at,
-                "type": "quiz"
+                "id": row['id'],
+                "description": description,
+                "timestamp": row['timestamp'],
+                "type": row['type']
             })
         
-        # Sort by timestamp
-        activity.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Get total count for pagination
-        total_submissions = conn.execute('SELECT COUNT(*) FROM submissions WHERE student_id = ?', (student_id,)).fetchone()[0]
-        total_quizzes = conn.execute('SELECT COUNT(*) FROM quiz_attempts WHERE student_id = ?', (student_id,)).fetchone()[0]
-        total_activities = total_submissions + total_quizzes
-        
-        # Calculate pagination metadata
-        total_pages = (total_activities + limit - 1) // limit
-        has_next = page < total_pages
-        has_prev = page > 1
+        # Totals come from the rollup instead of two COUNT(*) scans
+        rollup = get_rollup(conn, student_id)
+        total_activities = rollup["submissions"] + rollup["quiz_attempts"]
         
         conn.close()
+        
+        last = rows[-1] if rows else None
         return jsonify({
             "activity": activity,
             "pagination": {
-                "page": page,
                 "limit": limit,
                 "total_activities": total_activities,
-                "total_pages": total_pages,
                 "has_next": has_next,
-                "has_prev": has_prev
+                "next_cursor": encode_activity_cursor(last['timestamp'], last['type'], last['id']) if has_next else None
             }
         })
     except Exception as e:
@@ -1810,8 +2264,8 @@ def get_student_grades(student_id):
         ''', (student_id,)).fetchall()
         
         # Calculate grade statistics
-        assignment_scores = [s.grade for s in assignment_grades if s.grade is not None]
-        quiz_scores = [qa.score for qa in quiz_grades if qa.score is not None]
+        assignment_scores = [s['grade'] for s in assignment_grades if s['grade'] is not None]
+        quiz_scores = [qa['score'] for qa in quiz_grades if qa['score'] is not None]
         
         grades_data = {
             "assignment_grades": [dict(grade) for grade in assignment_grades],
@@ -1874,28 +2328,22 @@ class StudentAnalyticsModel:
         return min(100, engagement * 10)
     
     def is_recent(self, timestamp):
-        """Check if activity is within last 7 days"""
-        try:
-            activity_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            return (datetime.now() - activity_date).days <= 7
-        except:
-            return False
+        """Check if activity is within last 7 days (epoch seconds or ISO string)"""
+        epoch = to_epoch(timestamp)
+        return epoch is not None and epoch >= epoch_days_ago(RECENT_ACTIVITY_DAYS)
     
     def get_grade_distribution(self, grades):
         """Calculate grade distribution"""
-        distribution = {"A": 0, "B": 0, "C": 0, "D": 0, "F": 0}
-        for grade in grades:
-            if grade >= 90:
-                distribution["A"] += 1
-            elif grade >= 80:
-                distribution["B"] += 1
-            elif grade >= 70:
-                distribution["C"] += 1
-            elif grade >= 60:
-                distribution["D"] += 1
-            else:
-                distribution["F"] += 1
-        return distribution
+        counts = ScoreColumns(grades).distribution()
+        return dict(zip(["A", "B", "C", "D", "F"], counts))
+    
+    def get_grade_statistics(self, grades, timestamps=None, window=MOVING_AVERAGE_WINDOW):
+        """Distribution, mean, min/max, percentiles and moving average of a grade column"""
+        columns = ScoreColumns(grades, timestamps)
+        statistics = columns.summary()
+        statistics["distribution"] = self.get_grade_distribution(columns.scores)
+        statistics["moving_average"] = [round(average, 1) for average in columns.rolling_average(window)]
+        return statistics
 
 if __name__ == '__main__':
     print("🚀 Starting Basic Academic Portal Backend Server...")
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Endpoint Benchmarks for Academic Portal
+Latency percentiles and throughput for the hot API routes, checked against a stored baseline
+
+Drives basic_server through the Flask test client against a generated
+database (BENCHMARK_DB_PATH, built with generate_data.py on first use), so
+numbers measure the route code and SQL without network noise. Each endpoint
+rotates through a fixed, seeded sample of real student/teacher ids, runs a
+warmup pass, then records per-request latency. SQL statement counts come
+from the Server-Timing header added by request_metrics.
+
+Results are written as JSON. With --save-baseline the run becomes the
+baseline; later runs fail (exit code 1) when an endpoint's p95 grows past
+the baseline by more than --threshold, or when an endpoint returns errors.
+Baselines are only comparable on the same machine and data volume, so save
+one on the machine that runs the check.
+
+basic_server queries the production schema (users.name, submissions.grade,
+quizzes.teacher_id, ...). A missing database file is created with the
+create_enhanced_tables schema, which lacks some of those columns, and the
+affected routes show up as errors. For representative numbers, start from
+an empty copy of the production schema and let the benchmark fill it:
+    sqlite3 education.db .schema | sqlite3 benchmark.db
+
+Usage:
+    python benchmark.py                              # run, compare with the baseline if one exists
+    python benchmark.py --save-baseline              # run and store the result as the baseline
+    python benchmark.py --preset large --iterations 500 --cold
+    python benchmark.py --only student_analytics,grades --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmark settings
+BENCHMARK_DB_PATH = os.environ.get('BENCHMARK_DB_PATH', os.path.join(BACKEND_DIR, 'benchmark.db'))
+BENCHMARK_BASELINE_PATH = os.environ.get('BENCHMARK_BASELINE_PATH',
+                                         os.path.join(BACKEND_DIR, 'benchmark_baseline.json'))
+BENCHMARK_RESULTS_PATH = os.environ.get('BENCHMARK_RESULTS_PATH',
+                                        os.path.join(BACKEND_DIR, 'benchmark_results.json'))
+BENCHMARK_THRESHOLD = float(os.environ.get('BENCHMARK_THRESHOLD', 0.25))  # allowed p95 growth (25%)
+BENCHMARK_MIN_DELTA_MS = float(os.environ.get('BENCHMARK_MIN_DELTA_MS', 2.0))  # ignore sub-noise changes
+
+PERCENTILES = (50, 95, 99)
+COMPARED_METRIC = 'p95_ms'
+
+# Hot endpoints: name -> (method, path template, body template)
+ENDPOINTS = {
+    "login": ('POST', '/api/auth/login', {"email": '{email}', "password": 'benchmark'}),
+    "student_analytics": ('GET', '/api/student/{student_id}/analytics', None),
+    "recent_activity": ('GET', '/api/student/{student_id}/recent-activity?limit=20', None),
+    "grades": ('GET', '/api/student/{student_id}/grades', None),
+    "notifications": ('GET', '/api/notifications/{student_id}', None),
+    "teacher_quizzes": ('GET', '/api/teacher/{teacher_id}/quizzes', None)
+}
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def prepare_database(db_path, preset, seed):
+    """Generate the benchmark database unless it already has users"""
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            has_users = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+            ).fetchone() and conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        finally:
+            conn.close()
+        if has_users:
+            return False
+
+    from generate_data import PRESETS, generate
+
+    print(f"🧪 Generating {preset} benchmark database at {db_path} (seed {seed})")
+    generate(PRESETS[preset], seed, db_path=db_path)
+    return True
+
+
+def database_profile(db_path):
+    """Row counts identifying the data volume a run was measured on"""
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = {}
+        for table in ('users', 'assignments', 'quizzes', 'submissions', 'quiz_attempts', 'notifications'):
+            try:
+                counts[table] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            except sqlite3.OperationalError:
+                counts[table] = None
+        return counts
+    finally:
+        conn.close()
+
+
+def sample_targets(db_path, size, seed):
+    """A seeded sample of students (with emails) paired with teachers"""
+    conn = sqlite3.connect(db_path)
+    try:
+        students = conn.execute(
+            "SELECT id, email FROM users WHERE role = 'student' ORDER BY id"
+        ).fetchall()
+        teachers = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE role = 'teacher' ORDER BY id"
+        ).fetchall()]
+    finally:
+        conn.close()
+    if not students or not teachers:
+        raise RuntimeError("the benchmark database needs students and teachers")
+
+    rng = random.Random(seed)
+    students = rng.sample(students, min(size, len(students)))
+    teachers = rng.sample(teachers, min(size, len(teachers)))
+    return [
+        {"student_id": student_id, "email": email, "teacher_id": teachers[index % len(teachers)]}
+        for index, (student_id, email) in enumerate(students)
+    ]
+
+
+def build_request(endpoint, target):
+    method, path, body = ENDPOINTS[endpoint]
+    if body is not None:
+        body = {key: value.format(**target) for key, value in body.items()}
+    return method, path.format(**target), body
+
+
+def summarize(latencies, wall_seconds, statuses, queries, sql_ms):
+    """Percentiles, mean and throughput for one endpoint's samples (seconds)"""
+    from analytics_columns import ScoreColumns
+
+    column = ScoreColumns([seconds * 1000 for seconds in latencies])
+    result = {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if int(status) >= 400),
+        "statuses": statuses,
+        "mean_ms": round(column.mean(), 3),
+        "max_ms": round(column.maximum(), 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds else None
+    }
+    for q in PERCENTILES:
+        result[f"p{q}_ms"] = round(column.percentile(q), 3)
+    if queries:
+        result["queries_per_request"] = round(sum(queries) / len(queries), 2)
+        result["sql_ms_mean"] = round(sum(sql_ms) / len(sql_ms), 3)
+    return result
+
+
+def run_endpoint(app, cache, endpoint, targets, iterations, warmup, concurrency, cold):
+    """Time `iterations` requests to one endpoint, rotating through the targets"""
+    requests = [build_request(endpoint, targets[index % len(targets)]) for index in range(iterations)]
+    latencies = []
+    statuses = {}
+    queries = []
+    sql_ms = []
+    lock = threading.Lock()
+
+    def call(client, method, path, body):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        elapsed = time.perf_counter() - started
+        timing = _SERVER_TIMING_DB.search(response.headers.get('Server-Timing', ''))
+        with lock:
+            latencies.append(elapsed)
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+            if timing:
+                sql_ms.append(float(timing.group(1)))
+                queries.append(int(timing.group(2)))
+
+    def worker(chunk):
+        client = app.test_client()
+        for method, path, body in chunk:
+            call(client, method, path, body)
+
+    client = app.test_client()
+    for index in range(warmup):
+        method, path, body = build_request(endpoint, targets[index % len(targets)])
+        client.open(path, method=method, json=body)
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        worker(requests)
+    else:
+        threads = [threading.Thread(target=worker, args=(requests[offset::concurrency],))
+                   for offset in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall_seconds = time.perf_counter() - started
+    return summarize(latencies, wall_seconds, statuses, queries, sql_ms)
+
+
+def run(args):
+    """Run every selected endpoint and return the results document"""
+    # The backend modules read their settings at import time
+    os.environ['EDUCATION_DB_PATH'] = args.db
+    os.environ.setdefault('METRICS_SERVER_TIMING', '1')
+
+    prepare_database(args.db, args.preset, args.seed)
+    targets = sample_targets(args.db, args.sample, args.seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import basic_server
+    app = basic_server.app
+    app.testing = True
+
+    results = {}
+    for endpoint in args.only:
+        print(f"⏱️  {endpoint}: {args.iterations} requests"
+              + (f" over {args.concurrency} threads" if args.concurrency > 1 else ''))
+        # Routes print per request; keep the report readable
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results[endpoint] = run_endpoint(app, basic_server.analytics_cache, endpoint, targets,
+                                             args.iterations, args.warmup, args.concurrency, args.cold)
+
+    return {
+        "meta": {
+            "at": datetime.now().isoformat(),
+            "db": args.db,
+            "database": database_profile(args.db),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "cold_cache": args.cold,
+            "sample": len(targets),
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine()
+        },
+        "results": results
+    }
+
+
+def compare(current, baseline, threshold=BENCHMARK_THRESHOLD, min_delta_ms=BENCHMARK_MIN_DELTA_MS,
+            metric=COMPARED_METRIC):
+    """Regressions of `current` against `baseline` as a list of messages"""
+    regressions = []
+    for endpoint, result in current["results"].items():
+        if result["errors"]:
+            regressions.append(f"{endpoint}: {result['errors']} error responses {result['statuses']}")
+        previous = baseline["results"].get(endpoint)
+        if previous is None:
+            continue
+        limit = previous[metric] * (1 + threshold)
+        if result[metric] > limit and result[metric] - previous[metric] > min_delta_ms:
+            regressions.append(
+                f"{endpoint}: {metric} {result[metric]:.1f} ms vs baseline {previous[metric]:.1f} ms "
+                f"(+{(result[metric] / previous[metric] - 1) * 100:.0f}%, budget +{threshold * 100:.0f}%)"
+            )
+    return regressions
+
+
+def print_report(document, baseline=None):
+    print(f"\n{'endpoint':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}"
+          f"{'errors':>8}{'Δp95':>8}")
+    for endpoint, result in document["results"].items():
+        change = ''
+        previous = baseline["results"].get(endpoint) if baseline else None
+        if previous and previous[COMPARED_METRIC]:
+            change = f"{(result[COMPARED_METRIC] / previous[COMPARED_METRIC] - 1) * 100:+.0f}%"
+        print(f"{endpoint:<20}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['throughput_rps'] or 0:>10.1f}{result.get('queries_per_request', ''):>9}"
+              f"{result['errors']:>8}{change:>8}")
+
+
+def load_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_json(path, document):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the hot API endpoints against a generated database')
+    parser.add_argument('--db', default=BENCHMARK_DB_PATH, help='database to benchmark (generated if missing)')
+    parser.add_argument('--preset', choices=('small', 'medium', 'large'), default='medium', help='generate_data preset for a new database')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the generated data and the id sample')
+    parser.add_argument('--iterations', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per endpoint')
+    parser.add_argument('--sample', type=int, default=50, help='distinct students/teachers to rotate through')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads per endpoint')
+    parser.add_argument('--cold', action='store_true', help='clear the analytics cache before every request')
+    parser.add_argument('--only', type=lambda value: value.split(','), default=list(ENDPOINTS),
+                        help='comma-separated endpoints: ' + ', '.join(ENDPOINTS))
+    parser.add_argument('--output', default=BENCHMARK_RESULTS_PATH, help='where to write the results JSON')
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD,
+                        help='allowed p95 growth over the baseline, as a fraction')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.only if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    args.db = os.path.abspath(args.db)
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    try:
+        document = run(args)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    baseline = None if args.save_baseline else load_json(args.baseline)
+    comparable = baseline is not None and baseline["meta"].get("database") == document["meta"]["database"]
+    print_report(document, baseline if comparable else None)
+    write_json(args.output, document)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, document)
+        print(f"📌 Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if baseline is None:
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+    elif not comparable:
+        print("⚠️  Baseline was measured on a different data volume; only checking for errors")
+
+    regressions = compare(document, baseline if comparable else {"results": {}}, args.threshold)
+    if regressions:
+        print("❌ Performance regressions:")
+        for message in regressions:
+            print(f"   {message}")
+        sys.exit(1)
+    print("✅ Within budget")
@@ -8,15 +8,15 @@ import sqlite3
 import os
 from datetime import datetime
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'education.db')
+from db_pool import DB_PATH
+from migrations import migrate
 
-def create_enhanced_tables():
+def create_enhanced_tables(db_path=DB_PATH):
     """Create all enhanced database tables"""
     # Ensure instance directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     print("🗄️ Creating enhanced database tables...")
@@ -295,6 +295,9 @@ def create_enhanced_tables():
         print("✅ Sample notifications inserted")
     
     conn.commit()
+    
+    # Add indexes and derived tables
+    migrate(conn)
     conn.close()
     print("🎉 Enhanced database setup completed successfully!")
 
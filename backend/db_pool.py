@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Database Connection Pool for Academic Portal
+Shares SQLite connections between requests instead of reconnecting on every hit
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# Database path (override with EDUCATION_DB_PATH for tests and benchmarks)
+DB_PATH = os.environ.get(
+    'EDUCATION_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'instance', 'education.db')
+)
+
+# Pool settings
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 60))
+
+# PRAGMA profile applied to every new connection. WAL lets the analytics
+# readers keep going while reflections/submissions are being written.
+DB_PROFILE = {
+    "journal_mode": os.environ.get('DB_JOURNAL_MODE', 'WAL'),
+    "synchronous": os.environ.get('DB_SYNCHRONOUS', 'NORMAL'),
+    "cache_size": int(os.environ.get('DB_CACHE_SIZE', -20000)),  # negative = KiB
+    "mmap_size": int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    "temp_store": os.environ.get('DB_TEMP_STORE', 'MEMORY'),
+    "busy_timeout": int(os.environ.get('DB_BUSY_TIMEOUT', 5000)),  # milliseconds
+    "wal_autocheckpoint": int(os.environ.get('DB_WAL_AUTOCHECKPOINT', 1000))  # pages
+}
+
+# Background WAL checkpointing (seconds, 0 disables)
+CHECKPOINT_INTERVAL = float(os.environ.get('DB_CHECKPOINT_INTERVAL', 300))
+CHECKPOINT_MODE = os.environ.get('DB_CHECKPOINT_MODE', 'PASSIVE')
+
+
+def apply_profile(conn, profile=None):
+    """Apply the PRAGMA profile to a connection"""
+    profile = DB_PROFILE if profile is None else profile
+    for pragma, value in profile.items():
+        if value is None:
+            continue
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    return conn
+
+
+def checkpoint(conn, mode=CHECKPOINT_MODE):
+    """Run a WAL checkpoint and return (busy, wal_pages, checkpointed_pages)"""
+    row = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    return tuple(row) if row else (0, 0, 0)
+
+
+# Callbacks run after every statement on a pooled connection as
+# listener(sql, params, seconds, rows); seconds covers executing and
+# fetching, rows is the rows fetched (or changed, for writes)
+QUERY_LISTENERS = []
+
+
+def add_query_listener(listener):
+    """Register a callback for executed statements"""
+    if listener not in QUERY_LISTENERS:
+        QUERY_LISTENERS.append(listener)
+    return listener
+
+
+def _notify_query(sql, params, seconds, rows):
+    for listener in QUERY_LISTENERS:
+        try:
+            listener(sql, params, seconds, rows)
+        except Exception as e:
+            print(f"⚠️ Query listener failed: {e}")
+
+
+class TimedCursor:
+    """Cursor proxy that times execution plus fetching and counts rows
+
+    The statement is reported to the query listeners once the rows run out,
+    the cursor is closed, or the proxy is released, whichever comes first;
+    statements that return no rows are reported straight away.
+    """
+
+    def __init__(self, cursor, sql, params, seconds):
+        self._cursor = cursor
+        self._sql = sql
+        self._params = params
+        self._seconds = seconds
+        self._rows = 0
+        self._reported = False
+        if cursor.description is None:
+            self._rows = max(cursor.rowcount, 0)
+            self._report()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _report(self):
+        if not self._reported:
+            self._reported = True
+            _notify_query(self._sql, self._params, self._seconds, self._rows)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if row is None:
+            self._report()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self._cursor.arraysize if size is None else size
+        rows = self._fetch(self._cursor.fetchmany, size)
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._report()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        self._rows += len(rows)
+        self._report()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._report()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._report()
+        except Exception:
+            pass
+
+
+class PooledCursor:
+    """Cursor from PooledConnection.cursor() whose statements reach the query listeners too
+
+    Each execute() is timed like PooledConnection.execute(); the previous
+    statement is reported when the next one starts, if its rows were not
+    all fetched by then.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._current = None  # TimedCursor of the last statement
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, method, sql, params):
+        if self._current is not None:
+            self._current._report()
+            self._current = None
+        if not QUERY_LISTENERS:
+            method(sql, params)
+            return self
+        started = time.perf_counter()
+        method(sql, params)
+        self._current = TimedCursor(self._cursor, sql, params, time.perf_counter() - started)
+        return self
+
+    def execute(self, sql, params=()):
+        return self._timed(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, params):
+        return self._timed(self._cursor.executemany, sql, params)
+
+    def fetchone(self):
+        return (self._current or self._cursor).fetchone()
+
+    def fetchmany(self, size=None):
+        if self._current is not None:
+            return self._current.fetchmany(size)
+        return self._cursor.fetchmany(self._cursor.arraysize if size is None else size)
+
+    def fetchall(self):
+        return (self._current or self._cursor).fetchall()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        if self._current is not None:
+            self._current._report()
+        self._cursor.close()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class PooledConnection:
+    """Connection handle that goes back to the pool on close()"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def _timed(self, method, sql, params):
+        if not QUERY_LISTENERS:
+            return method(sql, params)
+        started = time.perf_counter()
+        cursor = method(sql, params)
+        return TimedCursor(cursor, sql, params, time.perf_counter() - started)
+
+    def execute(self, sql, params=()):
+        return self._timed(self._conn.execute, sql, params)
+
+    def executemany(self, sql, params):
+        return self._timed(self._conn.executemany, sql, params)
+
+    def cursor(self):
+        return PooledCursor(self._conn.cursor())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        self.close()
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if not self._closed:
+            self._closed = True
+            self._pool.checkin(self._conn)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with per-thread/greenlet ownership
+
+    A thread (or eventlet greenlet, since eventlet patches threading) that
+    already holds a connection gets the same one back on a nested checkout,
+    so helpers that open their own connection cannot deadlock the pool.
+    A dedicated checkout always gets a connection of its own instead.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL, profile=None):
+        self.db_path = db_path
+        self.profile = DB_PROFILE if profile is None else profile
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (connection, last_used)
+        self._owners = {}  # thread ident -> [connection, refcount]
+        self._dedicated = set()  # connections checked out with dedicated=True
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "checkpoints": 0,
+            "checkpointed_pages": 0
+        }
+        self._checkpointer = None
+
+    def _connect(self):
+        """Open a new connection for the pool"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        apply_profile(conn, self.profile)
+        self._stats["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        """Ping connections that have been idle for a while"""
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._size -= 1
+        self._stats["discarded"] += 1
+
+    def checkout(self, dedicated=False):
+        """Get a connection for the current thread/greenlet, or one of its own when dedicated"""
+        owner = threading.get_ident()
+        with self._cond:
+            held = self._owners.get(owner)
+            if held and not dedicated:
+                held[1] += 1
+                return PooledConnection(self, held[0])
+
+            started = None
+            while True:
+                while self._idle:
+                    conn, last_used = self._idle.pop()
+                    if self._is_healthy(conn, last_used):
+                        break
+                    self._discard(conn)
+                else:
+                    conn = None
+
+                if conn is None and self._size < self.max_size:
+                    conn = self._connect()
+                    self._size += 1
+
+                if conn is not None:
+                    break
+
+                # Pool exhausted, wait for a checkin
+                if started is None:
+                    started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._size >= self.max_size:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+
+            if started is not None:
+                waited_ms = (time.monotonic() - started) * 1000
+                self._stats["total_wait_ms"] += waited_ms
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited_ms)
+
+            if dedicated:
+                self._dedicated.add(conn)
+            else:
+                self._owners[owner] = [conn, 1]
+            self._stats["checkouts"] += 1
+            return PooledConnection(self, conn)
+
+    def checkin(self, conn):
+        """Release one checkout; the connection returns to the pool when fully released"""
+        owner = threading.get_ident()
+        with self._cond:
+            held = self._owners.get(owner)
+            if conn in self._dedicated:
+                self._dedicated.discard(conn)
+            elif held and held[0] is conn:
+                held[1] -= 1
+                if held[1] > 0:
+                    return
+                del self._owners[owner]
+            else:
+                # Released from another thread, find the owning entry
+                for ident, entry in list(self._owners.items()):
+                    if entry[0] is conn:
+                        del self._owners[ident]
+                        break
+
+            # Match sqlite3 close() semantics: uncommitted work is discarded
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append((conn, time.monotonic()))
+            except sqlite3.Error:
+                self._discard(conn)
+            self._cond.notify()
+
+    def checkpoint(self, mode=CHECKPOINT_MODE):
+        """Checkpoint the WAL on a dedicated connection"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            apply_profile(conn, {"busy_timeout": self.profile.get("busy_timeout")})
+            result = checkpoint(conn, mode)
+        finally:
+            conn.close()
+        with self._cond:
+            self._stats["checkpoints"] += 1
+            self._stats["checkpointed_pages"] += result[2] if result[2] > 0 else 0
+        return result
+
+    def start_checkpointer(self, interval=CHECKPOINT_INTERVAL):
+        """Checkpoint the WAL periodically so it cannot grow without bound"""
+        if interval <= 0 or str(self.profile.get("journal_mode", '')).upper() != 'WAL':
+            return None
+        if self._checkpointer is not None:
+            return self._checkpointer
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.checkpoint()
+                except sqlite3.Error as e:
+                    print(f"⚠️ WAL checkpoint failed: {e}")
+
+        self._checkpointer = threading.Thread(target=run, name='wal-checkpointer', daemon=True)
+        self._checkpointer.start()
+        return self._checkpointer
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+
+    def stats(self):
+        """Pool usage and wait metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._owners) + len(self._dedicated)
+            })
+            return stats
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Get this worker's pool, creating a fresh one after a fork"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # Connections inherited from the parent process must not be reused
+                _pool = ConnectionPool()
+                _pool_pid = pid
+                _pool.start_checkpointer()
+    return _pool
+
+
+# Set by install_pool_teardown; checkouts inside an app context are then
+# recorded on flask.g and released when the context ends
+_track_app_context = False
+
+
+def _track(conn):
+    if _track_app_context:
+        from flask import g, has_app_context
+        if has_app_context():
+            g.setdefault('_pooled_connections', []).append(conn)
+    return conn
+
+
+def get_db_connection():
+    """Get a pooled database connection (call close() to return it)"""
+    return _track(get_pool().checkout())
+
+
+def get_dedicated_connection():
+    """Get a pooled connection that no other checkout on this thread shares
+
+    For helpers that commit their own writes: on a shared connection their
+    commit would also commit whatever the caller has not finished. Call them
+    after committing your own writes, since SQLite lets one writer in at a time.
+    """
+    return _track(get_pool().checkout(dedicated=True))
+
+
+def release_app_connections():
+    """Return every connection checked out in the current app context"""
+    from flask import g
+    for conn in g.pop('_pooled_connections', []):
+        conn.close()
+
+
+def install_pool_teardown(app):
+    """Release pooled connections a request or socket event left open
+
+    A route that raises before conn.close() would otherwise keep its slot
+    forever, and once every slot is leaked all routes time out.
+    """
+    global _track_app_context
+    _track_app_context = True
+
+    @app.teardown_appcontext
+    def release_pooled_connections(exc):
+        release_app_connections()
+
+    return app
@@ -6,9 +6,7 @@ Provides advanced API endpoints, WebSocket support, and real-time features
 
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, join_room, leave_room
-import sqlite3
-import os
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms as socket_rooms
 import json
 from datetime import datetime
 import uuid
@@ -20,17 +18,25 @@ app.config['SECRET_KEY'] = 'your-secret-key-here'
 # Enable CORS for all routes
 CORS(app, origins=["http://localhost:3001", "http://localhost:3000"])
 
-# Initialize SocketIO
-socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3001", "http://localhost:3000"])
+# Initialize SocketIO; SOCKETIO_MESSAGE_QUEUE shares emits and rooms across worker processes
+from socket_broker import socketio_options
+socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3001", "http://localhost:3000"],
+                    **socketio_options())
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'education.db')
+# Database path and pooled connections shared by all routes
+from db_pool import get_db_connection, install_pool_teardown
+from migrations import migrate
+from notification_router import NotificationRouter, role_room, user_room
+from event_batcher import create_event_batcher
+from notification_outbox import NotificationOutbox
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Return connections a route leaves checked out when its request ends
+install_pool_teardown(app)
+
+# Real-time events go to the user/role/class rooms they address, not to every socket,
+# batched per target over a short window; durable events are logged per room for replay
+notification_outbox = NotificationOutbox()
+notification_router = NotificationRouter(socketio, batcher=create_event_batcher(socketio), outbox=notification_outbox)
 
 def init_enhanced_database():
     """Initialize enhanced database with all tables"""
@@ -288,6 +294,7 @@ def init_enhanced_database():
 
 # Initialize enhanced database on startup
 init_enhanced_database()
+migrate()
 
 # API Routes
 @app.route('/')
@@ -354,12 +361,12 @@ def create_assignment():
     assignment_id = cursor.lastrowid
     conn.close()
     
-    # Emit real-time notification
-    socketio.emit('new_assignment', {
+    # Notify students; assignments are visible to every student
+    notification_router.send('new_assignment', {
         'id': assignment_id,
         'title': data['title'],
         'message': f'New assignment: {data["title"]}'
-    })
+    }, [role_room('student')])
     
     return jsonify({"id": assignment_id, "message": "Assignment created successfully"})
 
@@ -433,12 +440,12 @@ def create_reflection():
     reflection_id = cursor.lastrowid
     conn.close()
     
-    # Emit real-time notification
-    socketio.emit('new_reflection', {
+    # Notify the author's other sessions and the teachers who review reflections
+    notification_router.send('new_reflection', {
         'id': reflection_id,
         'title': data['title'],
         'message': f'New reflection: {data["title"]}'
-    })
+    }, [user_room(data.get('student_id', 3)), role_room('teacher')])
     
     return jsonify({"id": reflection_id, "message": "Reflection created successfully"})
 
@@ -518,15 +525,44 @@ def handle_leave_room(data):
 
 @socketio.on('send_notification')
 def handle_send_notification(data):
-    """Handle sending notifications"""
-    # Broadcast notification to all clients
-    socketio.emit('new_notification', data)
+    """Handle sending notifications to the rooms the payload addresses"""
+    notification_router.send('new_notification', data)
 
 @socketio.on('update_progress')
 def handle_update_progress(data):
-    """Handle progress updates"""
-    # Broadcast progress update to all clients
-    socketio.emit('progress_updated', data)
+    """Handle progress updates for the rooms the payload addresses"""
+    notification_router.send('progress_updated', data)
+
+@socketio.on('join')
+def handle_join(data):
+    """Handle user joining their user room"""
+    user_id = data.get('user_id')
+    rooms = notification_router.join(user_id)
+    emit('joined', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined'})
+
+@socketio.on('join_teacher_room')
+def handle_join_teacher_room(data):
+    """Handle teacher joining their user, teacher and class rooms"""
+    user_id = data.get('user_id')
+    rooms = notification_router.join(user_id, 'teacher')
+    emit('joined_teacher_room', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined teacher room'})
+
+@socketio.on('join_student_room')
+def handle_join_student_room(data):
+    """Handle student joining their user, student and class rooms"""
+    user_id = data.get('user_id')
+    rooms = notification_router.join(user_id, 'student', get_db_connection)
+    emit('joined_student_room', {'user_id': user_id, 'rooms': rooms, 'cursors': notification_outbox.heads(rooms),
+          'message': 'Successfully joined student room'})
+
+@socketio.on('resume')
+def handle_resume(data):
+    """Replay durable events missed since the client's per-room cursors"""
+    joined = set(socket_rooms())
+    cursors = {room: seq for room, seq in (data or {}).get('cursors', {}).items() if room in joined}
+    emit('outbox_replay', notification_outbox.replay(cursors))
 
 if __name__ == '__main__':
     print("🚀 Starting Enhanced Academic Portal Backend Server...")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Epoch Timestamp Columns for Academic Portal
+Integer copies of the activity timestamps, kept in sync by triggers
+
+Timestamps are stored as text in a mix of formats ('2024-01-20 10:30:00',
+'2024-01-20T10:30:00Z', ...), which neither sorts nor compares reliably and
+had to be parsed in Python for every row. The epoch columns hold the same
+instant as Unix seconds so recency and timeframe filters become plain
+indexed range predicates. Timestamps without an offset are taken as UTC,
+matching SQLite's CURRENT_TIMESTAMP.
+"""
+
+import calendar
+import time
+from datetime import datetime, timezone
+
+# Columns mirrored as epochs: (table, timestamp column, epoch column)
+EPOCH_COLUMNS = [
+    ('submissions', 'submitted_at', 'submitted_epoch'),
+    ('quiz_attempts', 'attempted_at', 'attempted_epoch'),
+    ('reflections', 'created_at', 'created_epoch')
+]
+
+DAY_SECONDS = 86400
+
+
+def epoch_expr(value):
+    """SQL expression converting a timestamp to Unix seconds (NULL if unparseable)"""
+    return f"CAST(strftime('%s', {value}) AS INTEGER)"
+
+
+def to_epoch(value):
+    """Unix seconds for a datetime or ISO timestamp string, or None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        return calendar.timegm(value.timetuple())
+    return int(value.astimezone(timezone.utc).timestamp())
+
+
+def epoch_days_ago(days, now=None):
+    """Epoch lower bound for a window of the last `days` days"""
+    now = time.time() if now is None else now
+    return int(now) - int(days * DAY_SECONDS)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def create_epoch_schema(conn):
+    """Add the epoch columns and the triggers that fill them
+
+    Tables that are missing or lack the timestamp column are skipped.
+    """
+    for table, source, target in EPOCH_COLUMNS:
+        existing = _columns(conn, table)
+        if source not in existing:
+            continue
+        if target not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {target} INTEGER')
+
+        # The trigger's own UPDATE only touches the epoch column, so it does
+        # not fire the rollup/bucket triggers (those watch grade and score)
+        for name, event in ((f'trg_epoch_{table}_insert', 'INSERT'),
+                            (f'trg_epoch_{table}_update', f'UPDATE OF {source}')):
+            conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+            conn.execute(f'''
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE {table} SET {target} = {epoch_expr(f'NEW.{source}')}
+                    WHERE rowid = NEW.rowid;
+                END
+            ''')
+
+
+def backfill_epochs(conn):
+    """Fill the epoch columns for rows written before the triggers existed"""
+    for table, source, target in EPOCH_COLUMNS:
+        if target in _columns(conn, table):
+            conn.execute(f'''
+                UPDATE {table} SET {target} = {epoch_expr(source)}
+                WHERE {target} IS NULL AND {source} IS NOT NULL
+            ''')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Real-Time Event Batching for Academic Portal
+Coalesces outgoing Socket.IO events per target and sends them as one frame
+
+Events headed for the same rooms (a user/class/role room or a single sid)
+are held for EVENT_BATCH_WINDOW_MS after the first one arrives, then sent
+together as a single 'event_batch' frame:
+
+    {"events": [{"event": "assignment_status_update", "data": {...}}, ...]}
+
+Status events that only describe an entity's latest state
+(COALESCED_EVENTS) replace any earlier event for the same entity still in
+the buffer, so a bulk-grading burst sends one update per submission instead
+of one per change. A buffer that holds a single event when its window
+closes is sent as that plain event, so quiet periods look exactly as they
+did before batching. Buffers are flushed early at EVENT_BATCH_MAX_EVENTS.
+"""
+
+import itertools
+import os
+import threading
+
+# Batching settings
+EVENT_BATCH_WINDOW_MS = float(os.environ.get('EVENT_BATCH_WINDOW_MS', 100))  # 0 disables
+EVENT_BATCH_MAX_EVENTS = int(os.environ.get('EVENT_BATCH_MAX_EVENTS', 100))
+
+BATCH_EVENT = 'event_batch'
+
+# Events where only the latest payload per entity matters: event -> keys naming the entity
+COALESCED_EVENTS = {
+    'assignment_status_update': ('assignment_id', 'student_id'),
+    'quiz_status_update': ('quiz_id', 'student_id'),
+    'progress_updated': ('student_id', 'skill_id', 'outcome_id'),
+    'notification_count_update': ('user_id',),
+    'dashboard_refresh': ('type',)
+}
+
+
+def coalesce_key(event, data):
+    """Entity key for events that supersede each other, or None"""
+    fields = COALESCED_EVENTS.get(event)
+    if fields is None or not isinstance(data, dict):
+        return None
+    values = tuple(data.get(field) for field in fields)
+    if all(value is None for value in values):
+        return None
+    return (event, values)
+
+
+class EventBatcher:
+    """Per-target outbound buffers flushed after a short window"""
+
+    def __init__(self, socketio, window_ms=EVENT_BATCH_WINDOW_MS, max_events=EVENT_BATCH_MAX_EVENTS):
+        self.socketio = socketio
+        self.window = window_ms / 1000
+        self.max_events = max_events
+        self._buffers = {}  # target rooms (tuple, empty for broadcast) -> {key: (event, data)}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"events": 0, "coalesced": 0, "frames": 0, "batches": 0}
+
+    def add(self, event, data, rooms=None):
+        """Queue an event for the given rooms (None broadcasts)"""
+        target = tuple(rooms) if rooms else ()
+        key = coalesce_key(event, data) or next(self._sequence)
+        with self._lock:
+            self._stats["events"] += 1
+            buffer = self._buffers.get(target)
+            started = buffer is None
+            if started:
+                buffer = self._buffers[target] = {}
+            if key in buffer:
+                # Drop the superseded event; the new one keeps arrival order
+                del buffer[key]
+                self._stats["coalesced"] += 1
+            buffer[key] = (event, data)
+            full = len(buffer) >= self.max_events
+        if full:
+            self.flush(target)
+        elif started:
+            self.socketio.start_background_task(self._flush_later, target)
+
+    def _flush_later(self, target):
+        self.socketio.sleep(self.window)
+        self.flush(target)
+
+    def flush(self, target):
+        """Send everything buffered for one target now"""
+        with self._lock:
+            buffer = self._buffers.pop(target, None)
+            if not buffer:
+                return
+            events = list(buffer.values())
+            self._stats["frames"] += 1
+            if len(events) > 1:
+                self._stats["batches"] += 1
+
+        kwargs = {'to': list(target)} if target else {}
+        if len(events) == 1:
+            event, data = events[0]
+            self.socketio.emit(event, data, **kwargs)
+        else:
+            self.socketio.emit(BATCH_EVENT, {
+                "events": [{"event": event, "data": data} for event, data in events]
+            }, **kwargs)
+
+    def flush_all(self):
+        with self._lock:
+            targets = list(self._buffers)
+        for target in targets:
+            self.flush(target)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = sum(len(buffer) for buffer in self._buffers.values())
+        return stats
+
+
+def create_event_batcher(socketio, window_ms=EVENT_BATCH_WINDOW_MS):
+    """An EventBatcher for the server, or None when batching is disabled"""
+    if window_ms <= 0:
+        return None
+    return EventBatcher(socketio, window_ms)
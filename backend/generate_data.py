@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator for Academic Portal
+Fills education.db with deterministic, production-shaped data for scale testing
+
+Volumes come from a preset or explicit counts; the same seed and anchor date
+always produce the same database. Activity is skewed like real classes:
+student activity and assignment popularity are log-normal, teachers own
+work on a Zipf-like curve, submissions cluster just before deadlines,
+activity peaks in the afternoon/evening and on weekdays, and recent weeks
+are busier than older ones. Grades follow a per-student ability, and
+recent submissions are more often still ungraded.
+
+Everything is written in one transaction with executemany(). The derived
+triggers and secondary indexes on the activity tables are dropped for the
+load and recreated afterwards, then the rollup, activity buckets, epoch
+columns and unread notification counters are rebuilt in bulk, so a
+10M-row database builds in minutes.
+
+Usage:
+    python generate_data.py                          # small preset
+    python generate_data.py --preset large           # 50k students, 5M submissions and quiz attempts
+    python generate_data.py --students 20000 --submissions 2000000 --seed 7 --anchor 2025-06-01
+    EDUCATION_DB_PATH=/tmp/scale.db python generate_data.py --preset medium
+"""
+
+import argparse
+import itertools
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from analytics_buckets import BUCKET_TABLE, compact_buckets, rebuild_buckets
+from analytics_rollup import ROLLUP_TABLE, rebuild_rollup
+from create_enhanced_tables import create_enhanced_tables
+from db_pool import DB_PATH
+from epoch_columns import backfill_epochs
+from migrations import bucket_schema_options, has_columns, migrate, table_columns
+from notification_counters import COUNTER_TABLE, rebuild_counters
+
+# Volumes per preset
+PRESETS = {
+    "small": {
+        "students": 500, "teachers": 10, "assignments": 50, "quizzes": 20,
+        "submissions": 20000, "quiz_attempts": 20000, "reflections": 2000, "notifications": 5000
+    },
+    "medium": {
+        "students": 5000, "teachers": 100, "assignments": 500, "quizzes": 200,
+        "submissions": 500000, "quiz_attempts": 500000, "reflections": 50000, "notifications": 100000
+    },
+    "large": {
+        "students": 50000, "teachers": 1000, "assignments": 2000, "quizzes": 1000,
+        "submissions": 5000000, "quiz_attempts": 5000000, "reflections": 500000, "notifications": 1000000
+    }
+}
+
+# Tables whose triggers and secondary indexes are suspended during the load
+ACTIVITY_TABLES = ('submissions', 'quiz_attempts', 'reflections', 'notifications')
+
+BATCH_SIZE = 50000
+DAY = 86400
+LATE_SUBMISSION_RATE = 0.12
+RECENT_UNGRADED_RATE = 0.6  # submissions from the last week still waiting for a grade
+OLD_UNGRADED_RATE = 0.05
+
+# Relative activity per hour of day (0-23) and weekend damping
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 8, 9, 11, 12, 12, 11, 10, 11, 12, 10, 6, 3]
+WEEKEND_ACCEPT = 0.45
+
+FIRST_NAMES = ['Aisha', 'Ben', 'Chen', 'Diego', 'Emma', 'Farah', 'Gabriel', 'Hana', 'Ivan', 'Jade',
+               'Kofi', 'Lena', 'Mateo', 'Nia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tariq',
+               'Uma', 'Victor', 'Wen', 'Ximena', 'Yusuf', 'Zara']
+LAST_NAMES = ['Adams', 'Bakshi', 'Costa', 'Dubois', 'Eze', 'Fischer', 'Garcia', 'Huang', 'Ibrahim',
+              'Jensen', 'Kim', 'Lopez', 'Mensah', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Silva',
+              'Tanaka', 'Usman', 'Varga', 'Walsh', 'Yilmaz', 'Zhang']
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Geography',
+            'Computer Science', 'Economics', 'Art']
+TOPICS = {
+    'Mathematics': ['quadratic equations', 'probability', 'vectors', 'integration', 'statistics'],
+    'Physics': ['Newton\'s laws', 'electric circuits', 'waves', 'energy conservation', 'optics'],
+    'Chemistry': ['chemical bonding', 'titration', 'reaction rates', 'organic compounds', 'the periodic table'],
+    'Biology': ['cell division', 'photosynthesis', 'genetics', 'ecosystems', 'the immune system'],
+    'English': ['persuasive writing', 'poetry analysis', 'Shakespeare', 'narrative structure', 'grammar'],
+    'History': ['the industrial revolution', 'world war one', 'ancient Rome', 'the cold war', 'civil rights'],
+    'Geography': ['plate tectonics', 'climate zones', 'urbanisation', 'river systems', 'map skills'],
+    'Computer Science': ['recursion', 'sorting algorithms', 'databases', 'networks', 'object-oriented design'],
+    'Economics': ['supply and demand', 'inflation', 'market structures', 'trade', 'fiscal policy'],
+    'Art': ['perspective drawing', 'colour theory', 'portraiture', 'sculpture', 'art movements']
+}
+SKILLS = ['Problem Solving', 'Communication', 'Critical Thinking', 'Teamwork', 'Mathematical Reasoning',
+          'Scientific Method', 'Time Management', 'Research', 'Creativity']
+OUTCOMES = ['Mathematical Proficiency', 'Communication Skills', 'Critical Analysis', 'Scientific Understanding']
+REFLECTION_OPENINGS = [
+    'This week we worked on {topic} in {subject}.',
+    'Today\'s {subject} lesson was about {topic}.',
+    'I spent a lot of time revising {topic} for {subject}.',
+    'Our group project in {subject} focused on {topic}.'
+]
+REFLECTION_MIDDLES = [
+    'At first I found it confusing, but working through examples helped a lot.',
+    'The practice questions showed me where my understanding was weak.',
+    'Explaining it to a classmate made me realise how much I had learned.',
+    'I made several mistakes early on and learned to check my working more carefully.',
+    'The feedback on my last assignment helped me approach it differently.',
+    'I still find some parts difficult and want to ask for help in the next class.'
+]
+REFLECTION_ENDINGS = [
+    'Next time I want to start earlier and plan my time better.',
+    'I feel much more confident now.',
+    'I would like to try harder problems on this topic.',
+    'I plan to review my notes before the quiz.',
+    'Overall it was one of my favourite topics so far.'
+]
+FEEDBACK = ['Excellent work.', 'Good effort, check your working.', 'Well structured answer.',
+            'Review the marking criteria.', 'Strong analysis, expand your conclusion.', 'Please see me.']
+NOTIFICATION_TYPES = [
+    ('info', 'New Assignment', 'A new assignment has been posted'),
+    ('info', 'Quiz Available', 'A new quiz is now available'),
+    ('success', 'Feedback Received', 'Your submission has been graded'),
+    ('warning', 'Deadline Approaching', 'An assignment is due in 24 hours'),
+    ('info', 'Announcement', 'Your teacher posted a class announcement')
+]
+
+
+def timestamp(epoch):
+    """Timestamp string in the format CURRENT_TIMESTAMP uses"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+
+def clip(value, low=0, high=100):
+    return max(low, min(high, value))
+
+
+class Generator:
+    """Deterministic row source for one (seed, anchor, volumes) combination"""
+
+    def __init__(self, volumes, seed=42, anchor=None, days=365):
+        self.volumes = volumes
+        self.rng = random.Random(seed)
+        anchor = anchor or datetime.now(timezone.utc).date()
+        self.anchor = int(datetime(anchor.year, anchor.month, anchor.day, tzinfo=timezone.utc).timestamp())
+        self.start = self.anchor - days * DAY
+        self.days = days
+        self.hours = list(itertools.accumulate(HOUR_WEIGHTS))
+
+    # Shared distributions
+    def weights(self, count, sigma=0.9):
+        """Cumulative log-normal weights, so a few items get most of the activity"""
+        return list(itertools.accumulate(self.rng.lognormvariate(0, sigma) for _ in range(count)))
+
+    def pick(self, population, cumulative, count):
+        return self.rng.choices(population, cum_weights=cumulative, k=count)
+
+    def time_of_day(self, epoch):
+        """Move an instant to a realistic hour of the same day, damping weekends"""
+        day = epoch - epoch % DAY
+        weekday = time.gmtime(day).tm_wday
+        if weekday >= 5 and self.rng.random() > WEEKEND_ACCEPT:
+            day -= (weekday - self.rng.randrange(5)) * DAY  # move to a weekday of the same week
+        hour = self.rng.choices(range(24), cum_weights=self.hours)[0]
+        return day + hour * 3600 + self.rng.randrange(3600)
+
+    def recent_biased(self, start, end):
+        """An instant in [start, end) with more weight towards end"""
+        span = max(end - start, 1)
+        return end - int(span * self.rng.random() ** 1.4)
+
+    # Users
+    def users(self, first_id):
+        """Admin, teachers and students with explicit ids"""
+        self.admin_id = first_id
+        self.teacher_ids = list(range(first_id + 1, first_id + 1 + self.volumes["teachers"]))
+        student_start = first_id + 1 + self.volumes["teachers"]
+        self.student_ids = list(range(student_start, student_start + self.volumes["students"]))
+        self.ability = {sid: clip(self.rng.gauss(74, 11), 35, 98) for sid in self.student_ids}
+        self.student_weights = self.weights(len(self.student_ids))
+        # Zipf-like: a few teachers own most of the assignments and quizzes
+        self.teacher_weights = list(itertools.accumulate(1 / (rank ** 0.8) for rank in range(1, len(self.teacher_ids) + 1)))
+
+        roles = [(self.admin_id, 'admin')] + [(tid, 'teacher') for tid in self.teacher_ids] \
+            + [(sid, 'student') for sid in self.student_ids]
+        for user_id, role in roles:
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            created = timestamp(self.start - self.rng.randrange(90 * DAY))
+            yield {
+                "id": user_id,
+                "name": f'{first} {last}',
+                "username": f'{first.lower()}.{last.lower()}{user_id}',
+                "email": f'{first.lower()}.{last.lower()}{user_id}@academy.edu',
+                "password_hash": 'hashed_password',
+                "role": role,
+                "created_at": created,
+                "updated_at": created
+            }
+
+    # Assignments and quizzes
+    def assignments(self, first_id):
+        count = self.volumes["assignments"]
+        self.assignment_ids = list(range(first_id, first_id + count))
+        self.assignment_info = {}
+        owners = self.pick(self.teacher_ids, self.teacher_weights, count)
+        for assignment_id, owner in zip(self.assignment_ids, owners):
+            subject = self.rng.choice(SUBJECTS)
+            topic = self.rng.choice(TOPICS[subject])
+            created = self.start + self.rng.randrange(self.days * DAY)
+            deadline = created + self.rng.randint(7, 21) * DAY - 60
+            self.assignment_info[assignment_id] = (created, deadline, self.rng.gauss(0, 6))
+            yield {
+                "id": assignment_id,
+                "title": f'{subject}: {topic.capitalize()}',
+                "description": f'Complete the {topic} worksheet and show your working.',
+                "teacher_id": owner,
+                "created_by": owner,
+                "deadline": timestamp(deadline),
+                "due_date": timestamp(deadline),
+                "max_marks": 100,
+                "created_at": timestamp(created),
+                "updated_at": timestamp(created)
+            }
+        self.assignment_weights = self.weights(count, sigma=0.7)
+
+    def quizzes(self, first_id):
+        count = self.volumes["quizzes"]
+        self.quiz_ids = list(range(first_id, first_id + count))
+        self.quiz_info = {}
+        owners = self.pick(self.teacher_ids, self.teacher_weights, count)
+        for quiz_id, owner in zip(self.quiz_ids, owners):
+            subject = self.rng.choice(SUBJECTS)
+            topic = self.rng.choice(TOPICS[subject])
+            created = self.start + self.rng.randrange(self.days * DAY)
+            self.quiz_info[quiz_id] = (created, self.rng.gauss(0, 8), self.rng.randint(10, 25))
+            yield {
+                "id": quiz_id,
+                "title": f'{subject} quiz: {topic}',
+                "description": f'Check your understanding of {topic}.',
+                "teacher_id": owner,
+                "created_by": owner,
+                "created_at": timestamp(created)
+            }
+        self.quiz_weights = self.weights(count, sigma=0.7)
+
+    # Activity
+    def submissions(self):
+        count = self.volumes["submissions"]
+        recent = self.anchor - 7 * DAY
+        for offset in range(0, count, BATCH_SIZE):
+            size = min(BATCH_SIZE, count - offset)
+            students = self.pick(self.student_ids, self.student_weights, size)
+            assignments = self.pick(self.assignment_ids, self.assignment_weights, size)
+            for student_id, assignment_id in zip(students, assignments):
+                created, deadline, difficulty = self.assignment_info[assignment_id]
+                if self.rng.random() < LATE_SUBMISSION_RATE:
+                    at = deadline + int(self.rng.expovariate(1 / DAY))
+                else:
+                    at = deadline - int(self.rng.expovariate(1 / (2 * DAY)))
+                if at >= self.anchor or at < created:
+                    at = self.recent_biased(created, min(deadline, self.anchor))
+                at = min(self.time_of_day(at), self.anchor - 1)
+                ungraded = self.rng.random() < (RECENT_UNGRADED_RATE if at >= recent else OLD_UNGRADED_RATE)
+                grade = None if ungraded else round(clip(self.ability[student_id] - difficulty + self.rng.gauss(0, 9)), 1)
+                yield {
+                    "assignment_id": assignment_id,
+                    "student_id": student_id,
+                    "content": 'Please find my completed work attached.',
+                    "grade": grade,
+                    "feedback": None if grade is None else self.rng.choice(FEEDBACK),
+                    "status": 'submitted' if grade is None else 'graded',
+                    "submitted_at": timestamp(at),
+                    "submitted_epoch": at
+                }
+
+    def quiz_attempts(self):
+        count = self.volumes["quiz_attempts"]
+        for offset in range(0, count, BATCH_SIZE):
+            size = min(BATCH_SIZE, count - offset)
+            students = self.pick(self.student_ids, self.student_weights, size)
+            quizzes = self.pick(self.quiz_ids, self.quiz_weights, size)
+            for student_id, quiz_id in zip(students, quizzes):
+                created, difficulty, questions = self.quiz_info[quiz_id]
+                # Attempts cluster in the weeks after a quiz is published
+                at = created + int(self.rng.expovariate(1 / (10 * DAY)))
+                if at >= self.anchor:
+                    at = self.recent_biased(created, self.anchor)
+                at = min(self.time_of_day(at), self.anchor - 1)
+                score = round(clip(self.ability[student_id] - difficulty + self.rng.gauss(0, 12)))
+                yield {
+                    "quiz_id": quiz_id,
+                    "student_id": student_id,
+                    "score": score,
+                    "total_questions": questions,
+                    "attempted_at": timestamp(at),
+                    "attempted_epoch": at
+                }
+
+    def reflections(self):
+        count = self.volumes["reflections"]
+        for offset in range(0, count, BATCH_SIZE):
+            size = min(BATCH_SIZE, count - offset)
+            for student_id in self.pick(self.student_ids, self.student_weights, size):
+                subject = self.rng.choice(SUBJECTS)
+                topic = self.rng.choice(TOPICS[subject])
+                at = self.time_of_day(self.recent_biased(self.start, self.anchor))
+                at = min(at, self.anchor - 1)
+                content = ' '.join([
+                    self.rng.choice(REFLECTION_OPENINGS).format(subject=subject, topic=topic),
+                    self.rng.choice(REFLECTION_MIDDLES),
+                    self.rng.choice(REFLECTION_ENDINGS)
+                ])
+                yield {
+                    "student_id": student_id,
+                    "title": f'{subject} reflection: {topic}',
+                    "content": content,
+                    "learning_outcomes": self.rng.choice(OUTCOMES),
+                    "skills_developed": ', '.join(self.rng.sample(SKILLS, 2)),
+                    "created_at": timestamp(at),
+                    "created_epoch": at
+                }
+
+    def notifications(self):
+        count = self.volumes["notifications"]
+        recent = self.anchor - 7 * DAY
+        for offset in range(0, count, BATCH_SIZE):
+            size = min(BATCH_SIZE, count - offset)
+            for user_id in self.pick(self.student_ids, self.student_weights, size):
+                kind, title, message = self.rng.choice(NOTIFICATION_TYPES)
+                at = min(self.time_of_day(self.recent_biased(self.start, self.anchor)), self.anchor - 1)
+                read = self.rng.random() < (0.2 if at >= recent else 0.85)
+                yield {
+                    "user_id": user_id,
+                    "title": title,
+                    "message": message,
+                    "type": kind,
+                    "read_status": int(read),
+                    "created_at": timestamp(at)
+                }
+
+
+def insert_rows(conn, table, rows):
+    """Bulk insert generated dicts into the columns the table actually has"""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    existing = table_columns(conn, table)
+    columns = [column for column in first if column in existing]
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    rows = itertools.chain([first], rows)
+    count = 0
+    while True:
+        batch = [tuple(row[column] for column in columns) for row in itertools.islice(rows, BATCH_SIZE)]
+        if not batch:
+            return count
+        conn.executemany(sql, batch)
+        count += len(batch)
+
+
+def suspend_derived(conn):
+    """Drop triggers and secondary indexes on the activity tables, returning their SQL"""
+    placeholders = ','.join('?' * len(ACTIVITY_TABLES))
+    saved = conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('trigger', 'index') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    ''', ACTIVITY_TABLES).fetchall()
+    for kind, name, _ in saved:
+        conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+    return saved
+
+
+def restore_derived(conn, saved):
+    """Recreate suspended indexes, then triggers"""
+    for kind, _, sql in sorted(saved, key=lambda entry: entry[0] != 'index'):
+        conn.execute(sql)
+
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def rebuild_derived(conn):
+    """Recompute the rollup, activity buckets, epoch columns and unread counters in bulk"""
+    backfill_epochs(conn)
+    if table_exists(conn, ROLLUP_TABLE):
+        rebuild_rollup(conn, has_columns(conn, 'submissions', 'grade'))
+    if table_exists(conn, BUCKET_TABLE):
+        rebuild_buckets(conn, **bucket_schema_options(conn))
+        compact_buckets(conn)
+    if table_exists(conn, COUNTER_TABLE):
+        # The counter triggers were suspended with the notifications indexes
+        rebuild_counters(conn)
+
+
+def next_id(conn, table):
+    return (conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+
+
+def generate(volumes, seed=42, anchor=None, days=365, append=False, db_path=DB_PATH):
+    """Fill the database and return {table: rows inserted}"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        created = not table_exists(conn, 'users')
+        if created:
+            # New database: the standard schema plus its handful of sample rows
+            conn.close()
+            create_enhanced_tables(db_path)
+            conn = sqlite3.connect(db_path, isolation_level=None)
+        migrate(conn, verbose=False)
+
+        if not (append or created) and conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]:
+            raise RuntimeError(f"{db_path} already has users; pass --append to add to it")
+
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute('PRAGMA cache_size = -200000')
+
+        generator = Generator(volumes, seed, anchor, days)
+        counts = {}
+        started = time.perf_counter()
+        conn.execute('BEGIN')
+        try:
+            saved = suspend_derived(conn)
+            steps = [
+                ('users', generator.users(next_id(conn, 'users'))),
+                ('assignments', generator.assignments(next_id(conn, 'assignments'))),
+                ('quizzes', generator.quizzes(next_id(conn, 'quizzes'))),
+                ('submissions', generator.submissions()),
+                ('quiz_attempts', generator.quiz_attempts()),
+                ('reflections', generator.reflections()),
+                ('notifications', generator.notifications())
+            ]
+            for table, rows in steps:
+                step_started = time.perf_counter()
+                counts[table] = insert_rows(conn, table, rows) if table_exists(conn, table) else 0
+                print(f"✅ {table}: {counts[table]:,} rows in {time.perf_counter() - step_started:.1f}s")
+
+            step_started = time.perf_counter()
+            restore_derived(conn, saved)
+            rebuild_derived(conn)
+            print(f"✅ Indexes, rollup, activity buckets and counters rebuilt in {time.perf_counter() - step_started:.1f}s")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"🎉 Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+        return counts
+    finally:
+        conn.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fill education.db with synthetic scale-test data')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    for name in PRESETS['small']:
+        parser.add_argument(f'--{name.replace("_", "-")}', type=int, dest=name,
+                            help=f'number of {name.replace("_", " ")} (overrides the preset)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        help='date the data ends at, YYYY-MM-DD (default: today)')
+    parser.add_argument('--days', type=int, default=365, help='days of history before the anchor')
+    parser.add_argument('--append', action='store_true', help='add to a database that already has users')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    volumes = dict(PRESETS[args.preset])
+    volumes.update({name: getattr(args, name) for name in volumes if getattr(args, name) is not None})
+    if volumes["students"] < 1 or volumes["teachers"] < 1 or volumes["assignments"] < 1 or volumes["quizzes"] < 1:
+        print("❌ At least one student, teacher, assignment and quiz is needed")
+        sys.exit(1)
+    print(f"🧪 Generating into {DB_PATH} (seed {args.seed}): "
+          + ', '.join(f'{name}={count:,}' for name, count in volumes.items()))
+    try:
+        generate(volumes, args.seed, args.anchor, args.days, args.append)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations for Academic Portal
+Versioned, idempotent schema changes applied on server startup
+
+Usage:
+    python migrations.py           # apply pending migrations
+    python migrations.py --check   # show EXPLAIN QUERY PLAN for the hot queries
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from analytics_buckets import compact_buckets, create_bucket_schema, rebuild_buckets
+from analytics_rollup import create_rollup_schema, rebuild_rollup
+from db_pool import get_db_connection
+from epoch_columns import backfill_epochs, create_epoch_schema
+from notification_counters import create_counter_schema, rebuild_counters
+from notification_outbox import create_outbox_schema
+from notification_scheduler import create_queue_schema
+
+# Longest wait for another worker's migration to release the write lock (seconds)
+MIGRATION_LOCK_TIMEOUT = float(os.environ.get('MIGRATION_LOCK_TIMEOUT', 600))
+
+# Registered migrations: (version, name, required tables, function)
+MIGRATIONS = []
+
+
+def migration(version, name, requires=()):
+    """Register a migration function under a schema version"""
+    def register(func):
+        MIGRATIONS.append((version, name, tuple(requires), func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+def table_columns(conn, table):
+    """Get the column names of a table (empty if the table does not exist)"""
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def has_columns(conn, table, *columns):
+    """Check that a table exists and has all of the given columns"""
+    existing = table_columns(conn, table)
+    return bool(existing) and all(column in existing for column in columns)
+
+
+def create_index(conn, name, table, columns, where=None):
+    """Create an index if every column it needs exists"""
+    names = [column.split()[0] for column in columns]
+    if not has_columns(conn, table, *names):
+        return False
+    sql = f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+    if where:
+        sql += f' WHERE {where}'
+    conn.execute(sql)
+    return True
+
+
+def current_version(conn):
+    """Get the highest applied migration version"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn=None, verbose=True):
+    """Apply all pending migrations in order and return the applied versions
+
+    Each migration runs under BEGIN IMMEDIATE and re-reads the applied
+    version first, so workers starting together on the same database wait
+    for each other instead of failing, and none applies a version twice.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = get_db_connection()
+
+    applied = []
+    busy_timeout = conn.execute('PRAGMA busy_timeout').fetchone()[0]
+    try:
+        # Another worker may hold the write lock for a whole backfill
+        conn.execute(f'PRAGMA busy_timeout = {int(MIGRATION_LOCK_TIMEOUT * 1000)}')
+        version = current_version(conn)
+        for migration_version, name, requires, func in MIGRATIONS:
+            if migration_version <= version:
+                continue
+
+            missing = [table for table in requires if not table_columns(conn, table)]
+            if missing:
+                # Wait until the tables exist; later migrations may depend on this one
+                if verbose:
+                    print(f"⏸️ Migration {migration_version} ({name}) waiting for tables: {', '.join(missing)}")
+                break
+
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                version = conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()[0]
+                if migration_version <= version:
+                    # Applied by another worker while this one waited for the lock
+                    conn.rollback()
+                    continue
+                func(conn)
+                conn.execute(
+                    'INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                    (migration_version, name, datetime.now().isoformat())
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            version = migration_version
+            applied.append(migration_version)
+            if verbose:
+                print(f"✅ Applied migration {migration_version}: {name}")
+    finally:
+        conn.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+        if owns_conn:
+            conn.close()
+    return applied
+
+
+@migration(1, 'hot path indexes', requires=('submissions', 'quiz_attempts', 'notifications'))
+def add_hot_path_indexes(conn):
+    """Composite indexes for the per-student and per-teacher lookups"""
+    # Per-student timelines; the trailing grade/score columns let the
+    # aggregate queries be answered from the index alone
+    if not create_index(conn, 'idx_submissions_student_submitted', 'submissions',
+                        ['student_id', 'submitted_at DESC', 'grade']):
+        create_index(conn, 'idx_submissions_student_submitted', 'submissions',
+                     ['student_id', 'submitted_at DESC'])
+    if not create_index(conn, 'idx_quiz_attempts_student_attempted', 'quiz_attempts',
+                        ['student_id', 'attempted_at DESC', 'score']):
+        create_index(conn, 'idx_quiz_attempts_student_attempted', 'quiz_attempts',
+                     ['student_id', 'attempted_at DESC'])
+    create_index(conn, 'idx_reflections_student_created', 'reflections',
+                 ['student_id', 'created_at DESC'])
+    create_index(conn, 'idx_notifications_user_created', 'notifications',
+                 ['user_id', 'created_at DESC'])
+
+    # Join and per-teacher lookups
+    create_index(conn, 'idx_submissions_assignment', 'submissions', ['assignment_id'])
+    create_index(conn, 'idx_quiz_attempts_quiz', 'quiz_attempts', ['quiz_id'])
+    create_index(conn, 'idx_quizzes_teacher_created', 'quizzes', ['teacher_id', 'created_at DESC'])
+    create_index(conn, 'idx_quizzes_created_by', 'quizzes', ['created_by', 'created_at DESC'])
+    create_index(conn, 'idx_assignments_teacher_created', 'assignments', ['teacher_id', 'created_at DESC'])
+    create_index(conn, 'idx_users_role', 'users', ['role'])
+
+    conn.execute('ANALYZE')
+
+
+@migration(2, 'student analytics rollup', requires=('submissions', 'quiz_attempts', 'reflections'))
+def add_student_analytics_rollup(conn):
+    """Per-student rollup table maintained by triggers, backfilled from history"""
+    has_grade = has_columns(conn, 'submissions', 'grade')
+    create_rollup_schema(conn, has_grade)
+    rebuild_rollup(conn, has_grade)
+
+
+@migration(3, 'analytics timeframe indexes', requires=('submissions', 'quiz_attempts'))
+def add_timeframe_indexes(conn):
+    """Covering indexes for the class analytics timeframe scans"""
+    if not create_index(conn, 'idx_submissions_submitted', 'submissions',
+                        ['submitted_at', 'assignment_id', 'student_id', 'grade']):
+        create_index(conn, 'idx_submissions_submitted', 'submissions',
+                     ['submitted_at', 'assignment_id', 'student_id'])
+    create_index(conn, 'idx_quiz_attempts_attempted', 'quiz_attempts',
+                 ['attempted_at', 'quiz_id', 'student_id', 'score'])
+    conn.execute('ANALYZE')
+
+
+def bucket_schema_options(conn):
+    """Schema-dependent settings for the activity bucket triggers"""
+    def owner(table):
+        columns = table_columns(conn, table)
+        return next((column for column in ('teacher_id', 'created_by') if column in columns), None)
+
+    return {
+        "has_grade": has_columns(conn, 'submissions', 'grade'),
+        "assignment_owner": owner('assignments'),
+        "quiz_owner": owner('quizzes')
+    }
+
+
+@migration(4, 'activity buckets', requires=('submissions', 'quiz_attempts', 'reflections', 'assignments', 'quizzes'))
+def add_activity_buckets(conn):
+    """Daily/weekly activity buckets maintained by triggers, backfilled from history"""
+    options = bucket_schema_options(conn)
+    create_bucket_schema(conn, **options)
+    rebuild_buckets(conn, **options)
+    compact_buckets(conn)
+
+
+@migration(5, 'epoch timestamp columns', requires=('submissions', 'quiz_attempts', 'reflections'))
+def add_epoch_columns(conn):
+    """Integer epoch copies of the activity timestamps for indexed range filters"""
+    create_epoch_schema(conn)
+    backfill_epochs(conn)
+
+    # Recency windows per student, and timeframe scans covering the
+    # columns the class analytics CTE reads
+    create_index(conn, 'idx_quiz_attempts_student_epoch', 'quiz_attempts', ['student_id', 'attempted_epoch'])
+    create_index(conn, 'idx_submissions_student_epoch', 'submissions', ['student_id', 'submitted_epoch'])
+    create_index(conn, 'idx_reflections_student_epoch', 'reflections', ['student_id', 'created_epoch'])
+    if not create_index(conn, 'idx_submissions_epoch', 'submissions',
+                        ['submitted_epoch', 'assignment_id', 'student_id', 'grade', 'submitted_at']):
+        create_index(conn, 'idx_submissions_epoch', 'submissions',
+                     ['submitted_epoch', 'assignment_id', 'student_id', 'submitted_at'])
+    create_index(conn, 'idx_quiz_attempts_epoch', 'quiz_attempts',
+                 ['attempted_epoch', 'quiz_id', 'student_id', 'score', 'attempted_at'])
+    conn.execute('ANALYZE')
+
+
+@migration(6, 'notification outbox')
+def add_notification_outbox(conn):
+    """Per-room event log that reconnecting sockets replay from"""
+    create_outbox_schema(conn)
+
+
+@migration(7, 'notification unread counters', requires=('notifications',))
+def add_notification_counters(conn):
+    """Trigger-maintained unread counts per user, backfilled from history"""
+    create_counter_schema(conn)
+    rebuild_counters(conn)
+
+
+@migration(8, 'notification digest queue')
+def add_notification_digest_queue(conn):
+    """Queue of low-priority and rate-limited notifications awaiting their digest"""
+    create_queue_schema(conn)
+
+
+@migration(9, 'notification id tiebreak indexes', requires=('notifications',))
+def add_notification_tiebreak_indexes(conn):
+    """Per-user notification indexes ordered by (created_at, id), so same-second rows list newest first"""
+    conn.execute('DROP INDEX IF EXISTS idx_notifications_user_created')
+    conn.execute('DROP INDEX IF EXISTS idx_notifications_user_unread')
+    create_index(conn, 'idx_notifications_user_created', 'notifications', ['user_id', 'created_at DESC', 'id DESC'])
+    create_counter_schema(conn)
+
+
+@migration(10, 'rollup delete triggers', requires=('submissions', 'quiz_attempts', 'reflections'))
+def fix_rollup_delete_triggers(conn):
+    """Rollup delete triggers that move last_*_at back to the latest remaining row"""
+    has_grade = has_columns(conn, 'submissions', 'grade')
+    create_rollup_schema(conn, has_grade)
+    rebuild_rollup(conn, has_grade)
+
+
+@migration(11, 'activity bucket delete triggers',
+           requires=('submissions', 'quiz_attempts', 'reflections', 'assignments', 'quizzes'))
+def fix_activity_bucket_delete_triggers(conn):
+    """Bucket delete triggers that take a student with no activity left in a week out of active_students"""
+    options = bucket_schema_options(conn)
+    create_bucket_schema(conn, **options)
+    rebuild_buckets(conn, **options)
+    compact_buckets(conn)
+
+
+# Hot queries whose plans must use an index: (name, table, sql, params);
+# {quiz_owner} is the schema's teacher column, as in bucket_schema_options()
+HOT_QUERIES = [
+    ('student submissions', 'submissions',
+     'SELECT * FROM submissions WHERE student_id = ? ORDER BY submitted_at DESC', (1,)),
+    ('student quiz attempts', 'quiz_attempts',
+     'SELECT * FROM quiz_attempts WHERE student_id = ? ORDER BY attempted_at DESC', (1,)),
+    ('student reflections', 'reflections',
+     'SELECT * FROM reflections WHERE student_id = ? ORDER BY created_at DESC', (1,)),
+    ('user notifications', 'notifications',
+     'SELECT * FROM notifications WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 10', (1,)),
+    ('user unread notifications', 'notifications',
+     'SELECT * FROM notifications WHERE user_id = ? AND COALESCE(read_status, 0) = 0 '
+     'ORDER BY created_at DESC, id DESC LIMIT 10', (1,)),
+    ('submissions in timeframe', 'submissions',
+     'SELECT student_id, assignment_id FROM submissions WHERE submitted_at >= ?', ('2024-01-01',)),
+    ('quiz attempts in timeframe', 'quiz_attempts',
+     'SELECT student_id, quiz_id, score FROM quiz_attempts WHERE attempted_at >= ?', ('2024-01-01',)),
+    ('student recent quiz attempts', 'quiz_attempts',
+     'SELECT COUNT(*) FROM quiz_attempts WHERE student_id = ? AND attempted_epoch >= ?', (1, 0)),
+    ('submissions in epoch timeframe', 'submissions',
+     'SELECT student_id, assignment_id FROM submissions WHERE submitted_epoch >= ?', (0,)),
+    ('quiz attempts in epoch timeframe', 'quiz_attempts',
+     'SELECT student_id, quiz_id, score FROM quiz_attempts WHERE attempted_epoch >= ?', (0,)),
+    ('teacher quizzes', 'quizzes',
+     'SELECT * FROM quizzes WHERE {quiz_owner} = ? ORDER BY created_at DESC', (1,)),
+]
+
+
+def check_query_plans(conn=None):
+    """Run EXPLAIN QUERY PLAN on the hot queries
+
+    Returns a list of (name, plan lines, ok). A plan is ok when it searches
+    an index and does not need a temporary b-tree to sort; a query that
+    cannot be prepared on this schema is not ok, with the error as its plan.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = get_db_connection()
+
+    results = []
+    try:
+        options = bucket_schema_options(conn)
+        for name, table, sql, params in HOT_QUERIES:
+            try:
+                rows = conn.execute(f'EXPLAIN QUERY PLAN {sql.format(**options)}', params).fetchall()
+            except sqlite3.Error as e:
+                results.append((name, [f'error: {e}'], False))
+                continue
+            plan = [row[-1] for row in rows]
+            ok = (any(line.startswith(f'SEARCH {table}') for line in plan)
+                  and not any('TEMP B-TREE' in line for line in plan))
+            results.append((name, plan, ok))
+    finally:
+        if owns_conn:
+            conn.close()
+    return results
+
+
+if __name__ == '__main__':
+    if '--check' in sys.argv:
+        failures = 0
+        for name, plan, ok in check_query_plans():
+            print(f"{'✅' if ok else '❌'} {name}")
+            for line in plan:
+                print(f"    {line}")
+            failures += 0 if ok else 1
+        sys.exit(1 if failures else 0)
+
+    applied = migrate()
+    print(f"🎉 {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
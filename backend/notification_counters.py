@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unread Notification Counters for Academic Portal
+Per-user unread counts kept up to date on write, and set-based mark-read
+
+Triggers on notifications add or remove one from the owner's row in
+notification_unread_counts whenever an unread notification is inserted,
+read, reassigned or deleted, so the bell reads a single primary-key row
+instead of counting notifications. Marking read is one UPDATE per request
+however many notifications it covers; a partial index on the unread rows
+keeps those updates and unread-only listings off the read history.
+
+Usage:
+    python notification_counters.py             # show the users with the most unread notifications
+    python notification_counters.py --rebuild   # recompute every counter from the notifications table
+"""
+
+import sys
+
+from db_pool import get_db_connection
+
+COUNTER_TABLE = 'notification_unread_counts'
+
+# read_status is a BOOLEAN column that may hold NULL; the partial index and
+# every query use this exact expression so SQLite can match them
+UNREAD = 'COALESCE(read_status, 0) = 0'
+
+
+def _unread(row):
+    return f'COALESCE({row}.read_status, 0) = 0'
+
+
+def _adjust(row, delta):
+    """Trigger statement moving the counter of row's owner by delta"""
+    return f'''
+        INSERT INTO {COUNTER_TABLE} (user_id, unread) VALUES ({row}.user_id, {delta})
+        ON CONFLICT (user_id) DO UPDATE SET unread = MAX(unread + {delta}, 0)
+    '''
+
+
+def create_counter_schema(conn):
+    """Create the counter table, its triggers and the partial unread index"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_unread
+        ON notifications (user_id, created_at DESC, id DESC) WHERE {UNREAD}
+    ''')
+
+    triggers = {
+        'trg_notifications_unread_insert': f'''
+            AFTER INSERT ON notifications
+            WHEN NEW.user_id IS NOT NULL AND {_unread('NEW')}
+            BEGIN {_adjust('NEW', 1)}; END
+        ''',
+        'trg_notifications_unread_delete': f'''
+            AFTER DELETE ON notifications
+            WHEN OLD.user_id IS NOT NULL AND {_unread('OLD')}
+            BEGIN {_adjust('OLD', -1)}; END
+        ''',
+        # Marking read, marking unread again, or moving to another user
+        'trg_notifications_unread_update': f'''
+            AFTER UPDATE OF read_status, user_id ON notifications
+            WHEN ({_unread('OLD')}) != ({_unread('NEW')}) OR OLD.user_id IS NOT NEW.user_id
+            BEGIN
+                UPDATE {COUNTER_TABLE} SET unread = MAX(unread - 1, 0)
+                WHERE user_id = OLD.user_id AND {_unread('OLD')};
+                INSERT INTO {COUNTER_TABLE} (user_id, unread)
+                SELECT NEW.user_id, 1 WHERE NEW.user_id IS NOT NULL AND {_unread('NEW')}
+                ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+            END
+        '''
+    }
+    for name, body in triggers.items():
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(f'CREATE TRIGGER {name} {body}')
+
+
+def rebuild_counters(conn):
+    """Recompute every user's counter from the notifications table"""
+    conn.execute(f'DELETE FROM {COUNTER_TABLE}')
+    conn.execute(f'''
+        INSERT INTO {COUNTER_TABLE} (user_id, unread)
+        SELECT user_id, COUNT(*) FROM notifications
+        WHERE user_id IS NOT NULL AND {UNREAD}
+        GROUP BY user_id
+    ''')
+
+
+def unread_count(conn, user_id):
+    """Unread notifications of one user"""
+    row = conn.execute(f'SELECT unread FROM {COUNTER_TABLE} WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def mark_read(conn, user_id, notification_ids):
+    """Mark some of a user's notifications read; returns how many changed. The caller commits"""
+    ids = []
+    for notification_id in notification_ids:
+        try:
+            ids.append(int(notification_id))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return 0
+    # json_each takes the whole id list as one parameter, however long it is
+    return conn.execute(f'''
+        UPDATE notifications SET read_status = 1
+        WHERE user_id = ? AND {UNREAD}
+          AND id IN (SELECT value FROM json_each(?))
+    ''', (user_id, '[' + ','.join(map(str, ids)) + ']')).rowcount
+
+
+def mark_all_read(conn, user_id, up_to_id=None):
+    """Mark all of a user's notifications read, optionally only up to an id; the caller commits
+
+    up_to_id lets a client clear what it has shown without also clearing a
+    notification that arrived after the list was fetched.
+    """
+    sql = f'UPDATE notifications SET read_status = 1 WHERE user_id = ? AND {UNREAD}'
+    params = [user_id]
+    if up_to_id is not None:
+        sql += ' AND id <= ?'
+        params.append(int(up_to_id))
+    return conn.execute(sql, params).rowcount
+
+
+if __name__ == '__main__':
+    conn = get_db_connection()
+    if '--rebuild' in sys.argv:
+        rebuild_counters(conn)
+        conn.commit()
+        print("✅ Unread notification counters rebuilt")
+    rows = conn.execute(f'''
+        SELECT user_id, unread FROM {COUNTER_TABLE} WHERE unread > 0 ORDER BY unread DESC LIMIT 10
+    ''').fetchall()
+    conn.close()
+    for user_id, unread in rows:
+        print(f"👤 User {user_id}: {unread} unread")
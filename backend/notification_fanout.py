@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Class-Wide Notification Fan-Out for Academic Portal
+Writes one notification row per recipient in a single transaction and pushes them with one emit
+
+An announcement to a class or the whole school resolves its recipients
+with one query, inserts every notifications row with executemany inside
+one transaction (one commit and fsync instead of one per student), and
+then reaches every connected recipient with a single emit to the class or
+role room rather than one emit per student.
+
+The recipients of a class are the students who have submitted to the
+teacher's assignments, the same students notification_router puts in
+class:<teacher_id>.
+"""
+
+from notification_router import owner_column
+
+NOTIFICATION_TYPES = ('info', 'general', 'assignment', 'quiz', 'feedback', 'announcement', 'reminder', 'urgent')
+
+
+def class_student_ids(conn, teacher_id):
+    """Students in a teacher's class"""
+    owner = owner_column(conn, 'assignments')
+    if owner is None:
+        return []
+    rows = conn.execute(f'''
+        SELECT DISTINCT s.student_id
+        FROM assignments a
+        JOIN submissions s ON s.assignment_id = a.id
+        WHERE a.{owner} = ? AND s.student_id IS NOT NULL
+    ''', (teacher_id,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def role_user_ids(conn, role=None):
+    """Users with a role, or every user"""
+    if role is None:
+        rows = conn.execute('SELECT id FROM users').fetchall()
+    else:
+        rows = conn.execute('SELECT id FROM users WHERE role = ?', (role,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def fan_out(conn, user_ids, title, message, notification_type='info'):
+    """Insert one notification per recipient with a single executemany; the caller commits
+
+    Returns the recipients written, de-duplicated and in their original order.
+    """
+    recipients = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+    conn.executemany('''
+        INSERT INTO notifications (user_id, title, message, type, read_status, created_at)
+        VALUES (?, ?, ?, ?, 0, datetime('now'))
+    ''', [(user_id, title, message, notification_type) for user_id in recipients])
+    return recipients
+
+
+def announcement_payload(data, sender_id=None):
+    """Validated title/message/type of an announcement request, or raise ValueError"""
+    title = (data.get('title') or '').strip()
+    message = (data.get('message') or '').strip()
+    if not title or not message:
+        raise ValueError("title and message are required")
+    notification_type = data.get('type') or 'info'
+    if notification_type not in NOTIFICATION_TYPES:
+        raise ValueError(f"type must be one of {', '.join(NOTIFICATION_TYPES)}")
+    return {
+        "title": title,
+        "message": message,
+        "type": notification_type,
+        "action_url": data.get('action_url'),
+        "sender_id": sender_id
+    }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Notification Outbox for Academic Portal
+Append-only event log per room, so reconnecting clients replay only what they missed
+
+Durable events (DURABLE_EVENTS) sent through the NotificationRouter are
+appended to notification_outbox under each target room (user:<id>,
+class:<id>, role:<role>, ...) with a sequence number that increases by one
+per room. The emitted payload carries those numbers in "_outbox", e.g.
+{"_outbox": {"user:7": 42}}, and clients keep the last number seen per room.
+
+After a reconnect the client sends 'resume' with those cursors and gets an
+'outbox_replay' frame holding only the newer events, instead of refetching
+its notification lists. Events older than NOTIFICATION_OUTBOX_RETENTION_DAYS
+are pruned; a cursor that falls behind the retained history, or a gap
+larger than NOTIFICATION_OUTBOX_REPLAY_LIMIT, is reported as truncated so
+the client knows to refetch that room's data once.
+"""
+
+import json
+import os
+import threading
+import time
+
+from db_pool import get_dedicated_connection
+from epoch_columns import DAY_SECONDS
+
+# Outbox settings
+NOTIFICATION_OUTBOX_RETENTION_DAYS = float(os.environ.get('NOTIFICATION_OUTBOX_RETENTION_DAYS', 7))
+NOTIFICATION_OUTBOX_REPLAY_LIMIT = int(os.environ.get('NOTIFICATION_OUTBOX_REPLAY_LIMIT', 200))
+
+OUTBOX_TABLE = 'notification_outbox'
+HEADS_TABLE = 'notification_outbox_heads'
+PRUNE_EVERY = 500  # appends between retention sweeps
+
+# Events clients must not miss across a reconnect
+DURABLE_EVENTS = frozenset({
+    'new_notification', 'new_assignment', 'new_reflection', 'new_feedback', 'new_quiz',
+    'assignment_graded', 'quiz_graded', 'feedback_provided', 'notification_digest'
+})
+
+
+def create_outbox_schema(conn):
+    """Create the outbox log and the per-room sequence heads"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {OUTBOX_TABLE} (
+            stream TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_epoch INTEGER NOT NULL,
+            PRIMARY KEY (stream, seq)
+        )
+    ''')
+    # The rowid gives the global append order used to merge streams on replay
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{OUTBOX_TABLE}_created ON {OUTBOX_TABLE} (created_epoch)')
+    # first_seq is the oldest retained sequence, last_seq the newest assigned
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {HEADS_TABLE} (
+            stream TEXT PRIMARY KEY,
+            first_seq INTEGER NOT NULL DEFAULT 1,
+            last_seq INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+def append_events(conn, event, data, streams, now=None):
+    """Append one event to several streams and return {stream: seq}; the caller commits
+
+    The stored payload carries the full {stream: seq} map under "_outbox", so
+    an event replayed through more than one stream can be recognised.
+    """
+    now = int(time.time() if now is None else now)
+    sequences = {}
+    for stream in streams:
+        conn.execute(f'''
+            INSERT INTO {HEADS_TABLE} (stream, last_seq) VALUES (?, 1)
+            ON CONFLICT (stream) DO UPDATE SET last_seq = last_seq + 1
+        ''', (stream,))
+        sequences[stream] = conn.execute(
+            f'SELECT last_seq FROM {HEADS_TABLE} WHERE stream = ?', (stream,)
+        ).fetchone()[0]
+    payload = json.dumps(dict(data, _outbox=sequences), default=str)
+    conn.executemany(
+        f'INSERT INTO {OUTBOX_TABLE} (stream, seq, event, payload, created_epoch) VALUES (?, ?, ?, ?, ?)',
+        [(stream, seq, event, payload, now) for stream, seq in sequences.items()]
+    )
+    return sequences
+
+
+def prune_outbox(conn, retention_days=NOTIFICATION_OUTBOX_RETENTION_DAYS, now=None):
+    """Drop events past the retention window and advance each stream's first_seq"""
+    now = time.time() if now is None else now
+    deleted = conn.execute(
+        f'DELETE FROM {OUTBOX_TABLE} WHERE created_epoch < ?', (int(now - retention_days * DAY_SECONDS),)
+    ).rowcount
+    if deleted:
+        conn.execute(f'''
+            UPDATE {HEADS_TABLE} SET first_seq = COALESCE(
+                (SELECT MIN(seq) FROM {OUTBOX_TABLE} o WHERE o.stream = {HEADS_TABLE}.stream),
+                last_seq + 1
+            )
+        ''')
+    return deleted
+
+
+class NotificationOutbox:
+    """Records durable events and replays them from per-room cursors
+
+    Appends commit on a dedicated connection, so recording an event never
+    commits a caller's unfinished transaction.
+    """
+
+    def __init__(self, get_connection=get_dedicated_connection, retention_days=NOTIFICATION_OUTBOX_RETENTION_DAYS,
+                 replay_limit=NOTIFICATION_OUTBOX_REPLAY_LIMIT, durable_events=DURABLE_EVENTS):
+        self.get_connection = get_connection
+        self.retention_days = retention_days
+        self.replay_limit = replay_limit
+        self.durable_events = durable_events
+        self._appends = 0
+        self._lock = threading.Lock()
+
+    def is_durable(self, event):
+        return event in self.durable_events
+
+    def record(self, event, data, streams):
+        """Append an event to each stream and return {stream: seq}"""
+        conn = self.get_connection()
+        try:
+            sequences = append_events(conn, event, data, streams)
+            conn.commit()
+            with self._lock:
+                self._appends += 1
+                prune = self._appends % PRUNE_EVERY == 0
+            if prune:
+                prune_outbox(conn, self.retention_days)
+                conn.commit()
+            return sequences
+        finally:
+            conn.close()
+
+    def heads(self, streams):
+        """Latest sequence per stream (0 for streams with no events yet)"""
+        streams = list(streams)
+        if not streams:
+            return {}
+        conn = self.get_connection()
+        try:
+            placeholders = ', '.join('?' for _ in streams)
+            rows = conn.execute(
+                f'SELECT stream, last_seq FROM {HEADS_TABLE} WHERE stream IN ({placeholders})', streams
+            ).fetchall()
+        finally:
+            conn.close()
+        heads = dict.fromkeys(streams, 0)
+        heads.update({row[0]: row[1] for row in rows})
+        return heads
+
+    def replay(self, cursors):
+        """Events after each stream's cursor, oldest first
+
+        Returns {"events": [{"event", "data"}], "cursors": {stream: seq},
+        "truncated": [streams whose gap could not be replayed in full]}.
+        An event stored under several of the streams is returned once.
+        """
+        found = []
+        latest = {}
+        truncated = []
+        conn = self.get_connection()
+        try:
+            for stream, after in cursors.items():
+                try:
+                    after = int(after)
+                except (TypeError, ValueError):
+                    continue
+                head = conn.execute(
+                    f'SELECT first_seq, last_seq FROM {HEADS_TABLE} WHERE stream = ?', (stream,)
+                ).fetchone()
+                latest[stream] = head[1] if head is not None else 0
+                if head is None or after >= head[1]:
+                    continue
+                rows = conn.execute(f'''
+                    SELECT rowid, event, payload FROM {OUTBOX_TABLE}
+                    WHERE stream = ? AND seq > ?
+                    ORDER BY seq
+                    LIMIT ?
+                ''', (stream, after, self.replay_limit + 1)).fetchall()
+                if len(rows) > self.replay_limit or after < head[0] - 1:
+                    # Too far behind, or part of the gap was pruned: the client refetches
+                    truncated.append(stream)
+                if len(rows) > self.replay_limit:
+                    continue
+                found.extend(rows)
+        finally:
+            conn.close()
+
+        events = []
+        seen = set()
+        for _, event, payload in sorted(found, key=lambda row: row[0]):
+            data = json.loads(payload)
+            key = tuple(sorted(data.get('_outbox', {}).items()))
+            if key in seen:
+                continue
+            seen.add(key)
+            events.append({"event": event, "data": data})
+        return {"events": events, "cursors": latest, "truncated": truncated}
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Notification Router for Academic Portal
+Delivers real-time events to per-user, per-role and per-class Socket.IO rooms
+
+Every socket joins user:<id> and role:<role> when the frontend sends
+'join' / 'join_teacher_room' / 'join_student_room'. Teachers also join
+class:<teacher_id>, and students join the class rooms of the teachers
+whose assignments they have submitted to. Events are emitted to the rooms
+their payload addresses, so server egress grows with the recipients
+instead of with every connected socket. A socket in several of the target
+rooms still receives an event once.
+
+Payloads address recipients with any of these keys, at the top level or
+inside a nested "notification" object:
+
+    user_id / user_ids       user:<id>
+    role / roles             role:<role>
+    class_id / class_ids     class:<teacher_id>
+    room / rooms             an explicit room name
+
+Events that address nobody are broadcast while ROUTER_BROADCAST_UNTARGETED
+is on (the old behaviour, for clients that do not send targets yet) and
+dropped otherwise. With an EventBatcher (event_batcher.py) events are
+buffered per target and coalesced before they go out. With a
+NotificationOutbox (notification_outbox.py) durable targeted events are
+logged per room first, so reconnecting clients can replay them.
+"""
+
+import os
+import sqlite3
+import threading
+
+from flask_socketio import join_room
+
+# Router settings
+ROUTER_BROADCAST_UNTARGETED = os.environ.get('ROUTER_BROADCAST_UNTARGETED', '1') == '1'
+
+ROLES = ('student', 'teacher', 'admin')
+
+
+def user_room(user_id):
+    return f'user:{int(user_id)}'
+
+
+def role_room(role):
+    return f'role:{role}'
+
+
+def class_room(teacher_id):
+    return f'class:{int(teacher_id)}'
+
+
+def owner_column(conn, table):
+    """Column naming the teacher who owns a row: teacher_id, or created_by on the enhanced schema"""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+    return next((column for column in ('teacher_id', 'created_by') if column in columns), None)
+
+
+def student_class_ids(conn, student_id):
+    """Teachers whose assignments a student has submitted to"""
+    owner = owner_column(conn, 'assignments')
+    if owner is None:
+        return []
+    rows = conn.execute(f'''
+        SELECT DISTINCT a.{owner}
+        FROM submissions s
+        JOIN assignments a ON a.id = s.assignment_id
+        WHERE s.student_id = ? AND a.{owner} IS NOT NULL
+    ''', (student_id,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def rooms_for_user(user_id, role=None, conn=None):
+    """Rooms a user's sockets belong to"""
+    rooms = [user_room(user_id)]
+    if role in ROLES:
+        rooms.append(role_room(role))
+    if role == 'teacher':
+        rooms.append(class_room(user_id))
+    elif role == 'student' and conn is not None:
+        rooms.extend(class_room(teacher_id) for teacher_id in student_class_ids(conn, user_id))
+    return rooms
+
+
+# Payload keys naming recipients: (single key, list key, room for one value)
+TARGET_KEYS = (
+    ('user_id', 'user_ids', user_room),
+    ('role', 'roles', role_room),
+    ('class_id', 'class_ids', class_room),
+    ('room', 'rooms', str)
+)
+
+
+def recipient_rooms(data):
+    """Rooms addressed by an event payload, in a stable order"""
+    if not isinstance(data, dict):
+        return []
+    sources = [data]
+    if isinstance(data.get('notification'), dict):
+        sources.append(data['notification'])
+
+    rooms = []
+    for source in sources:
+        for single, plural, to_room in TARGET_KEYS:
+            values = list(source[plural]) if isinstance(source.get(plural), (list, tuple)) else []
+            if source.get(single) not in (None, ''):
+                values.insert(0, source[single])
+            for value in values:
+                try:
+                    rooms.append(to_room(value))
+                except (TypeError, ValueError):
+                    continue
+    return list(dict.fromkeys(rooms))
+
+
+class NotificationRouter:
+    """Room membership and targeted emits for one SocketIO server"""
+
+    def __init__(self, socketio, broadcast_untargeted=ROUTER_BROADCAST_UNTARGETED, batcher=None, outbox=None):
+        self.socketio = socketio
+        self.broadcast_untargeted = broadcast_untargeted
+        self.batcher = batcher
+        self.outbox = outbox
+        self._lock = threading.Lock()
+        self._stats = {"joins": 0, "targeted": 0, "broadcast": 0, "dropped": 0, "recorded": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def join(self, user_id, role=None, get_connection=None):
+        """Put the current socket in the user's rooms; call from a socket event handler
+
+        get_connection is only needed for students, to look up their class rooms.
+        The user and role rooms are joined first, so a failed lookup cannot
+        keep the socket out of them.
+        """
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return []
+        rooms = rooms_for_user(user_id, role)
+        for room in rooms:
+            join_room(room)
+
+        if role == 'student' and get_connection is not None:
+            conn = get_connection()
+            try:
+                class_rooms = [class_room(teacher_id) for teacher_id in student_class_ids(conn, user_id)]
+            except sqlite3.Error as e:
+                print(f"⚠️ Class rooms for student {user_id} unavailable: {e}")
+                class_rooms = []
+            finally:
+                conn.close()
+            for room in class_rooms:
+                join_room(room)
+            rooms.extend(class_rooms)
+
+        self._count("joins")
+        return rooms
+
+    def send(self, event, data, rooms=None, immediate=False):
+        """Emit to the given rooms, or to the rooms the payload addresses
+
+        Events go through the batcher, if there is one, unless immediate is set.
+        Durable events are appended to the outbox before they are emitted.
+        """
+        rooms = list(rooms) if rooms else recipient_rooms(data)
+        if rooms and self.outbox is not None and self.outbox.is_durable(event) and isinstance(data, dict):
+            sequences = self.outbox.record(event, data, rooms)
+            data = dict(data, _outbox=sequences)
+            self._count("recorded")
+        if rooms:
+            self._emit(event, data, rooms, immediate)
+            self._count("targeted")
+        elif self.broadcast_untargeted:
+            self._emit(event, data, None, immediate)
+            self._count("broadcast")
+        else:
+            self._count("dropped")
+        return rooms
+
+    def _emit(self, event, data, rooms, immediate):
+        if self.batcher is not None and not immediate:
+            self.batcher.add(event, data, rooms)
+        elif rooms:
+            self.socketio.emit(event, data, to=rooms)
+        else:
+            self.socketio.emit(event, data)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
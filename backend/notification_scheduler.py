@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Notification Digest Scheduler for Academic Portal
+Sends urgent notifications at once and folds the rest into periodic per-user digests
+
+Every notification gets a priority class, either from the request or from
+its event (EVENT_PRIORITIES):
+
+    urgent   written and pushed immediately, never delayed
+    normal   immediate until the user has had NOTIFICATION_RATE_LIMIT of
+             them within NOTIFICATION_RATE_WINDOW seconds; later ones wait
+             in the digest queue until that window has passed
+    low      always queued, and delivered NOTIFICATION_DIGEST_WINDOW
+             seconds after they arrive
+
+Queued items for the same entity replace each other, like the status events
+in event_batcher.py, so a burst of assignment_status_update events for one
+submission leaves one item. When any of a user's items falls due, all of
+that user's queued items go out together as one notifications row and one
+'notification_digest' frame to user:<id>:
+
+    {"user_id": 7, "notification": {...}, "items": [{"event", "title", "message", "data"}, ...]}
+
+A digest holding a single item is delivered as that item's own row and
+event. The queue lives in the database, so it survives restarts and is
+shared by workers; the rate limit is counted per worker process.
+
+Usage:
+    python notification_scheduler.py           # deliver the digests that are due now
+    python notification_scheduler.py --all     # deliver every queued digest now
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from db_pool import get_dedicated_connection
+from event_batcher import coalesce_key
+from notification_router import user_room
+
+# Scheduler settings
+NOTIFICATION_DIGEST_WINDOW = float(os.environ.get('NOTIFICATION_DIGEST_WINDOW', 300))  # seconds
+NOTIFICATION_RATE_LIMIT = int(os.environ.get('NOTIFICATION_RATE_LIMIT', 5))  # 0 digests every normal item
+NOTIFICATION_RATE_WINDOW = float(os.environ.get('NOTIFICATION_RATE_WINDOW', 60))  # seconds
+NOTIFICATION_SCHEDULER_INTERVAL = float(os.environ.get('NOTIFICATION_SCHEDULER_INTERVAL', 10))  # seconds, 0 disables
+
+QUEUE_TABLE = 'notification_digest_queue'
+DIGEST_EVENT = 'notification_digest'
+DIGEST_PREVIEW = 3  # item titles quoted in the digest message
+
+PRIORITIES = ('urgent', 'normal', 'low')
+
+# Default priority per event; anything else is normal
+EVENT_PRIORITIES = {
+    'assignment_status_update': 'low',
+    'quiz_status_update': 'low',
+    'progress_updated': 'low',
+    'dashboard_refresh': 'low',
+    'assignment_graded': 'normal',
+    'quiz_graded': 'normal',
+    'feedback_provided': 'normal',
+    'new_assignment': 'normal',
+    'new_quiz': 'normal'
+}
+
+
+def create_queue_schema(conn):
+    """Create the digest queue"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            coalesce_key TEXT,
+            title TEXT NOT NULL,
+            message TEXT,
+            type TEXT NOT NULL DEFAULT 'info',
+            payload TEXT NOT NULL,
+            created_epoch INTEGER NOT NULL,
+            due_epoch INTEGER NOT NULL
+        )
+    ''')
+    # Upsert target for superseding items; NULL keys never conflict
+    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{QUEUE_TABLE}_user_key ON {QUEUE_TABLE} (user_id, coalesce_key)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{QUEUE_TABLE}_due ON {QUEUE_TABLE} (due_epoch, user_id)')
+
+
+def enqueue(conn, user_id, event, title, message, notification_type, data, due_epoch, now=None):
+    """Queue one item, replacing a queued item for the same entity; the caller commits"""
+    now = int(time.time() if now is None else now)
+    key = coalesce_key(event, data)
+    conn.execute(f'''
+        INSERT INTO {QUEUE_TABLE} (user_id, event, coalesce_key, title, message, type, payload, created_epoch, due_epoch)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, coalesce_key) DO UPDATE SET
+            title = excluded.title, message = excluded.message, type = excluded.type,
+            payload = excluded.payload, due_epoch = MIN(due_epoch, excluded.due_epoch)
+    ''', (user_id, event, json.dumps(key, default=str) if key else None, title, message, notification_type,
+          json.dumps(data, default=str), now, int(due_epoch)))
+
+
+def due_users(conn, now=None):
+    """Users with at least one queued item that is due"""
+    now = time.time() if now is None else now
+    rows = conn.execute(f'SELECT DISTINCT user_id FROM {QUEUE_TABLE} WHERE due_epoch <= ?', (int(now),)).fetchall()
+    return [row[0] for row in rows]
+
+
+def claim_items(conn, user_id):
+    """Remove and return every queued item of a user, oldest first; the caller commits
+
+    The DELETE ... RETURNING claims the rows, so two workers flushing the
+    same user cannot both deliver them.
+    """
+    rows = conn.execute(f'''
+        DELETE FROM {QUEUE_TABLE} WHERE user_id = ?
+        RETURNING id, event, title, message, type, payload
+    ''', (user_id,)).fetchall()
+    return [
+        {"event": row[1], "title": row[2], "message": row[3], "type": row[4], "data": json.loads(row[5])}
+        for row in sorted(rows, key=lambda row: row[0])
+    ]
+
+
+def insert_notification(conn, user_id, title, message, notification_type):
+    conn.execute('''
+        INSERT INTO notifications (user_id, title, message, type, read_status, created_at)
+        VALUES (?, ?, ?, ?, 0, datetime('now'))
+    ''', (user_id, title, message, notification_type))
+
+
+def digest_message(items):
+    """Summary line listing the first few item titles"""
+    titles = [item['title'] for item in items[:DIGEST_PREVIEW]]
+    more = len(items) - len(titles)
+    return '; '.join(titles) + (f' and {more} more' if more > 0 else '')
+
+
+class NotificationScheduler:
+    """Priority-aware delivery of per-user notifications through a NotificationRouter
+
+    Without a router notifications are only written, not pushed. Queue and
+    delivery writes commit on a dedicated connection, so they never commit a
+    caller's unfinished transaction.
+    """
+
+    def __init__(self, router, get_connection=get_dedicated_connection, digest_window=NOTIFICATION_DIGEST_WINDOW,
+                 rate_limit=NOTIFICATION_RATE_LIMIT, rate_window=NOTIFICATION_RATE_WINDOW):
+        self.router = router
+        self.get_connection = get_connection
+        self.digest_window = digest_window
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self._recent = {}  # user_id -> deque of immediate normal delivery times
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {"immediate": 0, "queued": 0, "digests": 0, "digested_items": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def priority_for(self, event, notification_type=None, priority=None):
+        if priority in PRIORITIES:
+            return priority
+        if notification_type == 'urgent':
+            return 'urgent'
+        return EVENT_PRIORITIES.get(event, 'normal')
+
+    def _within_rate(self, user_id, now):
+        """Record an immediate normal delivery if the user is under the rate limit"""
+        with self._lock:
+            recent = self._recent.setdefault(user_id, deque())
+            while recent and recent[0] <= now - self.rate_window:
+                recent.popleft()
+            if len(recent) >= self.rate_limit:
+                return False
+            recent.append(now)
+            return True
+
+    def submit(self, user_id, event, title, message='', notification_type='info', data=None, priority=None):
+        """Deliver a notification now or queue it for the user's digest
+
+        Returns (priority, "sent" or "queued").
+        """
+        user_id = int(user_id)
+        data = dict(data or {}, user_id=user_id)
+        priority = self.priority_for(event, notification_type, priority)
+        now = time.time()
+
+        if priority == 'urgent' or (priority == 'normal' and self._within_rate(user_id, now)):
+            self._deliver(user_id, [{"event": event, "title": title, "message": message,
+                                     "type": notification_type, "data": data}], immediate=True)
+            self._count("immediate")
+            return priority, "sent"
+
+        due = now + (self.digest_window if priority == 'low' else self.rate_window)
+        conn = self.get_connection()
+        try:
+            enqueue(conn, user_id, event, title, message, notification_type, data, due, now)
+            conn.commit()
+        finally:
+            conn.close()
+        self._count("queued")
+        return priority, "queued"
+
+    def _deliver(self, user_id, items, immediate=False):
+        """Write one notifications row for the items and push them to the user's room"""
+        if len(items) == 1:
+            item = items[0]
+            row = (item['title'], item['message'], item['type'])
+            event, payload = item['event'], item['data']
+        else:
+            row = (f'{len(items)} updates', digest_message(items), 'digest')
+            event = DIGEST_EVENT
+            payload = {
+                "user_id": user_id,
+                "notification": {"title": row[0], "message": row[1], "type": row[2]},
+                "items": items
+            }
+
+        conn = self.get_connection()
+        try:
+            insert_notification(conn, user_id, *row)
+            conn.commit()
+        finally:
+            conn.close()
+        if self.router is not None:
+            self.router.send(event, payload, rooms=[user_room(user_id)], immediate=immediate)
+
+    def flush(self, user_id):
+        """Deliver everything queued for one user as a single digest"""
+        conn = self.get_connection()
+        try:
+            items = claim_items(conn, user_id)
+            conn.commit()
+        finally:
+            conn.close()
+        if items:
+            self._deliver(user_id, items)
+            self._count("digests")
+            self._count("digested_items", len(items))
+        return len(items)
+
+    def flush_due(self, now=None, everything=False):
+        """Deliver the digests of every user with a due item (or every queued user)"""
+        conn = self.get_connection()
+        try:
+            if everything:
+                users = [row[0] for row in conn.execute(f'SELECT DISTINCT user_id FROM {QUEUE_TABLE}').fetchall()]
+            else:
+                users = due_users(conn, now)
+        finally:
+            conn.close()
+        for user_id in users:
+            self.flush(user_id)
+        return len(users)
+
+    def start(self, interval=NOTIFICATION_SCHEDULER_INTERVAL):
+        """Deliver due digests periodically in a background thread"""
+        if interval <= 0:
+            return None
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.flush_due()
+                    except Exception as e:
+                        print(f"⚠️ Notification digest delivery failed: {e}")
+
+            self._thread = threading.Thread(target=run, name='notification-digests', daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+if __name__ == '__main__':
+    # Digests delivered from here reach sockets only through SOCKETIO_MESSAGE_QUEUE
+    from notification_router import NotificationRouter
+    from socket_broker import SOCKETIO_MESSAGE_QUEUE, write_only_manager
+
+    router = None
+    if SOCKETIO_MESSAGE_QUEUE:
+        router = NotificationRouter(write_only_manager(), broadcast_untargeted=False)
+    else:
+        print("⚠️ SOCKETIO_MESSAGE_QUEUE is not set; digests are written but not pushed")
+    scheduler = NotificationScheduler(router)
+    delivered = scheduler.flush_due(everything='--all' in sys.argv)
+    print(f"📬 Delivered digests to {delivered} user(s)")
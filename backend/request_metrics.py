@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Request Metrics for Academic Portal
+Per-route latency histograms, SQL query counts and cache outcomes in Prometheus text format
+
+install_metrics(app) hooks the Flask request cycle and serves /api/metrics.
+SQL statements are counted through the db_pool query listeners and cache
+lookups through the analytics_cache listeners, both attributed to the
+request running on the current thread/greenlet. Routes are labelled by
+their URL rule (/api/student/<int:student_id>/analytics), not the raw
+path, so label cardinality stays bounded.
+"""
+
+import os
+import threading
+import time
+
+from analytics_cache import add_cache_listener
+from db_pool import add_query_listener, get_pool
+
+# Metrics settings
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
+
+# Histogram buckets (seconds for latency, counts for queries, bytes for responses)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CACHE_OUTCOMES = ('hit', 'stale', 'coalesced', 'miss')
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class _RequestState:
+    """Counters for the request running on one thread/greenlet"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.cache = dict.fromkeys(CACHE_OUTCOMES, 0)
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-route metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._routes = {}  # (method, route) -> per-route metrics
+        self._requests = {}  # (method, route, status) -> count
+        self._started = time.time()
+
+    # Per-request state
+    def begin(self):
+        self._local.state = _RequestState()
+
+    def current(self):
+        return getattr(self._local, 'state', None)
+
+    def end(self):
+        state = self.current()
+        self._local.state = None
+        return state
+
+    def on_query(self, sql, params, seconds, rows):
+        state = self.current()
+        if state is not None:
+            state.queries += 1
+            state.sql_seconds += seconds
+
+    def on_cache(self, key, outcome):
+        state = self.current()
+        if state is not None and outcome in state.cache:
+            state.cache[outcome] += 1
+
+    def record(self, method, route, status, seconds, state, response_bytes):
+        """Fold one finished request into the route's metrics"""
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = {
+                    "latency": Histogram(LATENCY_BUCKETS),
+                    "queries": Histogram(QUERY_COUNT_BUCKETS),
+                    "sql_seconds": 0.0,
+                    "response": Histogram(RESPONSE_SIZE_BUCKETS),
+                    "cache": dict.fromkeys(CACHE_OUTCOMES, 0)
+                }
+            metrics["latency"].observe(seconds)
+            metrics["queries"].observe(state.queries)
+            metrics["sql_seconds"] += state.sql_seconds
+            if response_bytes is not None:
+                metrics["response"].observe(response_bytes)
+            for outcome, count in state.cache.items():
+                metrics["cache"][outcome] += count
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._requests.clear()
+
+    def render(self, cache=None, pool=None):
+        """Prometheus text exposition of every metric"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, labels, hist):
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{{labels}}} {hist.total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            requests = sorted(self._requests.items())
+
+            family('portal_http_requests_total', 'counter', 'Requests by route, method and status')
+            for (method, route, status), count in requests:
+                lines.append(f'portal_http_requests_total{{{_labels(method, route)},status="{status}"}} {count}')
+
+            family('portal_http_request_duration_seconds', 'histogram', 'Request latency by route')
+            for (method, route), metrics in routes:
+                histogram('portal_http_request_duration_seconds', _labels(method, route), metrics["latency"])
+
+            family('portal_http_request_queries', 'histogram', 'SQL statements executed per request')
+            for (method, route), metrics in routes:
+                histogram('portal_http_request_queries', _labels(method, route), metrics["queries"])
+
+            family('portal_http_request_sql_seconds_total', 'counter', 'Time spent executing SQL by route')
+            for (method, route), metrics in routes:
+                lines.append(f'portal_http_request_sql_seconds_total{{{_labels(method, route)}}} '
+                             f'{metrics["sql_seconds"]:.6f}')
+
+            family('portal_http_response_size_bytes', 'histogram', 'Response body size by route')
+            for (method, route), metrics in routes:
+                histogram('portal_http_response_size_bytes', _labels(method, route), metrics["response"])
+
+            family('portal_http_request_cache_lookups_total', 'counter', 'Analytics cache lookups by route and outcome')
+            for (method, route), metrics in routes:
+                for outcome, count in metrics["cache"].items():
+                    lines.append(f'portal_http_request_cache_lookups_total{{{_labels(method, route)},'
+                                 f'outcome="{outcome}"}} {count}')
+
+        family('portal_uptime_seconds', 'gauge', 'Seconds since the metrics registry was created')
+        lines.append(f'portal_uptime_seconds {time.time() - self._started:.3f}')
+
+        if cache is not None:
+            stats = cache.stats()
+            family('portal_analytics_cache', 'gauge', 'Analytics cache counters and size')
+            for name in ('hits', 'misses', 'stale_hits', 'coalesced', 'evictions', 'expirations',
+                         'invalidations', 'size', 'in_flight'):
+                lines.append(f'portal_analytics_cache{{stat="{name}"}} {stats[name]}')
+
+        if pool is not None:
+            stats = pool.stats()
+            family('portal_db_pool', 'gauge', 'Database connection pool counters and size')
+            for name, value in sorted(stats.items()):
+                lines.append(f'portal_db_pool{{stat="{name}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method, route):
+    return f'method="{_escape(method)}",route="{_escape(route)}"'
+
+
+def server_timing(seconds, state):
+    """Server-Timing header value for a finished request"""
+    parts = [
+        f'app;dur={seconds * 1000:.1f}',
+        f'db;dur={state.sql_seconds * 1000:.1f};desc="{state.queries} queries"'
+    ]
+    lookups = {outcome: count for outcome, count in state.cache.items() if count}
+    if lookups:
+        desc = ' '.join(f'{outcome}={count}' for outcome, count in lookups.items())
+        parts.append(f'cache;desc="{desc}"')
+    return ', '.join(parts)
+
+
+registry = MetricsRegistry()
+
+
+def install_metrics(app, cache=None, server_timing_header=METRICS_SERVER_TIMING, enabled=METRICS_ENABLED):
+    """Hook request metrics into a Flask app and serve them at /api/metrics"""
+    from flask import Response, request
+
+    if not enabled:
+        return None
+
+    add_query_listener(registry.on_query)
+    add_cache_listener(registry.on_cache)
+
+    @app.before_request
+    def start_request_metrics():
+        registry.begin()
+
+    @app.after_request
+    def record_request_metrics(response):
+        state = registry.end()
+        if state is None:
+            return response
+        seconds = time.perf_counter() - state.started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        size = None if response.is_streamed else response.calculate_content_length()
+        registry.record(request.method, route, response.status_code, seconds, state, size)
+        if server_timing_header:
+            response.headers['Server-Timing'] = server_timing(seconds, state)
+        return response
+
+    @app.teardown_request
+    def clear_request_metrics(error=None):
+        # after_request is skipped when a view raises; do not leak the state
+        registry.end()
+
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """Prometheus scrape endpoint"""
+        return Response(registry.render(cache, get_pool()), mimetype='text/plain; version=0.0.4')
+
+    return registry
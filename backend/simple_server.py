@@ -7,8 +7,6 @@ Provides basic API endpoints and WebSocket support
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import sqlite3
-import os
 import json
 from datetime import datetime
 import uuid
@@ -23,14 +21,12 @@ CORS(app, origins=["http://localhost:3001", "http://localhost:3000"])
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3001", "http://localhost:3000"])
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'education.db')
+# Database path and pooled connections shared by all routes
+from db_pool import get_db_connection, install_pool_teardown
+from migrations import migrate
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Return connections a route leaves checked out when its request ends
+install_pool_teardown(app)
 
 def init_database():
     """Initialize database with basic tables"""
@@ -181,6 +177,7 @@ def init_database():
 
 # Initialize database on startup
 init_database()
+migrate()
 
 # API Routes
 @app.route('/')
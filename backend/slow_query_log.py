@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Slow-Query Log for Academic Portal
+Logs statements slower than a threshold with their shape, timing and query plan
+
+Entries are JSON lines written to SLOW_QUERY_LOG_PATH (or printed when no
+path is set). SQL is normalized (literals and IN lists collapsed,
+whitespace squeezed) and parameters are logged by type only, so entries
+group by statement and never contain user data. EXPLAIN QUERY PLAN runs
+once per distinct statement on a separate read-only connection; plans that
+scan a whole table without an index are flagged with full_scan.
+
+Usage:
+    python slow_query_log.py [path]   # summarize a log by statement
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+
+from db_pool import DB_PATH, add_query_listener
+
+# Slow-query settings
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))  # 0 disables
+SLOW_QUERY_LOG_PATH = os.environ.get('SLOW_QUERY_LOG_PATH')
+SLOW_QUERY_RECENT = int(os.environ.get('SLOW_QUERY_RECENT', 100))  # entries kept in memory
+
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_CTE_NAME = re.compile(r'(\w+)\s+AS\s*\(', re.IGNORECASE)
+_PLAN_SCAN = re.compile(r'^SCAN (\S+)(.*)$')
+
+
+def normalize_sql(sql):
+    """Collapse literals, placeholder lists and whitespace so similar statements match"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('(?, ...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    """Short stable id for a normalized statement"""
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def full_scan(sql, plan):
+    """Whether a plan walks a whole table without an index
+
+    Scans of the statement's own CTEs and subqueries are not table scans.
+    """
+    derived = {name.lower() for name in _CTE_NAME.findall(sql)}
+    for line in plan:
+        match = _PLAN_SCAN.match(line)
+        if match and ' USING ' not in match.group(2) and match.group(1).lower() not in derived \
+                and not match.group(1).startswith('('):
+            return True
+    return False
+
+
+def params_shape(params):
+    """Describe parameters by count and type without their values"""
+    if params is None:
+        return {"count": 0}
+    if isinstance(params, dict):
+        return {"count": len(params), "names": sorted(params)}
+    if isinstance(params, (list, tuple)):
+        types = sorted({type(value).__name__ for value in params})
+        return {"count": len(params), "types": types}
+    return {"count": 1, "types": [type(params).__name__]}
+
+
+class SlowQueryLog:
+    """Query listener that records statements over a duration threshold"""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, path=SLOW_QUERY_LOG_PATH, db_path=DB_PATH,
+                 recent=SLOW_QUERY_RECENT):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.db_path = db_path
+        self._plans = {}  # fingerprint -> plan lines
+        self._recent = deque(maxlen=recent)
+        self._counts = {}  # fingerprint -> slow executions
+        self._lock = threading.Lock()
+
+    def __call__(self, sql, params, seconds, rows):
+        if self.threshold <= 0 or seconds < self.threshold:
+            return
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        entry = {
+            "at": datetime.now().isoformat(),
+            "fingerprint": key,
+            "sql": normalized,
+            "params": params_shape(params),
+            "duration_ms": round(seconds * 1000, 2),
+            "rows": rows
+        }
+        with self._lock:
+            first = key not in self._plans
+            if first:
+                self._plans[key] = self.explain(sql, params)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            plan = self._plans[key]
+        if plan is not None:
+            entry["full_scan"] = full_scan(sql, plan)
+            if first:
+                entry["plan"] = plan
+        with self._lock:
+            self._recent.append(entry)
+            self._write(entry)
+
+    def explain(self, sql, params):
+        """EXPLAIN QUERY PLAN lines for a statement, or None if it cannot be explained"""
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            try:
+                rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params or ()).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return [f'unavailable: {e}']
+        return [row[-1] for row in rows]
+
+    def _write(self, entry):
+        line = json.dumps(entry, default=str)
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+        else:
+            print(f"🐢 Slow query ({entry['duration_ms']} ms, {entry['rows']} rows): {line}")
+
+    def recent(self):
+        """The most recent slow-query entries, newest last"""
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self):
+        """Slow executions per statement fingerprint"""
+        with self._lock:
+            return dict(self._counts)
+
+
+def install_slow_query_log(threshold_ms=SLOW_QUERY_MS, path=SLOW_QUERY_LOG_PATH):
+    """Start logging slow statements on every pooled connection"""
+    if threshold_ms <= 0:
+        return None
+    log = SlowQueryLog(threshold_ms, path)
+    add_query_listener(log)
+    return log
+
+
+def summarize(path):
+    """Aggregate a slow-query log file by statement, slowest total first"""
+    statements = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            stats = statements.setdefault(entry["fingerprint"], {
+                "sql": entry["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "full_scan": entry.get("full_scan", False), "plan": None
+            })
+            stats["count"] += 1
+            stats["total_ms"] += entry["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], entry["duration_ms"])
+            if entry.get("plan"):
+                stats["plan"] = entry["plan"]
+    return sorted(statements.values(), key=lambda stats: stats["total_ms"], reverse=True)
+
+
+if __name__ == '__main__':
+    log_path = sys.argv[1] if len(sys.argv) > 1 else SLOW_QUERY_LOG_PATH
+    if not log_path:
+        print("❌ Pass a log path or set SLOW_QUERY_LOG_PATH")
+        sys.exit(1)
+    try:
+        statements = summarize(log_path)
+    except FileNotFoundError:
+        print(f"❌ No slow-query log at {log_path}")
+        sys.exit(1)
+    for stats in statements:
+        flag = '⚠️ full scan' if stats["full_scan"] else ''
+        print(f"{stats['count']:>6}x  total {stats['total_ms']:.1f} ms  max {stats['max_ms']:.1f} ms  {flag}")
+        print(f"    {stats['sql'][:200]}")
+        for line in stats["plan"] or []:
+            print(f"      {line}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Message Queue for Academic Portal
+Cross-process emit and room fan-out, so several server workers share one set of clients
+
+Each worker keeps its own sockets and rooms. An emit from any worker is
+published on the message queue, and every worker delivers it to the
+matching sockets it holds. SOCKETIO_MESSAGE_QUEUE picks the backend:
+
+    (unset)                     single process, no queue
+    sqlite:///broker.db         SQLiteManager below; relative to the working directory
+    sqlite:////var/run/lms.db   the same with an absolute path
+    redis://host:6379/0         any URL Flask-SocketIO supports (redis, amqp, kafka, zmq)
+
+The SQLite broker is a reference backend for single-host deployments and
+tests: publishers append JSON messages to a WAL-mode table and each worker
+polls for rows past the last id it has seen, so delivery latency is up to
+SOCKETIO_QUEUE_POLL_MS. Messages older than SOCKETIO_QUEUE_RETENTION
+seconds are pruned. Behind a load balancer the long-polling transport needs
+sticky sessions; websocket-only clients do not.
+
+A process without a server (a scheduled job, a script) can emit to clients
+with write_only_manager().emit(event, data, room=...).
+
+Usage:
+    SOCKETIO_MESSAGE_QUEUE=sqlite:////tmp/lms-broker.db gunicorn -k eventlet -w 1 -b :5006 basic_server:app
+    (run one such process per port and balance across them)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import socketio
+
+# Message queue settings
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+SOCKETIO_QUEUE_CHANNEL = os.environ.get('SOCKETIO_QUEUE_CHANNEL', 'academic-portal')
+SOCKETIO_QUEUE_POLL_MS = float(os.environ.get('SOCKETIO_QUEUE_POLL_MS', 20))
+SOCKETIO_QUEUE_RETENTION = float(os.environ.get('SOCKETIO_QUEUE_RETENTION', 300))  # seconds
+
+QUEUE_TABLE = 'socketio_messages'
+POLL_BATCH = 500
+PRUNE_EVERY = 1000  # publishes between retention sweeps
+
+
+def sqlite_queue_path(url):
+    """File path of a sqlite:// queue URL, or None for other schemes"""
+    prefix = 'sqlite:///'
+    if not url.startswith(prefix):
+        return None
+    return url[len(prefix):]
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """Socket.IO client manager that uses a SQLite table as its pub/sub channel"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, channel=SOCKETIO_QUEUE_CHANNEL, write_only=False, logger=None, json=None,
+                 poll_ms=SOCKETIO_QUEUE_POLL_MS, retention=SOCKETIO_QUEUE_RETENTION):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self.retention = retention
+        self._local = threading.local()
+        self._published = 0
+        self._last_id = None
+        conn = self._connection()
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{QUEUE_TABLE}_created ON {QUEUE_TABLE} (created_at)')
+
+    def _connection(self):
+        # One connection per thread; publishes come from request threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _publish(self, data):
+        conn = self._connection()
+        conn.execute(
+            f'INSERT INTO {QUEUE_TABLE} (channel, payload, created_at) VALUES (?, ?, ?)',
+            (self.channel, self.json.dumps(data), time.time())
+        )
+        self._published += 1
+        if self._published % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete messages past the retention window"""
+        self._connection().execute(
+            f'DELETE FROM {QUEUE_TABLE} WHERE created_at < ?', (time.time() - self.retention,)
+        )
+
+    def _tail(self):
+        return self._connection().execute(f'SELECT COALESCE(MAX(id), 0) FROM {QUEUE_TABLE}').fetchone()[0]
+
+    def initialize(self):
+        # Messages from before this worker started are not replayed; the tail
+        # is read before the listener thread starts, so nothing published
+        # while it spins up is skipped
+        if not self.write_only:
+            self._last_id = self._tail()
+        super().initialize()
+
+    def _listen(self):
+        conn = self._connection()
+        last_id = self._last_id if self._last_id is not None else self._tail()
+        while True:
+            rows = conn.execute(
+                f'SELECT id, payload FROM {QUEUE_TABLE} WHERE id > ? AND channel = ? ORDER BY id LIMIT ?',
+                (last_id, self.channel, POLL_BATCH)
+            ).fetchall()
+            for message_id, payload in rows:
+                last_id = message_id
+                yield payload
+            if len(rows) < POLL_BATCH:
+                self.server.sleep(self.poll_interval)
+
+
+def socketio_options(url=SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_QUEUE_CHANNEL):
+    """Keyword arguments for SocketIO(app, ...) that attach the configured message queue"""
+    if not url:
+        return {}
+    path = sqlite_queue_path(url)
+    if path is not None:
+        return {"client_manager": SQLiteManager(path, channel)}
+    return {"message_queue": url, "channel": channel}
+
+
+def write_only_manager(url=SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_QUEUE_CHANNEL):
+    """A manager that emits to clients from a process without a Socket.IO server"""
+    path = sqlite_queue_path(url)
+    if path is not None:
+        return SQLiteManager(path, channel, write_only=True)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=True)
+    if url:
+        return socketio.KombuManager(url, channel=channel, write_only=True)
+    raise ValueError("SOCKETIO_MESSAGE_QUEUE is not set")
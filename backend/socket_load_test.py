@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Load Test for Academic Portal
+Opens thousands of Socket.IO clients against a local server to find the per-node connection ceiling
+
+Clients are python-socketio AsyncClients sharing one asyncio loop, so a
+single process can hold thousands of connections. The test grows the
+connection count in steps. At each step every new client connects, waits
+for the server's 'connected' event and joins a room via 'join_room'. A
+sender client then fires notifications through 'send_notification', and
+the test records:
+
+    connect latency    connect() until the 'connected' event
+    join latency       'join_room' until 'joined_room'
+    delivery latency   'send_notification' until each client's 'new_notification'
+                       (on its own or inside an 'event_batch' frame)
+    dropped            expected deliveries that never arrived
+    unexpected         deliveries to clients outside the target room
+    memory/connection  server RSS growth per open connection (Linux /proc)
+
+Notifications carry a 'room' target, so by default (--expect room) only
+that room's clients should receive them; --expect all is for servers that
+broadcast every notification. The test stops at the first step that
+breaks the failure-rate or delivery budget; the last step within budget is
+reported as the connection ceiling.
+
+Without --url a server is started from basic_server on a free local port.
+Requires the asyncio client extras: pip install "python-socketio[asyncio_client]"
+
+Usage:
+    python socket_load_test.py --clients 2000 --step 500
+    python socket_load_test.py --url http://localhost:5006 --server-pid 1234 --clients 5000 --step 1000
+    python socket_load_test.py --clients 1000 --rooms 1 --messages 50 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+try:
+    import socketio
+    import aiohttp  # noqa: F401  (transport for socketio.AsyncClient)
+except ImportError:  # optional; only this tool needs the asyncio client
+    socketio = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Load-test settings
+LOAD_TEST_ROOM_PREFIX = 'loadtest-'
+LOAD_TEST_CONNECT_TIMEOUT = float(os.environ.get('LOAD_TEST_CONNECT_TIMEOUT', 10))
+LOAD_TEST_SETTLE_TIMEOUT = float(os.environ.get('LOAD_TEST_SETTLE_TIMEOUT', 10))
+LOAD_TEST_SERVER_START_TIMEOUT = 30
+
+# Budgets a step must stay within to count towards the ceiling
+MAX_FAILURE_RATE = 0.01
+MAX_DELIVERY_P95_MS = 1000
+
+# Server started when no --url is given
+SERVER_SCRIPT = '''
+import basic_server
+basic_server.socketio.run(basic_server.app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True)
+'''
+
+
+def percentiles(values):
+    """p50/p95/p99 and max of a list of milliseconds, or None when empty"""
+    from analytics_columns import ScoreColumns
+
+    if not values:
+        return None
+    column = ScoreColumns(values)
+    return {
+        "p50": round(column.percentile(50), 2),
+        "p95": round(column.percentile(95), 2),
+        "p99": round(column.percentile(99), 2),
+        "max": round(column.maximum(), 2)
+    }
+
+
+def server_rss_kb(pid):
+    """Resident memory of a process in KiB, or None off Linux / without a pid"""
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def raise_fd_limit():
+    """Lift the open-file soft limit to the hard limit; each client holds a socket"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, db_path=None):
+    """Run basic_server in a child process and wait until it accepts connections"""
+    env = dict(os.environ)
+    if db_path:
+        env['EDUCATION_DB_PATH'] = db_path
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVER_SCRIPT.format(port=port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + LOAD_TEST_SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode} during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not accept connections within {LOAD_TEST_SERVER_START_TIMEOUT}s")
+
+
+class LoadTest:
+    """A growing pool of clients plus the measurements for the current step"""
+
+    def __init__(self, url, rooms, expect, connect_timeout=LOAD_TEST_CONNECT_TIMEOUT,
+                 connect_concurrency=200):
+        self.url = url
+        self.rooms = rooms
+        self.expect = expect
+        self.connect_timeout = connect_timeout
+        self._gate = asyncio.Semaphore(connect_concurrency)
+        self.clients = []  # (index, client, room)
+        self.attempted = 0
+        self.sender = None
+        self.reset()
+
+    def reset(self):
+        """Start a new step's measurements; open clients are kept"""
+        self.connect_ms = []
+        self.join_ms = []
+        self.connect_failures = 0
+        self.errors = {}
+        self.sent = {}  # message id -> (perf_counter at send, room)
+        self.received = {}  # message id -> client indexes that got it
+        self.delivery_ms = []
+        self.unexpected = 0
+
+    def room_for(self, index):
+        return f'{LOAD_TEST_ROOM_PREFIX}{index % self.rooms}'
+
+    async def open_client(self, index):
+        """Connect one client, wait for 'connected' and join its room"""
+        loop = asyncio.get_running_loop()
+        client = socketio.AsyncClient(reconnection=False)
+        room = self.room_for(index)
+        connected = loop.create_future()
+        joined = loop.create_future()
+
+        @client.on('connected')
+        def on_connected(data=None):
+            if not connected.done():
+                connected.set_result(time.perf_counter())
+
+        @client.on('joined_room')
+        def on_joined(data=None):
+            if not joined.done() and (data or {}).get('room') == room:
+                joined.set_result(time.perf_counter())
+
+        @client.on('new_notification')
+        def on_notification(data=None):
+            self.on_notification(index, room, data)
+
+        @client.on('event_batch')
+        def on_batch(data=None):
+            for item in (data or {}).get('events', []):
+                if item.get('event') == 'new_notification':
+                    self.on_notification(index, room, item.get('data'))
+
+        async with self._gate:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(client.connect(self.url, transports=['websocket']),
+                                       self.connect_timeout)
+                self.connect_ms.append((await asyncio.wait_for(connected, self.connect_timeout) - started) * 1000)
+                join_started = time.perf_counter()
+                await client.emit('join_room', {'room': room})
+                self.join_ms.append((await asyncio.wait_for(joined, self.connect_timeout) - join_started) * 1000)
+            except (asyncio.TimeoutError, socketio.exceptions.SocketIOError, OSError) as e:
+                self.connect_failures += 1
+                kind = type(e).__name__
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+                await client.disconnect()
+                return
+        self.clients.append((index, client, room))
+
+    def on_notification(self, index, room, data):
+        message = data.get('load_test_id') if isinstance(data, dict) else None
+        if message not in self.sent:
+            return
+        sent_at, target = self.sent[message]
+        self.delivery_ms.append((time.perf_counter() - sent_at) * 1000)
+        self.received[message].add(index)
+        if self.expect == 'room' and room != target:
+            self.unexpected += 1
+
+    def expected(self, message):
+        """Client indexes that should receive a message"""
+        _, target = self.sent[message]
+        return {index for index, _, room in self.clients if self.expect == 'all' or room == target}
+
+    async def grow(self, total):
+        """Open clients until `total` have been attempted; returns the attempts made"""
+        first, self.attempted = self.attempted, max(total, self.attempted)
+        await asyncio.gather(*(self.open_client(index) for index in range(first, total)))
+        return max(total - first, 0)
+
+    async def fire(self, count, rate):
+        """Send `count` notifications at `rate` per second, cycling through the rooms"""
+        if self.sender is None:
+            # The sender joins no room and is never counted as a recipient
+            self.sender = socketio.AsyncClient(reconnection=False)
+            await self.sender.connect(self.url, transports=['websocket'])
+        for number in range(count):
+            message = uuid.uuid4().hex
+            target = self.room_for(number)
+            self.received[message] = set()
+            self.sent[message] = (time.perf_counter(), target)
+            await self.sender.emit('send_notification', {
+                'load_test_id': message,
+                'room': target,
+                'title': 'Load test',
+                'message': f'Load test notification {number}'
+            })
+            await asyncio.sleep(1 / rate)
+
+    async def settle(self, timeout):
+        """Wait until every expected delivery arrived or the timeout passes"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if all(self.expected(message) <= self.received[message] for message in self.sent):
+                return
+            await asyncio.sleep(0.05)
+
+    def dropped(self):
+        return sum(len(self.expected(message) - self.received[message]) for message in self.sent)
+
+    async def close(self):
+        clients = [client for _, client, _ in self.clients]
+        if self.sender is not None:
+            clients.append(self.sender)
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+
+
+async def run(args, server_pid=None):
+    """Grow the client pool step by step and return the results document"""
+    test = LoadTest(args.url, args.rooms, args.expect, args.connect_timeout, args.connect_concurrency)
+    baseline_rss = server_rss_kb(server_pid)
+    totals = list(range(args.step, args.clients, args.step)) + [args.clients] if args.step else [args.clients]
+    steps = []
+    ceiling = 0
+    try:
+        for total in totals:
+            test.reset()
+            started = time.perf_counter()
+            attempted = await test.grow(total)
+            ramp_seconds = time.perf_counter() - started
+            rss = server_rss_kb(server_pid)
+
+            await test.fire(args.messages, args.rate)
+            await test.settle(args.settle_timeout)
+            expected = sum(len(test.expected(message)) for message in test.sent)
+            dropped = test.dropped()
+
+            step = {
+                "clients": len(test.clients),
+                "attempted": attempted,
+                "connect_failures": test.connect_failures,
+                "errors": test.errors,
+                "ramp_seconds": round(ramp_seconds, 2),
+                "connect_ms": percentiles(test.connect_ms),
+                "join_ms": percentiles(test.join_ms),
+                "messages": len(test.sent),
+                "expected_deliveries": expected,
+                "dropped": dropped,
+                "unexpected": test.unexpected,
+                "delivery_ms": percentiles(test.delivery_ms),
+                "server_rss_kb": rss,
+                "server_kb_per_connection": round((rss - baseline_rss) / len(test.clients), 1)
+                if rss is not None and baseline_rss is not None and test.clients else None
+            }
+            failure_rate = test.connect_failures / attempted if attempted else 0
+            drop_rate = dropped / expected if expected else 0
+            delivery_p95 = step["delivery_ms"]["p95"] if step["delivery_ms"] else None
+            step["within_budget"] = (failure_rate <= args.max_failure_rate and drop_rate <= args.max_failure_rate
+                                     and delivery_p95 is not None and delivery_p95 <= args.max_delivery_ms)
+            steps.append(step)
+            print_step(step)
+            if not step["within_budget"]:
+                break
+            ceiling = step["clients"]
+    finally:
+        await test.close()
+
+    return {
+        "meta": {
+            "at": datetime.now().isoformat(),
+            "url": args.url,
+            "rooms": args.rooms,
+            "expect": args.expect,
+            "messages_per_step": args.messages,
+            "rate": args.rate,
+            "budgets": {"max_failure_rate": args.max_failure_rate, "max_delivery_p95_ms": args.max_delivery_ms},
+            "server_baseline_rss_kb": baseline_rss
+        },
+        "steps": steps,
+        "connection_ceiling": ceiling
+    }
+
+
+def print_step(step):
+    def p95(stats):
+        return f"{stats['p95']:.0f}" if stats else '-'
+
+    memory = f"{step['server_kb_per_connection']} KiB/conn" if step['server_kb_per_connection'] is not None else ''
+    status = '✅' if step["within_budget"] else '❌'
+    print(f"{status} {step['clients']:>6} clients  failures {step['connect_failures']:<4} "
+          f"connect p95 {p95(step['connect_ms'])} ms  join p95 {p95(step['join_ms'])} ms  "
+          f"delivery p95 {p95(step['delivery_ms'])} ms  dropped {step['dropped']}/{step['expected_deliveries']}  "
+          f"unexpected {step['unexpected']}  {memory}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Socket.IO connection and notification fan-out load test')
+    parser.add_argument('--url', help='server to test (default: start basic_server on a free port)')
+    parser.add_argument('--server-pid', type=int, help='pid of the --url server, for memory per connection')
+    parser.add_argument('--db', help='EDUCATION_DB_PATH for the started server')
+    parser.add_argument('--clients', type=int, default=1000, help='connections to reach')
+    parser.add_argument('--step', type=int, default=250, help='connections added per step (0: one step)')
+    parser.add_argument('--rooms', type=int, default=20, help='rooms the clients are spread over')
+    parser.add_argument('--expect', choices=('all', 'room'), default='room',
+                        help='who should receive a notification: every client or the target room')
+    parser.add_argument('--messages', type=int, default=20, help='notifications sent per step')
+    parser.add_argument('--rate', type=float, default=20, help='notifications per second')
+    parser.add_argument('--connect-concurrency', type=int, default=200, help='connections opened at once')
+    parser.add_argument('--connect-timeout', type=float, default=LOAD_TEST_CONNECT_TIMEOUT)
+    parser.add_argument('--settle-timeout', type=float, default=LOAD_TEST_SETTLE_TIMEOUT,
+                        help='seconds to wait for outstanding deliveries')
+    parser.add_argument('--max-failure-rate', type=float, default=MAX_FAILURE_RATE,
+                        help='connect failures and drops allowed per step, as a fraction')
+    parser.add_argument('--max-delivery-ms', type=float, default=MAX_DELIVERY_P95_MS,
+                        help='delivery p95 allowed per step')
+    parser.add_argument('--output', help='write the results JSON here')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if socketio is None:
+        print('❌ The load test needs the asyncio Socket.IO client: pip install "python-socketio[asyncio_client]"')
+        sys.exit(1)
+
+    limit = raise_fd_limit()
+    if args.clients + 100 > limit:
+        print(f"⚠️  Open-file limit is {limit}; connections beyond that will fail")
+
+    server = None
+    server_pid = args.server_pid
+    if not args.url:
+        port = free_port()
+        try:
+            server = start_server(port, args.db)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        args.url = f'http://127.0.0.1:{port}'
+        server_pid = server.pid
+        print(f"🚀 Started basic_server at {args.url} (pid {server_pid})")
+
+    print(f"📡 Load testing {args.url}: up to {args.clients} clients in {args.rooms} rooms")
+    try:
+        document = asyncio.run(run(args, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"\n🏁 Connection ceiling within budget: {document['connection_ceiling']} clients")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"📄 Results written to {args.output}")
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+# The backend modules are flat scripts; make them importable from tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the servers' import-time setup away from instance/ and without background threads
+_scratch = tempfile.mkdtemp(prefix='portal-tests-')
+os.environ.setdefault('EDUCATION_DB_PATH', os.path.join(_scratch, 'education.db'))
+os.environ.setdefault('ANALYTICS_CACHE_PATH', os.path.join(_scratch, 'analytics_cache.db'))
+for _name in ('NOTIFICATION_SCHEDULER_INTERVAL', 'EVENT_BATCH_WINDOW_MS', 'DB_CHECKPOINT_INTERVAL',
+              'ANALYTICS_COMPACT_INTERVAL'):
+    os.environ.setdefault(_name, '0')
+
+# Production schema (instance/education.db); create_enhanced_tables() builds the other variant
+SCHEMA = '''
+CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(120) UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL, role VARCHAR(20) NOT NULL, created_at DATETIME);
+CREATE TABLE assignments (id INTEGER PRIMARY KEY, teacher_id INTEGER NOT NULL, module_id INTEGER,
+                          title VARCHAR(200) NOT NULL, description TEXT, deadline DATETIME NOT NULL,
+                          max_marks FLOAT, created_at DATETIME);
+CREATE TABLE submissions (id INTEGER PRIMARY KEY AUTOINCREMENT, assignment_id INT, student_id INT, content TEXT,
+                          file_path TEXT, grade FLOAT, feedback TEXT, status TEXT DEFAULT 'submitted',
+                          submitted_at DATETIME);
+CREATE TABLE quizzes (id INTEGER PRIMARY KEY AUTOINCREMENT, teacher_id INT, title TEXT NOT NULL, description TEXT,
+                      created_at DATETIME);
+CREATE TABLE quiz_attempts (id INTEGER PRIMARY KEY AUTOINCREMENT, quiz_id INT, student_id INT, score INT,
+                            attempted_at DATETIME);
+CREATE TABLE reflections (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INT, title TEXT NOT NULL, content TEXT,
+                          learning_outcomes TEXT, skills_developed TEXT, created_at DATETIME);
+CREATE TABLE notifications (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INT, title TEXT NOT NULL, message TEXT,
+                            type TEXT DEFAULT 'info', read_status BOOLEAN DEFAULT 0, created_at DATETIME);
+'''
+
+
+@pytest.fixture
+def production_db(tmp_path):
+    """Path of an empty database with the production schema"""
+    path = str(tmp_path / 'education.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def enhanced_db(tmp_path):
+    """Path of a migrated database with the create_enhanced_tables schema and sample rows"""
+    from create_enhanced_tables import create_enhanced_tables
+    path = str(tmp_path / 'enhanced.db')
+    create_enhanced_tables(path)
+    return path
+
+
+@pytest.fixture
+def pooled_db(production_db, monkeypatch):
+    """Migrated production_db behind the db_pool connection pool"""
+    import db_pool
+    from migrations import migrate
+
+    pool = db_pool.ConnectionPool(production_db)
+    monkeypatch.setattr(db_pool, '_pool', pool)
+    monkeypatch.setattr(db_pool, '_pool_pid', os.getpid())
+    conn = pool.checkout()
+    try:
+        migrate(conn, verbose=False)
+    finally:
+        conn.close()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def server(pooled_db):
+    """basic_server with its pool on a migrated production_db and an empty analytics cache"""
+    import basic_server
+
+    basic_server.analytics_cache.clear()
+    yield basic_server
+    basic_server.analytics_cache.clear()
@@ -0,0 +1,121 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from analytics_buckets import BUCKET_TABLE, COUNTERS, MEMBER_TABLE, compact_buckets, rebuild_buckets, weekly_series
+from migrations import migrate
+
+# Monday 2025-12-01 to Sunday 2025-12-07
+WEEK = '2025-12-01'
+
+
+@pytest.fixture
+def db(production_db):
+    """Teacher 1 owns assignments 1-2 and quiz 1"""
+    conn = sqlite3.connect(production_db)
+    conn.row_factory = sqlite3.Row
+    migrate(conn, verbose=False)
+    conn.executemany("INSERT INTO assignments (id, teacher_id, title, deadline) VALUES (?, 1, ?, '2026-01-01')",
+                     [(1, 'Essay'), (2, 'Lab')])
+    conn.execute("INSERT INTO quizzes (id, teacher_id, title) VALUES (1, 1, 'Quiz')")
+    yield conn
+    conn.close()
+
+
+def add_submission(conn, student_id, submitted_at, assignment_id=1, grade=None):
+    return conn.execute('INSERT INTO submissions (assignment_id, student_id, grade, submitted_at) VALUES (?, ?, ?, ?)',
+                        (assignment_id, student_id, grade, submitted_at)).lastrowid
+
+
+def add_attempt(conn, student_id, attempted_at, score=70):
+    return conn.execute('INSERT INTO quiz_attempts (quiz_id, student_id, score, attempted_at) VALUES (1, ?, ?, ?)',
+                        (student_id, score, attempted_at)).lastrowid
+
+
+def weekly_totals(conn):
+    """Every scope's counters summed per week, dropping all-zero weeks"""
+    sums = ', '.join(f'SUM({column})' for column in COUNTERS)
+    rows = conn.execute(f'''
+        SELECT scope, scope_id, week_start, {sums} FROM {BUCKET_TABLE}
+        GROUP BY scope, scope_id, week_start ORDER BY scope, scope_id, week_start
+    ''').fetchall()
+    return [tuple(row) for row in rows if any(row[3:])]
+
+
+def active(conn, scope, scope_id, week=WEEK):
+    return conn.execute(f'SELECT COALESCE(SUM(active_students), 0) FROM {BUCKET_TABLE} '
+                        'WHERE scope = ? AND scope_id = ? AND week_start = ?', (scope, scope_id, week)).fetchone()[0]
+
+
+def test_activity_is_counted_in_every_scope(db):
+    add_submission(db, 10, '2025-12-01 09:00:00', grade=80)
+    add_submission(db, 10, '2025-12-03 09:00:00', grade=60)
+    add_attempt(db, 11, '2025-12-02 09:00:00', score=55)
+
+    portal = weekly_series(db, 'portal', [0])[0]
+    assert len(portal) == 1
+    week = portal[0]
+    assert (week['week_start'], week['submissions'], week['quiz_attempts'], week['quiz_passes']) == (WEEK, 2, 1, 0)
+    assert week['average_score'] == pytest.approx((80 + 60 + 55) / 3)
+    # Student 10 submitted twice but counts once
+    assert week['active_students'] == 2
+    assert (active(db, 'class', 1), active(db, 'assignment', 1), active(db, 'student', 10)) == (2, 1, 1)
+
+
+def test_grading_updates_the_bucket_of_the_submission(db):
+    submission_id = add_submission(db, 10, '2025-12-01 09:00:00')
+    db.execute('UPDATE submissions SET grade = 90 WHERE id = ?', (submission_id,))
+    week = weekly_series(db, 'student', [10])[10][0]
+    assert (week['graded_submissions'], week['grade_sum']) == (1, 90)
+
+
+def test_deleting_a_students_last_activity_in_a_week_drops_them(db):
+    first = add_submission(db, 10, '2025-12-01 09:00:00')
+    second = add_submission(db, 10, '2025-12-04 09:00:00', assignment_id=2)
+    attempt = add_attempt(db, 10, '2025-12-05 09:00:00')
+    add_submission(db, 11, '2025-12-02 09:00:00')
+
+    db.execute('DELETE FROM submissions WHERE id = ?', (first,))
+    # Still active through assignment 2 and the quiz, but gone from assignment 1
+    assert (active(db, 'portal', 0), active(db, 'class', 1), active(db, 'student', 10)) == (2, 2, 1)
+    assert (active(db, 'assignment', 1), active(db, 'assignment', 2)) == (1, 1)
+
+    db.execute('DELETE FROM submissions WHERE id = ?', (second,))
+    assert (active(db, 'portal', 0), active(db, 'class', 1), active(db, 'assignment', 2)) == (2, 2, 0)
+
+    db.execute('DELETE FROM quiz_attempts WHERE id = ?', (attempt,))
+    assert (active(db, 'portal', 0), active(db, 'class', 1), active(db, 'student', 10)) == (1, 1, 0)
+    assert db.execute(f'SELECT COUNT(*) FROM {MEMBER_TABLE} WHERE student_id = 10').fetchone()[0] == 0
+
+    # Coming back the same week counts them again
+    add_attempt(db, 10, '2025-12-06 09:00:00')
+    assert active(db, 'portal', 0) == 2
+
+
+def test_triggers_agree_with_rebuild(db):
+    submission = add_submission(db, 10, '2025-12-01 09:00:00', grade=70)
+    add_submission(db, 10, '2025-12-09 09:00:00', grade=85)
+    add_attempt(db, 10, '2025-12-02 09:00:00', score=40)
+    add_attempt(db, 11, '2025-12-02 12:00:00', score=90)
+    db.execute("INSERT INTO reflections (student_id, title, created_at) VALUES (11, 'Week', '2025-12-03 09:00:00')")
+    db.execute('UPDATE submissions SET grade = 95 WHERE id = ?', (submission,))
+    db.execute('DELETE FROM quiz_attempts WHERE student_id = 10')
+    db.execute('DELETE FROM submissions WHERE id = ?', (submission,))
+
+    maintained = weekly_totals(db)
+    rebuild_buckets(db)
+    assert weekly_totals(db) == maintained
+
+
+def test_compaction_keeps_weekly_totals(db):
+    add_submission(db, 10, '2025-12-01 09:00:00', grade=70)
+    add_submission(db, 11, '2025-12-03 09:00:00', grade=90)
+    add_attempt(db, 10, '2025-12-10 09:00:00')
+    before = weekly_totals(db)
+
+    folded, _ = compact_buckets(db, after_days=0, today=date(2025, 12, 15))
+    # Portal, student, class and assignment buckets per submission day; quizzes have no assignment scope
+    assert folded == 4 + 4 + 3
+    assert db.execute(f"SELECT COUNT(*) FROM {BUCKET_TABLE} WHERE granularity = 'day'").fetchone()[0] == 0
+    assert weekly_totals(db) == before
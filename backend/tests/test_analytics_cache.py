@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+
+from analytics_cache import AnalyticsCache, MemoryBackend, SQLiteBackend, student_key
+
+
+class ManualClockBackend(MemoryBackend):
+    """In-process backend whose clock only moves when a test advances it"""
+
+    def __init__(self, max_size):
+        super().__init__(max_size)
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two caches over one SQLite file, as two gunicorn workers would have"""
+    path = str(tmp_path / 'cache.db')
+    return AnalyticsCache(backend=SQLiteBackend(path)), AnalyticsCache(backend=SQLiteBackend(path))
+
+
+def test_invalidation_in_another_worker_drops_in_flight_result(workers):
+    worker_a, worker_b = workers
+    key = student_key(7)
+
+    def compute():
+        # Worker A invalidates after worker B has read the old data
+        worker_a.invalidate(key)
+        return {"average": 50}
+
+    assert worker_b.get_or_compute(key, compute) == {"average": 50}
+    assert worker_b.get(key) is None
+    assert worker_a.get(key) is None
+
+
+def test_result_is_shared_without_invalidation(workers):
+    worker_a, worker_b = workers
+    key = student_key(7)
+
+    assert worker_b.get_or_compute(key, lambda: {"average": 80}) == {"average": 80}
+    assert worker_a.get(key) == {"average": 80}
+
+
+def test_invalidation_after_store_removes_entry(workers):
+    worker_a, worker_b = workers
+    key = student_key(7)
+    worker_b.get_or_compute(key, lambda: {"average": 80})
+
+    worker_a.invalidate(key)
+    assert worker_b.get(key) is None
+    assert worker_b.get_or_compute(key, lambda: {"average": 90}) == {"average": 90}
+    assert worker_a.get(key) == {"average": 90}
+
+
+def test_get_or_compute_many_computes_misses_in_one_call(workers):
+    worker_a, worker_b = workers
+    worker_a.set(student_key(1), {"average": 70})
+    calls = []
+
+    def compute_missing(keys):
+        calls.append(list(keys))
+        return {key: {"average": 60} for key in keys if key != student_key(3)}
+
+    found = worker_b.get_or_compute_many([student_key(1), student_key(2), student_key(3)], compute_missing)
+    assert calls == [[student_key(2), student_key(3)]]
+    assert found == {student_key(1): {"average": 70}, student_key(2): {"average": 60}}
+    assert worker_a.get(student_key(2)) == {"average": 60}
+
+
+def test_get_or_compute_many_drops_results_invalidated_in_flight(workers):
+    worker_a, worker_b = workers
+
+    def compute_missing(keys):
+        worker_a.invalidate_prefix('student:')
+        return {key: {"average": 50} for key in keys}
+
+    found = worker_b.get_or_compute_many([student_key(1), student_key(2)], compute_missing)
+    assert found == {student_key(1): {"average": 50}, student_key(2): {"average": 50}}
+    assert worker_b.get(student_key(1)) is None
+    assert worker_b.get(student_key(2)) is None
+
+
+def test_invalidating_one_student_keeps_other_results(workers):
+    worker_a, worker_b = workers
+
+    def compute_missing(keys):
+        # A write burst for student 1 while the roster is being computed
+        worker_a.invalidate(student_key(1))
+        worker_a.invalidate_prefix('class:')
+        return {key: {"average": 50} for key in keys}
+
+    worker_b.get_or_compute_many([student_key(1), student_key(2)], compute_missing)
+    assert worker_b.get(student_key(1)) is None
+    assert worker_a.get(student_key(2)) == {"average": 50}
+
+    def compute():
+        worker_a.invalidate(student_key(1))
+        return {"average": 60}
+
+    assert worker_b.get_or_compute(student_key(3), compute) == {"average": 60}
+    assert worker_a.get(student_key(3)) == {"average": 60}
+
+
+def test_clear_drops_every_in_flight_result():
+    cache = AnalyticsCache()
+
+    def compute():
+        cache.clear()
+        return {"average": 70}
+
+    assert cache.get_or_compute(student_key(1), compute) == {"average": 70}
+    assert cache.get(student_key(1)) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnalyticsCache(max_size=2)
+    cache.set(student_key(1), {"average": 10})
+    cache.set(student_key(2), {"average": 20})
+    assert cache.get(student_key(1)) == {"average": 10}
+
+    cache.set(student_key(3), {"average": 30})
+    assert cache.get(student_key(2)) is None
+    assert cache.get(student_key(1)) == {"average": 10}
+    assert cache.get(student_key(3)) == {"average": 30}
+    assert (len(cache), cache.stats()["evictions"]) == (2, 1)
+
+
+def test_entries_expire_after_their_ttl():
+    backend = ManualClockBackend(max_size=10)
+    cache = AnalyticsCache(ttl=60, backend=backend)
+    cache.set(student_key(1), {"average": 10})
+    cache.set(student_key(2), {"average": 20}, ttl=120)
+
+    backend.now = 60
+    assert cache.get(student_key(1)) is None
+    assert cache.get(student_key(2)) == {"average": 20}
+    assert cache.get_or_compute(student_key(1), lambda: {"average": 15}) == {"average": 15}
+    assert cache.stats()["expirations"] == 1
+
+
+def test_expired_entry_is_served_stale_while_one_refresh_runs():
+    backend = ManualClockBackend(max_size=10)
+    cache = AnalyticsCache(ttl=60, stale_ttl=30, backend=backend)
+    cache.set(student_key(1), {"average": 10})
+    backend.now = 70
+    refreshed = threading.Event()
+
+    def compute():
+        refreshed.set()
+        return {"average": 11}
+
+    assert cache.get_or_compute(student_key(1), compute) == {"average": 10}
+    assert refreshed.wait(5)
+    for _ in range(100):
+        if cache.get(student_key(1)) is not None:
+            break
+        time.sleep(0.01)
+    assert cache.get(student_key(1)) == {"average": 11}
+    assert cache.stats()["refreshes"] == 1
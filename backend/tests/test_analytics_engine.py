@@ -0,0 +1,83 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from analytics_engine import class_analytics, normalize_timeframe
+from migrations import migrate
+
+
+def ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.fixture
+def db(production_db):
+    """Teacher 1 owns assignment 1 and quiz 1, teacher 2 owns assignment 2; students 10-12"""
+    conn = sqlite3.connect(production_db)
+    conn.row_factory = sqlite3.Row
+    migrate(conn, verbose=False)
+    conn.executemany("INSERT INTO users (id, name, email, password_hash, role) VALUES (?, ?, ?, 'x', ?)",
+                     [(user_id, f'User {user_id}', f'user{user_id}@school.test', role)
+                      for user_id, role in ((1, 'teacher'), (2, 'teacher'), (10, 'student'), (11, 'student'),
+                                            (12, 'student'))])
+    conn.executemany('INSERT INTO assignments (id, teacher_id, title, deadline) VALUES (?, ?, ?, ?)',
+                     [(1, 1, 'Essay', ago(2)), (2, 2, 'Lab', ago(1))])
+    conn.execute("INSERT INTO quizzes (id, teacher_id, title) VALUES (1, 1, 'Quiz')")
+    conn.executemany('INSERT INTO submissions (assignment_id, student_id, grade, submitted_at) VALUES (?, ?, ?, ?)',
+                     [(1, 10, 95, ago(3)), (1, 11, 65, ago(1)), (1, 12, 40, ago(60)), (2, 10, 85, ago(2))])
+    conn.executemany('INSERT INTO quiz_attempts (quiz_id, student_id, score, attempted_at) VALUES (1, ?, ?, ?)',
+                     [(10, 90, ago(1)), (11, 50, ago(1))])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_teacher_scope_only_counts_their_items(db):
+    overview = class_analytics(db, teacher_id=1, timeframe='all')['overview']
+    assert (overview['total_assignments'], overview['total_quizzes'], overview['total_students']) == (1, 1, 3)
+    assert (overview['submissions'], overview['graded_submissions'], overview['quiz_attempts']) == (3, 3, 2)
+    assert overview['average_grade'] == pytest.approx(200 / 3)
+    assert overview['average_quiz_score'] == 70
+    assert overview['quiz_passes'] == 1
+    assert overview['grade_distribution'] == [1, 0, 0, 1, 1]
+    assert (overview['on_time_submissions'], overview['late_submissions']) == (2, 1)
+    assert overview['active_students'] == 3
+
+
+def test_portal_scope_counts_every_teacher(db):
+    overview = class_analytics(db, timeframe='all')['overview']
+    assert (overview['total_assignments'], overview['submissions']) == (2, 4)
+    assert overview['grade_distribution'] == [1, 1, 0, 1, 1]
+
+
+def test_timeframe_drops_older_activity(db):
+    analytics = class_analytics(db, teacher_id=1, timeframe='week')
+    assert analytics['timeframe'] == '7d'
+    assert analytics['overview']['submissions'] == 2
+    assert analytics['overview']['active_students'] == 2
+    assert [item['students'] for item in analytics['assignments']] == [2]
+
+
+def test_students_are_ranked_and_categorised(db):
+    students = class_analytics(db, teacher_id=1, timeframe='all')['students']
+    assert [row['student_id'] for row in students['top']] == [10, 11, 12]
+    assert [row['student_id'] for row in students['bottom']] == [12, 11]
+    assert students['counts'] == {
+        "active_students": 3, "exceeding": 1, "on_track": 0, "at_risk": 0, "needs_attention": 2,
+        "highly_engaged": 0, "moderately_engaged": 2, "low_engagement": 1
+    }
+
+
+def test_enhanced_schema_is_supported(enhanced_db):
+    conn = sqlite3.connect(enhanced_db)
+    conn.row_factory = sqlite3.Row
+    analytics = class_analytics(conn, timeframe='all')
+    assert analytics['overview']['total_students'] > 0
+    conn.close()
+
+
+def test_unknown_timeframe_is_rejected():
+    assert normalize_timeframe(None) == '30d'
+    with pytest.raises(ValueError):
+        normalize_timeframe('decade')
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from analytics_rollup import ROLLUP_TABLE, get_rollup, grade_distribution, rebuild_rollup
+from migrations import migrate
+
+
+@pytest.fixture
+def db(production_db):
+    conn = sqlite3.connect(production_db)
+    conn.row_factory = sqlite3.Row
+    migrate(conn, verbose=False)
+    yield conn
+    conn.close()
+
+
+def add_submission(conn, student_id, grade, submitted_at):
+    return conn.execute('INSERT INTO submissions (assignment_id, student_id, grade, submitted_at) VALUES (1, ?, ?, ?)',
+                        (student_id, grade, submitted_at)).lastrowid
+
+
+def add_attempt(conn, student_id, score, attempted_at):
+    return conn.execute('INSERT INTO quiz_attempts (quiz_id, student_id, score, attempted_at) VALUES (1, ?, ?, ?)',
+                        (student_id, score, attempted_at)).lastrowid
+
+
+def add_reflection(conn, student_id, created_at):
+    return conn.execute("INSERT INTO reflections (student_id, title, created_at) VALUES (?, 'Week', ?)",
+                        (student_id, created_at)).lastrowid
+
+
+def rollup_rows(conn):
+    return [dict(row, updated_at=None) for row in conn.execute(f'SELECT * FROM {ROLLUP_TABLE} ORDER BY student_id')]
+
+
+def test_inserts_update_counts_sums_and_buckets(db):
+    add_submission(db, 1, 95, '2025-11-01 09:00:00')
+    add_submission(db, 1, 72, '2025-11-03 09:00:00')
+    add_submission(db, 1, None, '2025-11-02 09:00:00')
+    add_attempt(db, 1, 80, '2025-11-04 09:00:00')
+    add_attempt(db, 1, None, '2025-11-05 09:00:00')
+    add_reflection(db, 1, '2025-11-06 09:00:00')
+
+    rollup = get_rollup(db, 1)
+    assert (rollup['submissions'], rollup['graded_submissions'], rollup['grade_sum']) == (3, 2, 167)
+    assert grade_distribution(rollup) == [1, 0, 1, 0, 0]
+    assert (rollup['quiz_attempts'], rollup['quiz_scored'], rollup['quiz_score_sum']) == (2, 1, 80)
+    assert rollup['reflections'] == 1
+    assert rollup['last_submission_at'] == '2025-11-03 09:00:00'
+    assert rollup['last_quiz_at'] == '2025-11-05 09:00:00'
+    assert rollup['last_reflection_at'] == '2025-11-06 09:00:00'
+
+
+def test_grading_moves_submission_between_buckets(db):
+    submission_id = add_submission(db, 1, None, '2025-11-01 09:00:00')
+    db.execute('UPDATE submissions SET grade = 55 WHERE id = ?', (submission_id,))
+    assert grade_distribution(get_rollup(db, 1)) == [0, 0, 0, 0, 1]
+
+    db.execute('UPDATE submissions SET grade = 85 WHERE id = ?', (submission_id,))
+    rollup = get_rollup(db, 1)
+    assert grade_distribution(rollup) == [0, 1, 0, 0, 0]
+    assert (rollup['graded_submissions'], rollup['grade_sum']) == (1, 85)
+
+
+def test_deletes_move_last_activity_back(db):
+    add_submission(db, 1, 90, '2025-11-01 09:00:00')
+    latest_submission = add_submission(db, 1, 60, '2025-11-08 09:00:00')
+    add_attempt(db, 1, 70, '2025-11-02 09:00:00')
+    latest_attempt = add_attempt(db, 1, 50, '2025-11-09 09:00:00')
+    only_reflection = add_reflection(db, 1, '2025-11-03 09:00:00')
+
+    db.execute('DELETE FROM submissions WHERE id = ?', (latest_submission,))
+    db.execute('DELETE FROM quiz_attempts WHERE id = ?', (latest_attempt,))
+    db.execute('DELETE FROM reflections WHERE id = ?', (only_reflection,))
+
+    rollup = get_rollup(db, 1)
+    assert (rollup['submissions'], rollup['graded_submissions'], rollup['grade_sum']) == (1, 1, 90)
+    assert grade_distribution(rollup) == [1, 0, 0, 0, 0]
+    assert (rollup['quiz_attempts'], rollup['quiz_scored'], rollup['quiz_score_sum']) == (1, 1, 70)
+    assert rollup['reflections'] == 0
+    assert rollup['last_submission_at'] == '2025-11-01 09:00:00'
+    assert rollup['last_quiz_at'] == '2025-11-02 09:00:00'
+    assert rollup['last_reflection_at'] is None
+
+
+def test_triggers_agree_with_rebuild(db):
+    for student_id in (1, 2):
+        add_submission(db, student_id, 88, '2025-11-01 09:00:00')
+        add_attempt(db, student_id, 64, '2025-11-02 09:00:00')
+        add_reflection(db, student_id, '2025-11-03 09:00:00')
+    db.execute('UPDATE submissions SET grade = 40 WHERE student_id = 2')
+    db.execute('DELETE FROM quiz_attempts WHERE student_id = 1')
+
+    maintained = rollup_rows(db)
+    rebuild_rollup(db)
+    assert rollup_rows(db) == maintained
@@ -0,0 +1,136 @@
+import pytest
+
+
+@pytest.fixture
+def roster(server):
+    """Teacher 1 teaches students 10-13 (by submission or quiz attempt); student 14 is in teacher 2's class"""
+    conn = server.get_db_connection()
+    try:
+        conn.executemany("INSERT INTO users (id, name, email, password_hash, role) VALUES (?, ?, ?, 'x', ?)",
+                         [(user_id, f'User {user_id}', f'user{user_id}@school.test', role)
+                          for user_id, role in ((1, 'teacher'), (2, 'teacher'), (10, 'student'), (11, 'student'),
+                                                (12, 'student'), (13, 'student'), (14, 'student'))])
+        conn.executemany("INSERT INTO assignments (id, teacher_id, title, deadline) VALUES (?, ?, ?, '2026-01-01')",
+                         [(1, 1, 'Essay'), (2, 2, 'Lab')])
+        conn.execute("INSERT INTO quizzes (id, teacher_id, title) VALUES (1, 1, 'Quiz')")
+        conn.executemany('''
+            INSERT INTO submissions (assignment_id, student_id, grade, submitted_at) VALUES (?, ?, ?, ?)
+        ''', [(1, 10, 80, '2025-12-01 10:00:00'), (1, 11, 70, '2025-12-01 11:00:00'),
+              (1, 12, None, '2025-12-02 09:00:00'), (2, 14, 90, '2025-12-03 09:00:00')])
+        conn.execute("INSERT INTO quiz_attempts (quiz_id, student_id, score, attempted_at) "
+                     "VALUES (1, 13, 65, '2025-12-04 09:00:00')")
+        conn.commit()
+    finally:
+        conn.close()
+    return server.app.test_client()
+
+
+def test_roster_pages_through_the_teachers_students(roster):
+    first = roster.get('/api/teacher/1/students/analytics?limit=2').json
+    assert list(first['students']) == ['10', '11']
+    assert first['pagination'] == {"limit": 2, "has_next": True, "next_cursor": '11'}
+
+    second = roster.get(f"/api/teacher/1/students/analytics?limit=2&cursor={first['pagination']['next_cursor']}").json
+    assert list(second['students']) == ['12', '13']
+    assert second['pagination']['has_next'] is False
+    assert second['pagination']['next_cursor'] is None
+
+
+def test_roster_entries_are_summaries(roster):
+    student = roster.get('/api/teacher/1/students/analytics').json['students']['10']
+    assert set(student) == {'kpis', 'score_statistics', 'metadata'}
+    assert student['kpis']['assignments_submitted'] == 1
+
+
+def test_ids_off_the_roster_are_not_returned(roster):
+    response = roster.get('/api/teacher/1/students/analytics?ids=10,14,99').json
+    assert list(response['students']) == ['10']
+    assert response['not_on_roster'] == [14, 99]
+
+
+def test_invalid_roster_cursor_is_rejected(roster):
+    assert roster.get('/api/teacher/1/students/analytics?cursor=abc').status_code == 400
+
+
+def test_student_analytics_reports_truncated_history(roster, server, monkeypatch):
+    monkeypatch.setattr(server, 'RECENT_ITEMS_LIMIT', 2)
+    conn = server.get_db_connection()
+    try:
+        conn.executemany('INSERT INTO submissions (assignment_id, student_id, grade, submitted_at) VALUES (1, 10, ?, ?)',
+                         [(60, '2025-11-01 10:00:00'), (75, '2025-11-02 10:00:00')])
+        conn.commit()
+    finally:
+        conn.close()
+
+    analytics = roster.get('/api/student/10/analytics').json
+    assert len(analytics['submissions']) == 2
+    assert analytics['history'] == {
+        "limit": 2,
+        "quiz_attempts": {"returned": 0, "total": 0},
+        "submissions": {"returned": 2, "total": 3},
+        "truncated": True
+    }
+    assert roster.get('/api/student/11/analytics').json['history']['truncated'] is False
+
+
+def test_new_reflection_invalidates_cached_analytics(roster):
+    assert roster.get('/api/student/10/analytics').json['kpis']['total_reflections'] == 0
+    roster.post('/api/reflections', json={"student_id": 10, "title": "Week 1"})
+    assert roster.get('/api/student/10/analytics').json['kpis']['total_reflections'] == 1
+
+
+def add_activity(server, student_id, submissions=(), attempts=()):
+    conn = server.get_db_connection()
+    try:
+        conn.executemany('INSERT INTO submissions (assignment_id, student_id, submitted_at) VALUES (1, ?, ?)',
+                         [(student_id, at) for at in submissions])
+        conn.executemany('INSERT INTO quiz_attempts (quiz_id, student_id, score, attempted_at) VALUES (1, ?, 70, ?)',
+                         [(student_id, at) for at in attempts])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def activity_pages(client, student_id, limit):
+    pages, cursor = [], None
+    while True:
+        url = f'/api/student/{student_id}/recent-activity?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url).json
+        pages.append([(item['timestamp'], item['type']) for item in response['activity']])
+        cursor = response['pagination']['next_cursor']
+        if not response['pagination']['has_next']:
+            assert cursor is None
+            return pages, response['pagination']
+
+
+def test_recent_activity_pages_through_one_merged_timeline(roster, server):
+    # Same-second rows across and within sources, on top of the roster's 2025-12-01 10:00 submission
+    add_activity(server, 10,
+                 submissions=['2025-12-03 09:00:00', '2025-12-03 09:00:00', '2025-12-05 09:00:00'],
+                 attempts=['2025-12-03 09:00:00', '2025-12-04 09:00:00', '2025-12-02 09:00:00'])
+
+    pages, pagination = activity_pages(roster, 10, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [item for page in pages for item in page] == [
+        ('2025-12-05 09:00:00', 'submission'),
+        ('2025-12-04 09:00:00', 'quiz'),
+        ('2025-12-03 09:00:00', 'submission'),
+        ('2025-12-03 09:00:00', 'submission'),
+        ('2025-12-03 09:00:00', 'quiz'),
+        ('2025-12-02 09:00:00', 'quiz'),
+        ('2025-12-01 10:00:00', 'submission')
+    ]
+    assert pagination['total_activities'] == 7
+
+
+def test_recent_activity_cursor_is_stable_across_new_writes(roster, server):
+    add_activity(server, 10, submissions=['2025-12-02 09:00:00'], attempts=['2025-12-03 09:00:00'])
+    first = roster.get('/api/student/10/recent-activity?limit=1').json
+    add_activity(server, 10, submissions=['2025-12-09 09:00:00'])
+
+    second = roster.get(f"/api/student/10/recent-activity?limit=1&cursor={first['pagination']['next_cursor']}").json
+    assert [item['timestamp'] for item in second['activity']] == ['2025-12-02 09:00:00']
+
+
+def test_invalid_activity_cursor_is_rejected(roster):
+    assert roster.get('/api/student/10/recent-activity?cursor=not-a-cursor').status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmark import build_request, compare, parse_args, run_endpoint, summarize
+
+
+def document(**p95s):
+    return {"results": {endpoint: {"p95_ms": p95, "errors": 0, "statuses": {"200": 10}}
+                        for endpoint, p95 in p95s.items()}}
+
+
+def test_p95_growth_past_the_budget_is_a_regression():
+    regressions = compare(document(grades=15.0, login=12.0), document(grades=10.0, login=10.0), threshold=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('grades: p95_ms 15.0 ms vs baseline 10.0 ms (+50%')
+
+
+def test_growth_below_the_noise_floor_is_ignored():
+    assert compare(document(grades=1.5), document(grades=1.0), threshold=0.25, min_delta_ms=2.0) == []
+
+
+def test_error_responses_fail_even_without_a_baseline_entry():
+    current = document(grades=1.0)
+    current["results"]["grades"].update(errors=2, statuses={"200": 8, "500": 2})
+    assert compare(current, document()) == ["grades: 2 error responses {'200': 8, '500': 2}"]
+
+
+def test_summarize_reports_percentiles_and_sql_time():
+    result = summarize([index / 1000 for index in range(1, 101)], 2.0, {"200": 99, "404": 1}, [3, 5], [1.0, 2.0])
+    assert (result["requests"], result["errors"], result["throughput_rps"]) == (100, 1, 50.0)
+    assert result["p50_ms"] == pytest.approx(50.5)
+    assert result["p99_ms"] == pytest.approx(99.01)
+    assert (result["queries_per_request"], result["sql_ms_mean"]) == (4, 1.5)
+
+
+def test_requests_are_built_from_the_target():
+    target = {"student_id": 7, "teacher_id": 2, "email": 'student7@school.test'}
+    assert build_request('grades', target) == ('GET', '/api/student/7/grades', None)
+    assert build_request('login', target) == (
+        'POST', '/api/auth/login', {"email": 'student7@school.test', "password": 'benchmark'}
+    )
+
+
+def test_unknown_endpoints_are_rejected():
+    with pytest.raises(SystemExit):
+        parse_args(['--only', 'grades,nope'])
+
+
+def test_run_endpoint_times_every_request(server):
+    targets = [{"student_id": 1, "teacher_id": 2, "email": 'student1@school.test'}]
+    result = run_endpoint(server.app, server.analytics_cache, 'recent_activity', targets,
+                          iterations=5, warmup=1, concurrency=2, cold=True)
+    assert (result["requests"], result["statuses"], result["errors"]) == (5, {"200": 5}, 0)
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+from db_pool import ConnectionPool, get_db_connection, install_pool_teardown
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2, timeout=0.5)
+    monkeypatch.setattr(db_pool, '_pool', pool)
+    monkeypatch.setattr(db_pool, '_pool_pid', os.getpid())
+    monkeypatch.setattr(db_pool, '_track_app_context', False)
+    yield pool
+    pool.close_all()
+
+
+def make_app():
+    app = Flask(__name__)
+    install_pool_teardown(app)
+
+    @app.route('/fails')
+    def fails():
+        conn = get_db_connection()
+        conn.execute('SELECT 1').fetchone()
+        raise KeyError('title')
+
+    @app.route('/ok')
+    def ok():
+        conn = get_db_connection()
+        value = conn.execute('SELECT 1').fetchone()[0]
+        conn.close()
+        return jsonify({"value": value})
+
+    return app
+
+
+def test_failing_route_releases_its_connection(pool):
+    client = make_app().test_client()
+    for _ in range(pool.max_size * 3):
+        assert client.get('/fails').status_code == 500
+
+    stats = pool.stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] >= 1
+    assert client.get('/ok').json == {"value": 1}
+
+
+def test_closed_connection_is_not_released_twice(pool):
+    client = make_app().test_client()
+    for _ in range(pool.max_size * 3):
+        assert client.get('/ok').status_code == 200
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["size"] <= pool.max_size
+
+
+def test_cursor_statements_reach_query_listeners(pool, monkeypatch):
+    queries = []
+    monkeypatch.setattr(db_pool, 'QUERY_LISTENERS', [lambda sql, params, seconds, rows: queries.append((sql, rows))])
+    conn = pool.checkout()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE reflections (id INTEGER PRIMARY KEY, title TEXT)')
+        cursor.execute('INSERT INTO reflections (title) VALUES (?)', ('Week 1',))
+        assert cursor.lastrowid == 1
+        cursor.executemany('INSERT INTO reflections (title) VALUES (?)', [('Week 2',), ('Week 3',)])
+        assert [row['title'] for row in cursor.execute('SELECT title FROM reflections ORDER BY id')] == \
+            ['Week 1', 'Week 2', 'Week 3']
+    finally:
+        conn.close()
+
+    assert [sql.split()[0] for sql, _ in queries] == ['CREATE', 'INSERT', 'INSERT', 'SELECT']
+    assert [rows for _, rows in queries[1:]] == [1, 2, 3]
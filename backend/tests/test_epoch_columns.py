@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from epoch_columns import backfill_epochs, create_epoch_schema, epoch_days_ago, to_epoch
+from migrations import migrate
+
+# 2024-01-20 10:30:00 UTC
+EPOCH = 1705746600
+
+
+@pytest.fixture
+def db(production_db):
+    conn = sqlite3.connect(production_db)
+    migrate(conn, verbose=False)
+    yield conn
+    conn.close()
+
+
+def submitted_epoch(conn, submission_id):
+    return conn.execute('SELECT submitted_epoch FROM submissions WHERE id = ?', (submission_id,)).fetchone()[0]
+
+
+@pytest.mark.parametrize('timestamp', ['2024-01-20 10:30:00', '2024-01-20T10:30:00Z', '2024-01-20T12:30:00+02:00'])
+def test_insert_fills_the_epoch_column(db, timestamp):
+    submission_id = db.execute('INSERT INTO submissions (student_id, submitted_at) VALUES (1, ?)',
+                               (timestamp,)).lastrowid
+    assert submitted_epoch(db, submission_id) == EPOCH == to_epoch(timestamp)
+
+
+def test_every_activity_table_is_mirrored(db):
+    db.execute("INSERT INTO quiz_attempts (student_id, attempted_at) VALUES (1, '2024-01-20 10:30:00')")
+    db.execute("INSERT INTO reflections (student_id, title, created_at) VALUES (1, 'Week', '2024-01-20 10:30:00')")
+    assert db.execute('SELECT attempted_epoch FROM quiz_attempts').fetchone()[0] == EPOCH
+    assert db.execute('SELECT created_epoch FROM reflections').fetchone()[0] == EPOCH
+
+
+def test_changing_the_timestamp_updates_the_epoch(db):
+    submission_id = db.execute("INSERT INTO submissions (student_id, grade, submitted_at) "
+                               "VALUES (1, 80, '2024-01-20 10:30:00')").lastrowid
+    db.execute("UPDATE submissions SET submitted_at = '2024-01-21 10:30:00' WHERE id = ?", (submission_id,))
+    assert submitted_epoch(db, submission_id) == EPOCH + 86400
+    db.execute('UPDATE submissions SET submitted_at = NULL WHERE id = ?', (submission_id,))
+    assert submitted_epoch(db, submission_id) is None
+    # The epoch write does not count as a new grade in the rollup
+    assert db.execute('SELECT graded_submissions, grade_sum FROM student_analytics_rollup').fetchone() == (1, 80)
+
+
+def test_backfill_fills_rows_written_before_the_triggers(production_db):
+    conn = sqlite3.connect(production_db)
+    conn.execute("INSERT INTO submissions (student_id, submitted_at) VALUES (1, '2024-01-20 10:30:00')")
+    create_epoch_schema(conn)
+    assert submitted_epoch(conn, 1) is None
+    backfill_epochs(conn)
+    assert submitted_epoch(conn, 1) == EPOCH
+    conn.close()
+
+
+def test_to_epoch_handles_datetimes_and_bad_input():
+    assert to_epoch(datetime(2024, 1, 20, 10, 30)) == EPOCH
+    assert to_epoch(datetime(2024, 1, 20, 10, 30, tzinfo=timezone.utc)) == EPOCH
+    assert to_epoch(None) is None
+    assert to_epoch('not a date') is None
+    assert epoch_days_ago(1, now=EPOCH) == EPOCH - 86400
@@ -0,0 +1,79 @@
+from event_batcher import BATCH_EVENT, EventBatcher, create_event_batcher
+
+
+class RecordingSocketIO:
+    """Records emits; flush timers are kept for the test to run"""
+
+    def __init__(self):
+        self.emitted = []
+        self.timers = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+    def start_background_task(self, target, *args):
+        self.timers.append((target, args))
+
+    def sleep(self, seconds):
+        pass
+
+    def fire_timers(self):
+        timers, self.timers = self.timers, []
+        for target, args in timers:
+            target(*args)
+
+
+def test_status_updates_for_one_entity_are_coalesced():
+    socketio = RecordingSocketIO()
+    batcher = EventBatcher(socketio, window_ms=50)
+    batcher.add('assignment_status_update', {"assignment_id": 1, "student_id": 10, "status": 'submitted'}, ['class:1'])
+    batcher.add('new_notification', {"title": 'Hi'}, ['class:1'])
+    batcher.add('assignment_status_update', {"assignment_id": 1, "student_id": 10, "status": 'graded'}, ['class:1'])
+    batcher.add('assignment_status_update', {"assignment_id": 2, "student_id": 10, "status": 'graded'}, ['class:1'])
+    assert socketio.emitted == []
+    assert len(socketio.timers) == 1
+
+    socketio.fire_timers()
+    assert socketio.emitted == [(BATCH_EVENT, {"events": [
+        {"event": 'new_notification', "data": {"title": 'Hi'}},
+        {"event": 'assignment_status_update', "data": {"assignment_id": 1, "student_id": 10, "status": 'graded'}},
+        {"event": 'assignment_status_update', "data": {"assignment_id": 2, "student_id": 10, "status": 'graded'}}
+    ]}, ['class:1'])]
+    assert batcher.stats() == {"events": 4, "coalesced": 1, "frames": 1, "batches": 1, "pending": 0}
+
+
+def test_lone_event_is_sent_as_itself():
+    socketio = RecordingSocketIO()
+    batcher = EventBatcher(socketio, window_ms=50)
+    batcher.add('new_notification', {"title": 'Hi'}, ['user:1'])
+    batcher.add('dashboard_refresh', {"type": 'grades'})
+    socketio.fire_timers()
+    assert socketio.emitted == [('new_notification', {"title": 'Hi'}, ['user:1']),
+                                ('dashboard_refresh', {"type": 'grades'}, None)]
+
+
+def test_targets_are_buffered_separately():
+    socketio = RecordingSocketIO()
+    batcher = EventBatcher(socketio, window_ms=50)
+    batcher.add('notification_count_update', {"user_id": 1, "unread": 1}, ['user:1'])
+    batcher.add('notification_count_update', {"user_id": 1, "unread": 2}, ['user:1'])
+    batcher.add('notification_count_update', {"user_id": 1, "unread": 2}, ['user:1', 'role:admin'])
+    socketio.fire_timers()
+    assert socketio.emitted == [('notification_count_update', {"user_id": 1, "unread": 2}, ['user:1']),
+                                ('notification_count_update', {"user_id": 1, "unread": 2}, ['user:1', 'role:admin'])]
+
+
+def test_full_buffer_is_flushed_before_the_window_closes():
+    socketio = RecordingSocketIO()
+    batcher = EventBatcher(socketio, window_ms=50, max_events=2)
+    batcher.add('new_notification', {"title": 'One'}, ['user:1'])
+    batcher.add('new_notification', {"title": 'Two'}, ['user:1'])
+    assert [event for event, _, _ in socketio.emitted] == [BATCH_EVENT]
+
+    # The pending timer finds nothing left to send
+    socketio.fire_timers()
+    assert len(socketio.emitted) == 1
+
+
+def test_batching_can_be_disabled():
+    assert create_event_batcher(RecordingSocketIO(), window_ms=0) is None
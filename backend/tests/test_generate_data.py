@@ -0,0 +1,50 @@
+import os
+import sqlite3
+
+from db_pool import DB_PATH
+from generate_data import generate
+from notification_counters import COUNTER_TABLE
+
+VOLUMES = {
+    "students": 40, "teachers": 3, "assignments": 6, "quizzes": 4,
+    "submissions": 300, "quiz_attempts": 300, "reflections": 30, "notifications": 500
+}
+
+
+def test_unread_counters_match_notifications_after_generate(production_db):
+    generate(VOLUMES, seed=3, db_path=production_db)
+
+    conn = sqlite3.connect(production_db)
+    try:
+        expected = dict(conn.execute('''
+            SELECT user_id, COUNT(*) FROM notifications
+            WHERE user_id IS NOT NULL AND COALESCE(read_status, 0) = 0
+            GROUP BY user_id
+        ''').fetchall())
+        counters = dict(conn.execute(f'SELECT user_id, unread FROM {COUNTER_TABLE} WHERE unread > 0').fetchall())
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+
+    assert expected
+    assert counters == expected
+    assert 'trg_notifications_unread_insert' in triggers
+
+
+def test_new_database_gets_its_schema_at_db_path(tmp_path):
+    path = str(tmp_path / 'fresh.db')
+    default_before = os.stat(DB_PATH).st_mtime_ns if os.path.exists(DB_PATH) else None
+
+    counts = generate(VOLUMES, seed=3, db_path=path)
+
+    conn = sqlite3.connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        students = conn.execute("SELECT COUNT(*) FROM users WHERE role = 'student'").fetchone()[0]
+    finally:
+        conn.close()
+
+    assert {'users', 'assignments', 'portfolio_evidence', 'schema_migrations'} <= tables
+    assert counts['users'] > 0 and students >= VOLUMES['students']
+    default_after = os.stat(DB_PATH).st_mtime_ns if os.path.exists(DB_PATH) else None
+    assert default_after == default_before
@@ -0,0 +1,59 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from migrations import HOT_QUERIES, MIGRATIONS, check_query_plans, current_version, migrate
+
+
+@pytest.fixture(params=['production_db', 'enhanced_db'])
+def migrated(request):
+    conn = sqlite3.connect(request.getfixturevalue(request.param))
+    migrate(conn, verbose=False)
+    yield conn
+    conn.close()
+
+
+def test_every_migration_applies(migrated):
+    assert current_version(migrated) == MIGRATIONS[-1][0]
+    assert migrate(migrated, verbose=False) == []
+
+
+def test_hot_queries_use_an_index(migrated):
+    results = check_query_plans(migrated)
+    assert [name for name, _, _ in results] == [query[0] for query in HOT_QUERIES]
+    assert [(name, plan) for name, plan, ok in results if not ok] == []
+
+
+def test_unpreparable_hot_query_is_reported(migrated, monkeypatch):
+    monkeypatch.setattr('migrations.HOT_QUERIES', HOT_QUERIES + [
+        ('missing column', 'quizzes', 'SELECT * FROM quizzes WHERE no_such_column = ?', (1,))
+    ])
+    name, plan, ok = check_query_plans(migrated)[-1]
+    assert (name, ok) == ('missing column', False)
+    assert 'no_such_column' in plan[0]
+
+
+def notification_indexes(conn):
+    return dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'notifications' AND sql IS NOT NULL"
+    ).fetchall())
+
+
+def test_upgraded_database_matches_fresh_one(production_db, tmp_path, monkeypatch):
+    # A database migrated before the id tiebreak indexes existed
+    old_path = str(tmp_path / 'old.db')
+    shutil.copy(production_db, old_path)
+    upgraded = sqlite3.connect(old_path)
+    monkeypatch.setattr('migrations.MIGRATIONS', [m for m in MIGRATIONS if m[0] < 9])
+    migrate(upgraded, verbose=False)
+    assert 'id DESC' not in notification_indexes(upgraded)['idx_notifications_user_created']
+    monkeypatch.setattr('migrations.MIGRATIONS', MIGRATIONS)
+    assert migrate(upgraded, verbose=False) == [m[0] for m in MIGRATIONS if m[0] >= 9]
+
+    fresh = sqlite3.connect(production_db)
+    migrate(fresh, verbose=False)
+    assert notification_indexes(upgraded) == notification_indexes(fresh)
+    assert 'id DESC' in notification_indexes(fresh)['idx_notifications_user_created']
+    fresh.close()
+    upgraded.close()
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from migrations import migrate
+from notification_counters import COUNTER_TABLE, mark_all_read, mark_read, rebuild_counters, unread_count
+
+
+@pytest.fixture
+def db(production_db):
+    conn = sqlite3.connect(production_db)
+    migrate(conn, verbose=False)
+    yield conn
+    conn.close()
+
+
+def notify(conn, user_id, read_status=0):
+    return conn.execute("INSERT INTO notifications (user_id, title, read_status) VALUES (?, 'Hi', ?)",
+                        (user_id, read_status)).lastrowid
+
+
+def counters(conn):
+    return dict(conn.execute(f'SELECT user_id, unread FROM {COUNTER_TABLE} WHERE unread > 0').fetchall())
+
+
+def test_triggers_follow_every_write(db):
+    first, second = notify(db, 7), notify(db, 7)
+    notify(db, 7, read_status=1)
+    db.execute("INSERT INTO notifications (user_id, title, read_status) VALUES (8, 'Hi', NULL)")
+    assert counters(db) == {7: 2, 8: 1}
+
+    db.execute('UPDATE notifications SET read_status = 1 WHERE id = ?', (first,))
+    assert unread_count(db, 7) == 1
+    db.execute('UPDATE notifications SET read_status = 0 WHERE id = ?', (first,))
+    assert unread_count(db, 7) == 2
+
+    db.execute('UPDATE notifications SET user_id = 8 WHERE id = ?', (second,))
+    assert counters(db) == {7: 1, 8: 2}
+    db.execute('DELETE FROM notifications WHERE id = ?', (first,))
+    assert counters(db) == {8: 2}
+
+    maintained = counters(db)
+    rebuild_counters(db)
+    assert counters(db) == maintained
+
+
+def test_mark_read_only_touches_the_users_unread_ids(db):
+    mine = [notify(db, 7) for _ in range(3)]
+    theirs = notify(db, 8)
+
+    assert mark_read(db, 7, [mine[0], str(mine[1]), 'x', theirs]) == 2
+    assert mark_read(db, 7, [mine[0]]) == 0
+    assert mark_read(db, 7, []) == 0
+    assert counters(db) == {7: 1, 8: 1}
+
+
+def test_mark_all_read_can_stop_at_an_id(db):
+    ids = [notify(db, 7) for _ in range(3)]
+    assert mark_all_read(db, 7, up_to_id=ids[1]) == 2
+    assert unread_count(db, 7) == 1
+    assert mark_all_read(db, 7) == 1
+    assert unread_count(db, 7) == 0
+    assert unread_count(db, 99) == 0
+
+
+def test_mark_read_endpoints_report_the_new_count(server):
+    conn = server.get_db_connection()
+    try:
+        ids = [notify(conn, 7) for _ in range(3)]
+        conn.commit()
+    finally:
+        conn.close()
+    client = server.app.test_client()
+
+    assert client.get('/api/users/7/notifications/unread-count').json == {"user_id": 7, "unread": 3}
+    assert client.post('/api/users/7/notifications/read', json={"ids": ids[:1]}).json == {
+        "user_id": 7, "updated": 1, "unread": 2
+    }
+    assert client.post('/api/users/7/notifications/read', json={"ids": 5}).status_code == 400
+    assert client.post('/api/users/7/notifications/read-all').json == {"user_id": 7, "updated": 2, "unread": 0}
+    assert client.get('/api/notifications/7?unread=1').json == []
@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+from notification_counters import unread_count
+from notification_fanout import announcement_payload, class_student_ids, fan_out
+
+
+@pytest.fixture
+def school(server):
+    """Teacher 1's class is students 10 and 11; student 12 only submitted to teacher 2"""
+    conn = server.get_db_connection()
+    try:
+        conn.executemany("INSERT INTO users (id, name, email, password_hash, role) VALUES (?, ?, ?, 'x', ?)",
+                         [(user_id, f'User {user_id}', f'user{user_id}@school.test', role)
+                          for user_id, role in ((1, 'teacher'), (2, 'teacher'), (10, 'student'), (11, 'student'),
+                                                (12, 'student'))])
+        conn.executemany("INSERT INTO assignments (id, teacher_id, title, deadline) VALUES (?, ?, ?, '2026-01-01')",
+                         [(1, 1, 'Essay'), (2, 1, 'Lab'), (3, 2, 'Poem')])
+        conn.executemany('INSERT INTO submissions (assignment_id, student_id) VALUES (?, ?)',
+                         [(1, 10), (2, 10), (2, 11), (3, 12)])
+        conn.commit()
+    finally:
+        conn.close()
+    return server
+
+
+def notified(server):
+    conn = server.get_db_connection()
+    try:
+        return [tuple(row) for row in conn.execute('SELECT user_id, title FROM notifications ORDER BY user_id')]
+    finally:
+        conn.close()
+
+
+def test_fan_out_writes_one_unread_row_per_recipient(pooled_db):
+    conn = pooled_db.checkout()
+    try:
+        assert fan_out(conn, [11, 10, '11', 12], 'Trip', 'Friday') == [11, 10, 12]
+        conn.commit()
+        assert [unread_count(conn, user_id) for user_id in (10, 11, 12)] == [1, 1, 1]
+    finally:
+        conn.close()
+
+
+def test_class_students_use_the_schemas_owner_column(enhanced_db):
+    # Assignments are owned through created_by on this schema
+    conn = sqlite3.connect(enhanced_db)
+    teacher_id, assignment_id = conn.execute('SELECT created_by, id FROM assignments LIMIT 1').fetchone()
+    conn.executemany('INSERT INTO submissions (assignment_id, student_id) VALUES (?, ?)',
+                     [(assignment_id, 90), (assignment_id, 91)])
+    assert {90, 91} <= set(class_student_ids(conn, teacher_id))
+    conn.close()
+
+
+def test_class_announcement_reaches_the_class_with_one_emit(school):
+    student = school.socketio.test_client(school.app)
+    student.emit('join_student_room', {"user_id": 10})
+    outsider = school.socketio.test_client(school.app)
+    outsider.emit('join_student_room', {"user_id": 12})
+    student.get_received()
+    outsider.get_received()
+
+    response = school.app.test_client().post('/api/teacher/notifications/create', json={
+        "teacher_id": 1, "title": 'Trip', "message": 'Friday', "type": 'announcement'
+    }).json
+    assert (response['sent'], response['rooms']) == (2, ['class:1'])
+    assert notified(school) == [(10, 'Trip'), (11, 'Trip')]
+
+    packets = [packet for packet in student.get_received() if packet['name'] == 'new_notification']
+    assert len(packets) == 1
+    assert packets[0]['args'][0]['count'] == 2
+    assert outsider.get_received() == []
+    student.disconnect()
+    outsider.disconnect()
+
+
+def test_selected_students_and_roles_can_be_targeted(school):
+    client = school.app.test_client()
+    response = client.post('/api/teacher/notifications/create', json={
+        "teacher_id": 1, "student_ids": [12, 12, 11], "title": 'Resit', "message": 'Monday'
+    }).json
+    assert (response['sent'], response['rooms']) == (2, ['user:12', 'user:11'])
+
+    response = client.post('/api/announcements', json={"role": 'teacher', "title": 'Staff', "message": 'Meeting'}).json
+    assert (response['sent'], response['rooms']) == (2, ['role:teacher'])
+    assert notified(school) == [(1, 'Staff'), (2, 'Staff'), (11, 'Resit'), (12, 'Resit')]
+
+
+def test_invalid_announcements_are_rejected(school):
+    client = school.app.test_client()
+    assert client.post('/api/announcements', json={"title": 'No message'}).status_code == 400
+    assert client.post('/api/announcements', json={"title": 'T', "message": 'M', "role": 'parent'}).status_code == 400
+    assert client.post('/api/teacher/notifications/create', json={"title": 'T', "message": 'M'}).status_code == 400
+    assert client.post('/api/teacher/notifications/create',
+                       json={"student_ids": ['x'], "title": 'T', "message": 'M'}).status_code == 400
+    with pytest.raises(ValueError):
+        announcement_payload({"title": 'T', "message": 'M', "type": 'spam'})
+    assert notified(school) == []
@@ -0,0 +1,89 @@
+import time
+
+from db_pool import get_db_connection
+from epoch_columns import DAY_SECONDS
+from notification_outbox import NotificationOutbox, append_events, prune_outbox
+
+
+def test_record_leaves_the_callers_transaction_open(pooled_db):
+    outer = get_db_connection()
+    try:
+        outer.execute('BEGIN')
+        outer.execute('SELECT COUNT(*) FROM notifications').fetchone()
+
+        NotificationOutbox().record('new_notification', {"title": "Hi"}, ['user:7'])
+
+        assert outer.in_transaction
+        assert pooled_db.stats()["in_use"] == 1
+    finally:
+        outer.close()
+
+
+def titles(replayed):
+    return [event["data"]["title"] for event in replayed["events"]]
+
+
+def test_replay_returns_only_events_after_each_cursor(pooled_db):
+    outbox = NotificationOutbox()
+    outbox.record('new_notification', {"title": "One"}, ['user:7'])
+    outbox.record('new_assignment', {"title": "Two"}, ['user:7', 'class:1'])
+    outbox.record('new_notification', {"title": "Three"}, ['class:1'])
+    outbox.record('new_notification', {"title": "Four"}, ['user:7'])
+
+    replayed = outbox.replay({"user:7": 1, "class:1": 0, "user:8": 0})
+    # "Two" went to both rooms but is replayed once, in append order
+    assert titles(replayed) == ["Two", "Three", "Four"]
+    assert replayed["events"][0]["data"]["_outbox"] == {"user:7": 2, "class:1": 1}
+    assert replayed["cursors"] == {"user:7": 3, "class:1": 2, "user:8": 0}
+    assert replayed["truncated"] == []
+    assert outbox.heads(['user:7', 'class:1', 'user:8']) == {"user:7": 3, "class:1": 2, "user:8": 0}
+
+    assert titles(outbox.replay({"user:7": 3, "class:1": 2})) == []
+
+
+def test_gap_past_the_replay_limit_is_truncated(pooled_db):
+    outbox = NotificationOutbox(replay_limit=2)
+    for title in ("One", "Two", "Three"):
+        outbox.record('new_notification', {"title": title}, ['user:7'])
+
+    assert outbox.replay({"user:7": 0}) == {"events": [], "cursors": {"user:7": 3}, "truncated": ['user:7']}
+    assert titles(outbox.replay({"user:7": 1})) == ["Two", "Three"]
+
+
+def test_cursor_behind_pruned_history_is_truncated(pooled_db):
+    outbox = NotificationOutbox()
+    outbox.record('new_notification', {"title": "Old"}, ['user:7'])
+    conn = get_db_connection()
+    try:
+        append_events(conn, 'new_notification', {"title": "New"}, ['user:7'], now=time.time() + 30 * DAY_SECONDS)
+        assert prune_outbox(conn, retention_days=7, now=time.time() + 30 * DAY_SECONDS) == 1
+        conn.commit()
+    finally:
+        conn.close()
+
+    replayed = outbox.replay({"user:7": 0})
+    assert (titles(replayed), replayed["truncated"]) == (["New"], ['user:7'])
+    assert outbox.replay({"user:7": 1})["truncated"] == []
+
+
+def received(client, name):
+    return [packet['args'][0] for packet in client.get_received() if packet['name'] == name]
+
+
+def test_reconnecting_socket_resumes_from_its_cursors(server):
+    client = server.socketio.test_client(server.app)
+    client.emit('join', {"user_id": 7})
+    cursors = received(client, 'joined')[0]['cursors']
+    client.disconnect()
+
+    server.notification_router.send('new_notification', {"title": "Missed", "user_id": 7})
+    server.notification_router.send('new_notification', {"title": "Not mine", "user_id": 8})
+
+    client = server.socketio.test_client(server.app)
+    client.emit('join', {"user_id": 7})
+    # Cursors for rooms the socket has not joined are ignored
+    client.emit('resume', {"cursors": dict(cursors, **{"user:8": 0})})
+    replay = received(client, 'outbox_replay')[0]
+    assert titles(replay) == ["Missed"]
+    assert replay["cursors"] == {"user:7": cursors['user:7'] + 1}
+    client.disconnect()
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+from flask_socketio import SocketIO
+
+from notification_router import NotificationRouter, recipient_rooms
+
+
+@pytest.fixture
+def classroom(production_db):
+    """Teacher 1 owns assignment 1, which student 10 has submitted to"""
+    conn = sqlite3.connect(production_db)
+    conn.execute("INSERT INTO assignments (id, teacher_id, title, deadline) VALUES (1, 1, 'Essay', '2026-01-01')")
+    conn.execute('INSERT INTO submissions (assignment_id, student_id) VALUES (1, 10)')
+    conn.commit()
+    conn.close()
+    return production_db
+
+
+@pytest.fixture
+def sockets(classroom):
+    """A SocketIO server with the router and a connect(user_id, role) helper returning a test client"""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading')
+    router = NotificationRouter(socketio, broadcast_untargeted=False)
+
+    @socketio.on('join')
+    def on_join(data):
+        router.join(data['user_id'], data['role'], get_connection=lambda: sqlite3.connect(classroom))
+
+    def connect(user_id, role):
+        client = socketio.test_client(app)
+        client.emit('join', {"user_id": user_id, "role": role})
+        client.get_received()
+        return client
+
+    return router, connect
+
+
+def received(client):
+    return [packet['args'][0] for packet in client.get_received() if packet['name'] == 'notification']
+
+
+def test_socket_in_several_target_rooms_gets_one_copy(sockets):
+    router, connect = sockets
+    teacher, student, other = connect(1, 'teacher'), connect(10, 'student'), connect(11, 'student')
+
+    router.send('notification', {"title": 'Reminder', "user_ids": [1, 10], "role": 'teacher', "class_id": 1})
+    assert received(teacher) == [{"title": 'Reminder', "user_ids": [1, 10], "role": 'teacher', "class_id": 1}]
+    assert len(received(student)) == 1
+    assert received(other) == []
+
+
+def test_students_join_the_class_rooms_of_their_teachers(sockets):
+    router, connect = sockets
+    student, other = connect(10, 'student'), connect(11, 'student')
+
+    router.send('notification', {"title": 'Class news', "class_id": 1})
+    assert [data['title'] for data in received(student)] == ['Class news']
+    assert received(other) == []
+
+
+def test_untargeted_events_are_dropped_when_broadcast_is_off(sockets):
+    router, connect = sockets
+    student = connect(10, 'student')
+
+    assert router.send('notification', {"title": 'Nobody'}) == []
+    assert received(student) == []
+    assert router.stats()["dropped"] == 1
+
+
+def test_recipient_rooms_are_deduplicated_across_nested_targets():
+    data = {"user_id": 5, "user_ids": [5, 6, 'x'], "notification": {"user_id": 6, "role": 'student', "rooms": ['news']}}
+    assert recipient_rooms(data) == ['user:5', 'user:6', 'role:student', 'news']
+    assert recipient_rooms('not a payload') == []
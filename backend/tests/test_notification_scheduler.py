@@ -0,0 +1,91 @@
+import time
+
+from db_pool import get_db_connection
+from notification_scheduler import NotificationScheduler
+
+
+def test_submit_leaves_the_callers_transaction_open(pooled_db):
+    scheduler = NotificationScheduler(None)
+    outer = get_db_connection()
+    try:
+        outer.execute('BEGIN')
+        outer.execute('SELECT COUNT(*) FROM notifications').fetchone()
+
+        assert scheduler.submit(7, 'new_assignment', 'Essay due') == ('normal', 'sent')
+        assert scheduler.submit(7, 'progress_updated', 'Progress') == ('low', 'queued')
+        assert scheduler.flush(7) == 1
+
+        assert outer.in_transaction
+    finally:
+        outer.close()
+
+
+class RecordingRouter:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, event, data, rooms=None, immediate=False):
+        self.sent.append((event, data, rooms, immediate))
+        return rooms
+
+
+def notifications(user_id):
+    conn = get_db_connection()
+    try:
+        return [tuple(row) for row in conn.execute(
+            'SELECT title, message, type FROM notifications WHERE user_id = ? ORDER BY id', (user_id,)
+        )]
+    finally:
+        conn.close()
+
+
+def test_normal_notifications_past_the_rate_limit_wait_for_the_window(pooled_db):
+    router = RecordingRouter()
+    scheduler = NotificationScheduler(router, rate_limit=2, rate_window=60)
+    results = [scheduler.submit(7, 'new_assignment', f'Essay {index}') for index in range(3)]
+    assert results == [('normal', 'sent'), ('normal', 'sent'), ('normal', 'queued')]
+    assert scheduler.submit(7, 'new_assignment', 'Exam moved', notification_type='urgent') == ('urgent', 'sent')
+    # Another user has their own allowance
+    assert scheduler.submit(8, 'new_assignment', 'Essay 0') == ('normal', 'sent')
+
+    assert scheduler.flush_due() == 0
+    assert scheduler.flush_due(now=time.time() + 61) == 1
+    # A digest of one item goes out as that item
+    assert router.sent[-1] == ('new_assignment', {"user_id": 7}, ['user:7'], False)
+    assert [row[0] for row in notifications(7)] == ['Essay 0', 'Essay 1', 'Exam moved', 'Essay 2']
+
+
+def test_rate_limit_window_slides(pooled_db):
+    scheduler = NotificationScheduler(None, rate_limit=1, rate_window=0.2)
+    assert scheduler.submit(7, 'new_quiz', 'Quiz 1') == ('normal', 'sent')
+    assert scheduler.submit(7, 'new_quiz', 'Quiz 2') == ('normal', 'queued')
+    time.sleep(0.25)
+    assert scheduler.submit(7, 'new_quiz', 'Quiz 3') == ('normal', 'sent')
+
+
+def test_low_priority_items_are_coalesced_into_one_digest(pooled_db):
+    router = RecordingRouter()
+    scheduler = NotificationScheduler(router, digest_window=300)
+    for status in ('submitted', 'late', 'graded'):
+        assert scheduler.submit(7, 'assignment_status_update', f'Essay {status}',
+                                data={"assignment_id": 1, "student_id": 7}) == ('low', 'queued')
+    scheduler.submit(7, 'assignment_status_update', 'Lab submitted', data={"assignment_id": 2, "student_id": 7})
+    scheduler.submit(7, 'dashboard_refresh', 'Dashboard', data={"type": 'grades'})
+    assert router.sent == []
+
+    assert scheduler.flush_due(now=time.time() + 299) == 0
+    assert scheduler.flush_due(now=time.time() + 301) == 1
+    assert notifications(7) == [('3 updates', 'Essay graded; Lab submitted; Dashboard', 'digest')]
+    [(event, payload, rooms, immediate)] = router.sent
+    assert (event, rooms, immediate) == ('notification_digest', ['user:7'], False)
+    assert [item['title'] for item in payload['items']] == ['Essay graded', 'Lab submitted', 'Dashboard']
+    assert scheduler.stats() == {"immediate": 0, "queued": 5, "digests": 1, "digested_items": 3}
+    assert scheduler.flush_due(everything=True) == 0
+
+
+def test_priority_comes_from_the_request_type_or_event():
+    scheduler = NotificationScheduler(None)
+    assert scheduler.priority_for('progress_updated') == 'low'
+    assert scheduler.priority_for('progress_updated', priority='urgent') == 'urgent'
+    assert scheduler.priority_for('new_notification', notification_type='urgent') == 'urgent'
+    assert scheduler.priority_for('anything_else') == 'normal'
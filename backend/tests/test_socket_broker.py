@@ -0,0 +1,81 @@
+import json
+import sqlite3
+import time
+
+import pytest
+import socketio
+
+from socket_broker import QUEUE_TABLE, SQLiteManager, socketio_options, sqlite_queue_path, write_only_manager
+
+
+class Worker:
+    """One server process on the shared SQLite queue, recording what it sends to its own sockets"""
+
+    def __init__(self, queue_path):
+        self.server = socketio.Server(async_mode='threading', client_manager=SQLiteManager(queue_path, poll_ms=5))
+        self.sent = []
+        self.server._send_eio_packet = self.record
+        # Starts the queue listener, as the first connection would
+        self.server.manager_initialized = True
+        self.server.manager.initialize()
+
+    def record(self, eio_sid, eio_packet):
+        # Socket.IO EVENT packets encode as '2' followed by the JSON [event, data]
+        self.sent.append((eio_sid, json.loads(eio_packet.data[1:])))
+
+    def connect(self, eio_sid, room):
+        sid = self.server.manager.connect(eio_sid, '/')
+        self.server.enter_room(sid, room)
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return sorted(self.sent)
+
+
+def test_emit_from_one_worker_reaches_sockets_on_another(tmp_path):
+    queue_path = str(tmp_path / 'broker.db')
+    worker_a, worker_b = Worker(queue_path), Worker(queue_path)
+    worker_a.connect('a1', 'class:1')
+    worker_b.connect('b1', 'class:1')
+    worker_b.connect('b2', 'class:2')
+
+    worker_a.server.emit('new_notification', {"title": 'Hi'}, to='class:1')
+    assert worker_b.wait_for(1) == [('b1', ['new_notification', {"title": 'Hi'}])]
+    assert worker_a.wait_for(1) == [('a1', ['new_notification', {"title": 'Hi'}])]
+
+
+def test_write_only_manager_emits_without_a_server(tmp_path):
+    queue_path = str(tmp_path / 'broker.db')
+    worker_a = Worker(queue_path)
+    worker_a.connect('a1', 'user:7')
+
+    write_only_manager(f'sqlite:///{queue_path}').emit('digest', {"count": 3}, room='user:7')
+    assert worker_a.wait_for(1) == [('a1', ['digest', {"count": 3}])]
+
+
+def test_prune_drops_messages_past_retention(tmp_path):
+    queue_path = str(tmp_path / 'broker.db')
+    manager = SQLiteManager(queue_path, write_only=True, retention=60)
+    manager.emit('old', {}, room='user:1')
+    conn = sqlite3.connect(queue_path)
+    conn.execute(f'UPDATE {QUEUE_TABLE} SET created_at = created_at - 120')
+    conn.commit()
+    manager.emit('new', {}, room='user:1')
+
+    manager.prune()
+    assert conn.execute(f'SELECT COUNT(*) FROM {QUEUE_TABLE}').fetchone()[0] == 1
+    conn.close()
+
+
+def test_queue_urls_pick_the_backend(tmp_path):
+    assert sqlite_queue_path('sqlite:///broker.db') == 'broker.db'
+    assert sqlite_queue_path('sqlite:////var/run/lms.db') == '/var/run/lms.db'
+    assert sqlite_queue_path('redis://localhost:6379/0') is None
+    assert socketio_options('') == {}
+    assert socketio_options('redis://localhost:6379/0', 'lms') == {"message_queue": 'redis://localhost:6379/0',
+                                                                   "channel": 'lms'}
+    assert isinstance(socketio_options(f'sqlite:///{tmp_path}/broker.db')["client_manager"], SQLiteManager)
+    with pytest.raises(ValueError):
+        write_only_manager('')
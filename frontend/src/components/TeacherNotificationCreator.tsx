@@ -129,7 +129,7 @@ const TeacherNotificationCreator: React.FC = () => {
         setSelectedStudents([]);
         
         // Log success details
-        console.log(`📢 Sent ${result.notifications?.length || 0} notifications to students`);
+        console.log(`📢 Sent ${result.sent || 0} notifications to students`);
       } else {
         const error = await response.json();
         console.error('❌ Error sending notifications:', error);
@@ -1,8 +1,38 @@
 import { io, Socket } from 'socket.io-client';
 
+interface EventBatch {
+  events: { event: string; data: any }[];
+}
+
+// The server coalesces bursts of events into one 'event_batch' frame;
+// replay each event to the socket's own listeners as if it arrived alone
+export function unpackEventBatches(socket: Socket): void {
+  socket.on('event_batch', (batch: EventBatch) => {
+    (batch?.events || []).forEach(({ event, data }) => {
+      socket.listeners(event as any).forEach((listener: Function) => {
+        try {
+          listener(data);
+        } catch (error) {
+          console.error(`Error in listener for batched ${event}:`, error);
+        }
+      });
+    });
+  });
+}
+
+interface OutboxReplay {
+  events: { event: string; data: any }[];
+  cursors: Record<string, number>;
+  truncated: string[];
+}
+
+const JOIN_RESPONSES = ['joined', 'joined_teacher_room', 'joined_student_room'];
+
 class ConnectionManager {
   private static instance: ConnectionManager;
   private socket: Socket | null = null;
+  // Last durable event seen per room, kept across reconnects to resume from
+  private outboxCursors: Record<string, number> = {};
   private isConnecting = false;
   private connectionAttempts = 0;
   private maxAttempts = 3;
@@ -51,6 +81,8 @@ class ConnectionManager {
         timeout: 10000,
         reconnection: false, // We'll handle reconnection manually
       });
+      unpackEventBatches(this.socket);
+      this.trackOutbox(this.socket);
 
       const connectionTimeout = setTimeout(() => {
         if (!this.socket?.connected) {
@@ -108,6 +140,57 @@ class ConnectionManager {
     });
   }
 
+  // Durable events carry their per-room sequence numbers in "_outbox". After
+  // (re)joining, ask the server to replay whatever arrived while disconnected.
+  private trackOutbox(socket: Socket): void {
+    const advance = (sequences?: Record<string, number>) => {
+      Object.entries(sequences || {}).forEach(([room, seq]) => {
+        if (seq > (this.outboxCursors[room] || 0)) {
+          this.outboxCursors[room] = seq;
+        }
+      });
+    };
+
+    socket.onAny((event: string, data: any) => {
+      if (event === 'event_batch') {
+        (data?.events || []).forEach((item: { data: any }) => advance(item.data?._outbox));
+      } else if (JOIN_RESPONSES.includes(event)) {
+        const heads: Record<string, number> = data?.cursors || {};
+        const behind: Record<string, number> = {};
+        Object.entries(heads).forEach(([room, head]) => {
+          const cursor = this.outboxCursors[room];
+          if (cursor !== undefined && cursor < head) {
+            behind[room] = cursor;
+          } else if (cursor === undefined) {
+            // First time in this room: start from the current head
+            this.outboxCursors[room] = head;
+          }
+        });
+        if (Object.keys(behind).length > 0) {
+          socket.emit('resume', { cursors: behind });
+        }
+      } else {
+        advance(data?._outbox);
+      }
+    });
+
+    socket.on('outbox_replay', (replay: OutboxReplay) => {
+      if (replay?.truncated?.length) {
+        console.warn('⚠️ Missed too many events to replay, refetch needed for:', replay.truncated);
+      }
+      (replay?.events || []).forEach(({ event, data }) => {
+        socket.listeners(event as any).forEach((listener: Function) => {
+          try {
+            listener(data);
+          } catch (error) {
+            console.error(`Error in listener for replayed ${event}:`, error);
+          }
+        });
+      });
+      advance(replay?.cursors);
+    });
+  }
+
   getSocket(): Socket | null {
     return this.socket;
   }
@@ -3,7 +3,7 @@ import { connectionManager } from './connectionManager';
 
 interface NotificationData {
   id: string;
-  type: 'assignment_submitted' | 'quiz_completed' | 'assignment_graded' | 'quiz_graded' | 'assignment_created' | 'quiz_created' | 'feedback_provided';
+  type: 'assignment_submitted' | 'quiz_completed' | 'assignment_graded' | 'quiz_graded' | 'assignment_created' | 'quiz_created' | 'feedback_provided' | 'notification_digest';
   title: string;
   message: string;
   data: any;
@@ -191,6 +191,20 @@ class NotificationService {
         priority: 'low'
       });
     });
+
+    // Low-priority and rate-limited updates folded into one digest by the server
+    this.socket.on('notification_digest', (data: any) => {
+      this.handleNotification({
+        id: `digest_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
+        type: 'notification_digest',
+        title: data.notification?.title,
+        message: data.notification?.message,
+        data: data.items,
+        timestamp: new Date(),
+        read: false,
+        priority: 'low'
+      });
+    });
   }
 
   private handleNotification(notification: NotificationData) {
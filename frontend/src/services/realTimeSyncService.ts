@@ -24,6 +24,7 @@ class RealTimeSyncService {
   private isConnected = false;
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
+  private pendingRefreshes: Set<string | undefined> = new Set();
 
   constructor() {
     this.initializeSocket();
@@ -119,7 +120,7 @@ class RealTimeSyncService {
     };
 
     this.emit('assignment_update', event);
-    this.emit('dashboard_refresh', { type: 'assignments' });
+    this.scheduleRefresh('assignments');
     
     // Emit real-time notification
     if (type === 'submitted') {
@@ -151,7 +152,7 @@ class RealTimeSyncService {
     };
 
     this.emit('quiz_update', event);
-    this.emit('dashboard_refresh', { type: 'quizzes' });
+    this.scheduleRefresh('quizzes');
     
     // Emit real-time notification
     if (type === 'completed') {
@@ -183,7 +184,7 @@ class RealTimeSyncService {
     };
 
     this.emit('feedback_update', event);
-    this.emit('dashboard_refresh', { type: 'feedback' });
+    this.scheduleRefresh('feedback');
     
     // Emit real-time notification
     notificationService.emitRealtimeNotification(
@@ -203,7 +204,7 @@ class RealTimeSyncService {
     };
 
     this.emit('notification_update', event);
-    this.emit('dashboard_refresh', { type: 'notifications' });
+    this.scheduleRefresh('notifications');
   }
 
   private handleChatEvent(data: any) {
@@ -258,6 +259,19 @@ class RealTimeSyncService {
     });
   }
 
+  // Events that arrive together (e.g. one event_batch frame) trigger a
+  // single refetch per dashboard section instead of one per event
+  private scheduleRefresh(type?: string) {
+    if (this.pendingRefreshes.size === 0) {
+      setTimeout(() => {
+        const types = Array.from(this.pendingRefreshes);
+        this.pendingRefreshes.clear();
+        types.forEach(pending => this.emit('dashboard_refresh', { type: pending }));
+      }, 0);
+    }
+    this.pendingRefreshes.add(type);
+  }
+
   // Method to manually trigger dashboard refresh
   refreshDashboard(type?: string) {
     this.emit('dashboard_refresh', { type });
@@ -1,4 +1,5 @@
 import { io, Socket } from 'socket.io-client';
+import { unpackEventBatches } from './connectionManager';
 
 interface StatusUpdate {
   assignment_id?: number;
@@ -41,6 +42,7 @@ class StatusService {
   private initializeSocket() {
     try {
       this.socket = io(process.env.REACT_APP_API_URL || 'http://localhost:5006');
+      unpackEventBatches(this.socket);
       
       this.socket.on('connect', () => {
         console.log('✅ Connected to status update service');